@@ -0,0 +1,286 @@
+"""
+Banc d'essai de performances de la génération Kimaiko.
+
+Reprend le schéma des fichiers de démonstration (demo_files/generate_demo_files.py:
+Fournisseurs, Articles, Factures) à grande échelle, mesure generate_kimaiko_files
+de bout en bout et étape par étape (StageProfiler), et ajoute les résultats à un
+fichier JSON Lines pour les comparer d'un commit à l'autre.
+
+Exemples:
+    python benchmark.py --sizes 10k,100k
+    python benchmark.py --sizes 1M --fanout 50 --multi-ref-ratio 0.2 --na-ratio 0.05
+    python benchmark.py --compare
+"""
+import argparse
+import copy
+import hashlib
+import json
+import logging
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.demo_config import DEFAULT_MAPPINGS
+from utils.excel_writer import get_output_writer
+from utils.file_operations import generate_kimaiko_files
+from utils.model_sources import SOURCES_KEY
+from utils.profiling import StageProfiler
+
+DEFAULT_SIZES = "10k,100k,1M,5M"
+DEFAULT_RESULTS = Path("benchmark_results.jsonl")
+
+_SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+def parse_size(text: str) -> int:
+    """'10k' -> 10000, '5M' -> 5000000"""
+    text = text.strip().lower().replace("_", "")
+    factor = _SIZE_SUFFIXES.get(text[-1:], 1)
+    number = text[:-1] if text[-1:] in _SIZE_SUFFIXES else text
+    try:
+        return int(float(number) * factor)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Taille invalide: {text}")
+
+def benchmark_mappings() -> Dict:
+    """DEFAULT_MAPPINGS, with Fournisseurs keyed on the supplier code the references use"""
+    mappings = copy.deepcopy(DEFAULT_MAPPINGS)
+    mappings["Fournisseurs"][SOURCES_KEY] = {"primary": "Ancien Fournisseurs", "key": "Code"}
+    return mappings
+
+def _codes(prefix: str, numbers: np.ndarray) -> np.ndarray:
+    """Zero-padded codes ('SUP0000042') as an object array"""
+    width = max(len(str(int(numbers.max()) if len(numbers) else 0)), 3)
+    return (prefix + pd.Series(numbers).astype(str).str.zfill(width)).to_numpy(dtype=object)
+
+def _with_na(values: np.ndarray, na_ratio: float, rng: np.random.Generator) -> np.ndarray:
+    if na_ratio <= 0:
+        return values
+    values = values.astype(object) if values.dtype.kind in "iub" else values.copy()
+    values[rng.random(len(values)) < na_ratio] = None if values.dtype == object else np.nan
+    return values
+
+def generate_sources(rows: int, fanout: int = 10, multi_ref_ratio: float = 0.0, multi_ref_size: int = 3,
+                     na_ratio: float = 0.0, key_cardinality: float = 1.0, seed: int = 0) -> Dict[str, Dict]:
+    """
+    Source files of the demo schema, scaled to rows invoices.
+
+    Args:
+        rows: Number of invoices (Ancien Factures)
+        fanout: Average number of referencing rows per referenced row: rows / fanout
+            articles, and articles / fanout suppliers
+        multi_ref_ratio: Share of invoice CodeArticle cells holding several
+            references separated by ", "
+        multi_ref_size: Number of references in such a cell
+        na_ratio: Share of empty cells in the non-key columns (references included)
+        key_cardinality: Distinct invoice numbers / rows (below 1, rows share an ID)
+        seed: Random seed, for reproducible data
+
+    Returns:
+        Source entries in the load_demo_files shape ({'columns', 'data'})
+    """
+    rng = np.random.default_rng(seed)
+    n_articles = max(rows // fanout, 1)
+    n_suppliers = max(n_articles // fanout, 1)
+
+    supplier_codes = _codes("SUP", np.arange(1, n_suppliers + 1))
+    suppliers = pd.DataFrame({
+        "Code": supplier_codes,
+        "RaisonSociale": _with_na("Fournisseur " + supplier_codes, na_ratio, rng),
+        "ContactEmail": _with_na(_codes("contact", np.arange(1, n_suppliers + 1)) + "@fournisseur.fr", na_ratio, rng),
+        "NumeroTel": _with_na(rng.integers(33_600_000_000, 33_699_999_999, n_suppliers), na_ratio, rng),
+        "AdresseComplete": _with_na(
+            (pd.Series(rng.integers(1, 200, n_suppliers)).astype(str) + " Rue de l'Industrie, "
+             + pd.Series(rng.integers(10_000, 95_999, n_suppliers)).astype(str) + " Ville").to_numpy(dtype=object),
+            na_ratio, rng)
+    })
+
+    article_codes = _codes("PROD", np.arange(1, n_articles + 1))
+    articles = pd.DataFrame({
+        "CodeArticle": article_codes,
+        "Designation": _with_na("Article " + article_codes, na_ratio, rng),
+        "PrixUnitaire": _with_na(rng.integers(100, 200_000, n_articles) / 100, na_ratio, rng),
+        "CodeFournisseur": _with_na(supplier_codes[rng.integers(0, n_suppliers, n_articles)], na_ratio, rng)
+    })
+
+    n_keys = min(max(int(rows * key_cardinality), 1), rows)
+    article_refs = article_codes[rng.integers(0, n_articles, rows)]
+    if multi_ref_ratio > 0 and multi_ref_size > 1:
+        multi = np.flatnonzero(rng.random(rows) < multi_ref_ratio)
+        extra = article_codes[rng.integers(0, n_articles, (len(multi), multi_ref_size - 1))]
+        cells = article_refs[multi]
+        for i in range(multi_ref_size - 1):
+            cells = cells + ", " + extra[:, i]
+        article_refs[multi] = cells
+    quantities = rng.integers(1, 20, rows)
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365, rows), unit="D")
+    invoices = pd.DataFrame({
+        "NumeroFacture": _codes("INV", rng.permutation(rows) % n_keys + 1),
+        "DateFacture": _with_na(dates.strftime("%Y-%m-%d").to_numpy(dtype=object), na_ratio, rng),
+        "CodeFournisseur": _with_na(supplier_codes[rng.integers(0, n_suppliers, rows)], na_ratio, rng),
+        "CodeArticle": _with_na(article_refs, na_ratio, rng),
+        "QuantiteCommandee": _with_na(quantities, na_ratio, rng),
+        "MontantTotal": _with_na(quantities * rng.integers(100, 200_000, rows) / 100, na_ratio, rng)
+    })
+
+    return {name: {"columns": df.columns.tolist(), "data": df, "row_count": len(df)}
+            for name, df in [("Ancien Fournisseurs", suppliers), ("Ancien Articles", articles),
+                             ("Ancien Factures", invoices)]}
+
+def git_revision() -> Dict[str, Optional[str]]:
+    """Current commit and whether tracked files differ from it (None outside a git checkout)"""
+    root = Path(__file__).parent
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        subject = subprocess.run(["git", "log", "-1", "--format=%s"], cwd=root, capture_output=True,
+                                 text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None, "subject": None}
+    return {"commit": commit, "dirty": bool(status.strip()), "subject": subject}
+
+def scenario_id(params: Dict) -> str:
+    """Short stable identifier of a data and run configuration, to compare like with like"""
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:10]
+
+def run_scenario(rows: int, data_params: Dict, run_params: Dict, work_dir: Path) -> Dict:
+    """Generate the sources, run generate_kimaiko_files once and return the measures"""
+    start = time.perf_counter()
+    source_files = generate_sources(rows, **data_params)
+    data_s = time.perf_counter() - start
+
+    profiler = StageProfiler()
+    output = work_dir / f"benchmark_{rows}.zip"
+    writer_options = {"reproducible": True} if run_params["deterministic_ids"] and run_params["writer"] == "xlsxwriter" else {}
+    start = time.perf_counter()
+    archive = generate_kimaiko_files(
+        benchmark_mappings(), source_files,
+        output_writer=get_output_writer(run_params["writer"], **writer_options),
+        output_target=output, max_workers=run_params["workers"], executor=run_params["executor"],
+        deterministic_ids=run_params["deterministic_ids"], arrow_strings=run_params["arrow_strings"],
+        profiler=profiler, chunk_size=run_params.get("chunk_size")
+    )
+    archive.close()
+    total_s = time.perf_counter() - start
+    archive_mb = output.stat().st_size / 1024 ** 2
+    output.unlink()
+
+    summary = profiler.summary()
+    stages = summary.groupby("stage", sort=False)["wall_s"].sum().round(4).to_dict()
+    report = profiler.report()
+    params = {"rows": rows, **data_params, **run_params}
+    return {
+        "scenario": scenario_id(params),
+        "params": params,
+        "source_rows": {name: info["row_count"] for name, info in source_files.items()},
+        "data_generation_s": round(data_s, 3),
+        "total_s": round(total_s, 3),
+        "peak_rss_mb": report["peak_rss_mb"],
+        "archive_mb": round(archive_mb, 2),
+        "stages_s": stages,
+        "models": summary.astype(object).where(summary.notna(), None).to_dict(orient="records")
+    }
+
+def compare_results(path: Path, last: int = 5) -> pd.DataFrame:
+    """Median total time of each scenario for the last commits measured"""
+    if not path.is_file():
+        raise FileNotFoundError(f"Aucun résultat dans {path}")
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                result = json.loads(line)
+                label = result["git"]["commit"] or "?"
+                if result["git"]["dirty"]:
+                    label += "+"
+                rows.append({"rows": result["params"]["rows"], "scenario": result["scenario"], "commit": label,
+                             "timestamp": result["timestamp"], "total_s": result["total_s"],
+                             "peak_rss_mb": result["peak_rss_mb"]})
+    df = pd.DataFrame(rows)
+    commits = df.groupby("commit")["timestamp"].max().sort_values().index[-last:]
+    df = df[df["commit"].isin(commits)]
+    table = df.pivot_table(index=["rows", "scenario"], columns="commit", values="total_s", aggfunc="median")
+    return table[[c for c in commits if c in table.columns]]
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Mesure les performances de la génération sur des données synthétiques")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Nombres de factures, séparés par des virgules (défaut: {DEFAULT_SIZES})")
+    parser.add_argument("--fanout", type=int, default=10, help="Lignes référençant chaque ligne référencée, en moyenne")
+    parser.add_argument("--multi-ref-ratio", type=float, default=0.0, help="Part des cellules CodeArticle à références multiples")
+    parser.add_argument("--multi-ref-size", type=int, default=3, help="Références par cellule multiple")
+    parser.add_argument("--na-ratio", type=float, default=0.0, help="Part des cellules vides hors clés")
+    parser.add_argument("--key-cardinality", type=float, default=1.0, help="Numéros de facture distincts / lignes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="Exécutions par taille")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--writer", choices=["xlsxwriter", "openpyxl"], default="xlsxwriter")
+    parser.add_argument("--deterministic-ids", action="store_true")
+    parser.add_argument("--arrow-strings", action="store_true")
+    parser.add_argument("--chunk-size", type=int, help="Génération par lots de N lignes (voir cli.py --chunk-size)")
+    parser.add_argument("--results", type=Path, default=DEFAULT_RESULTS, help="Fichier JSON Lines des résultats")
+    parser.add_argument("--compare", action="store_true", help="Comparer les résultats enregistrés par commit, sans mesurer")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Afficher les logs détaillés")
+    args = parser.parse_args(argv)
+    try:
+        args.sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    if args.fanout < 1:
+        parser.error("--fanout doit être au moins 1")
+    for name in ("multi_ref_ratio", "na_ratio"):
+        if not 0 <= getattr(args, name) <= 1:
+            parser.error(f"--{name.replace('_', '-')} doit être compris entre 0 et 1")
+    if not 0 < args.key_cardinality <= 1:
+        parser.error("--key-cardinality doit être dans ]0, 1]")
+    if args.chunk_size is not None and (args.chunk_size < 1 or args.writer != "xlsxwriter"):
+        parser.error("--chunk-size doit être positif et requiert --writer xlsxwriter")
+    return args
+
+def main(argv: List[str] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    if args.compare:
+        with pd.option_context("display.width", 200, "display.max_columns", None):
+            print(compare_results(args.results))
+        return 0
+
+    data_params = {"fanout": args.fanout, "multi_ref_ratio": args.multi_ref_ratio,
+                   "multi_ref_size": args.multi_ref_size, "na_ratio": args.na_ratio,
+                   "key_cardinality": args.key_cardinality, "seed": args.seed}
+    run_params = {"workers": args.workers, "executor": args.executor, "writer": args.writer,
+                  "deterministic_ids": args.deterministic_ids, "arrow_strings": args.arrow_strings}
+    if args.chunk_size is not None:
+        # Absent sinon: les scénarios déjà mesurés gardent leur identifiant
+        run_params["chunk_size"] = args.chunk_size
+    revision = git_revision()
+    with tempfile.TemporaryDirectory(prefix="kimaiko_bench_") as work_dir:
+        for rows in args.sizes:
+            for run in range(1, args.repeat + 1):
+                print(f"▶ {rows:,} factures (exécution {run}/{args.repeat})...", file=sys.stderr, flush=True)
+                result = run_scenario(rows, data_params, run_params, Path(work_dir))
+                result = {"timestamp": datetime.now().isoformat(timespec="seconds"), "git": revision, **result}
+                with open(args.results, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+                slowest = sorted((item for item in result["stages_s"].items() if item[0] != "total"),
+                                 key=lambda item: -item[1])[:5]
+                stages = ", ".join(f"{name} {seconds:.2f} s" for name, seconds in slowest)
+                print(f"  ✓ {result['total_s']:.2f} s, {result['peak_rss_mb']} Mo max ({stages})",
+                      file=sys.stderr, flush=True)
+    print(f"Résultats ajoutés à {args.results}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
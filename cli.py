@@ -0,0 +1,223 @@
+"""
+Conversion Kimaiko en ligne de commande (sans interface Streamlit).
+
+Exemple:
+    python cli.py --templates modeles/ --sources sources/ --mapping mapping.json --output import_kimaiko.zip
+
+Codes de sortie:
+    0  conversion réussie
+    1  erreur pendant la génération
+    2  arguments ou configuration invalides
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+from utils.chunked import joined_source_names
+from utils.excel_writer import get_output_writer
+from utils.file_operations import generate_kimaiko_files, read_template_columns
+from utils.model_sources import check_model_sources
+from utils.parse_cache import ParseCache
+from utils.source_loader import SOURCE_EXTENSIONS, load_mapped_sources, read_source_headers
+from utils.uuid_registry import UuidRegistry
+
+EXIT_OK = 0
+EXIT_GENERATION_ERROR = 1
+EXIT_CONFIG_ERROR = 2
+
+class ConfigError(Exception):
+    """Invalid command line input (missing directory, malformed mapping...)"""
+    pass
+
+@contextmanager
+def stage(name: str, timings: Dict[str, float]):
+    """Print a progress line and record the wall time of a stage"""
+    print(f"▶ {name}...", file=sys.stderr, flush=True)
+    start = time.perf_counter()
+    status = "✗"
+    try:
+        yield
+        status = "✓"
+    finally:
+        timings[name] = round(time.perf_counter() - start, 3)
+        print(f"  {status} {name} ({timings[name]:.2f} s)", file=sys.stderr, flush=True)
+
+def load_mapping_file(path: Path) -> Dict:
+    """Load a mapping in the DEFAULT_MAPPINGS shape from a JSON or YAML file"""
+    if not path.is_file():
+        raise ConfigError(f"Fichier de mapping introuvable: {path}")
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ConfigError("PyYAML est requis pour lire un mapping YAML (pip install pyyaml)")
+        mappings = yaml.safe_load(text)
+    else:
+        mappings = json.loads(text)
+
+    if not isinstance(mappings, dict) or not all(isinstance(m, dict) for m in mappings.values()):
+        raise ConfigError("Le mapping doit associer chaque modèle à un dictionnaire de colonnes")
+    return mappings
+
+def list_files(directory: Path, extensions: List[str]) -> List[Path]:
+    if not directory.is_dir():
+        raise ConfigError(f"Répertoire introuvable: {directory}")
+    files = sorted(p for p in directory.iterdir()
+                   if p.suffix.lower().lstrip(".") in extensions and not p.name.startswith("~$"))
+    if not files:
+        raise ConfigError(f"Aucun fichier {', '.join('.' + e for e in extensions)} dans {directory}")
+    return files
+
+def load_templates(directory: Path) -> Dict[str, List]:
+    return {path.stem: read_template_columns(path) for path in list_files(directory, ["xlsx"])}
+
+def read_directory_headers(directory: Path, cache: ParseCache = None) -> Dict[str, Dict]:
+    """Read the columns and row count of every source (file or sheet), without their data"""
+    source_files = {}
+    for path in list_files(directory, SOURCE_EXTENSIONS):
+        source_files.update(read_source_headers(path, cache=cache))
+    return source_files
+
+def load_sources(source_files: Dict[str, Dict], mappings: Dict, workers: int = 1,
+                 cache: ParseCache = None, arrow_strings: bool = False) -> Dict[str, Dict]:
+    """Load the columns the mapping uses from each referenced source"""
+    def report(name, done, total):
+        print(f"  [{done}/{total}] {name}", file=sys.stderr, flush=True)
+    return load_mapped_sources(source_files, mappings, max_workers=workers, progress_callback=report,
+                               cache=cache, arrow_strings=arrow_strings)
+
+def check_mapping(mappings: Dict, templates: Dict[str, List], source_files: Dict) -> None:
+    """Fail early on references to unknown source files or columns"""
+    for model, model_mappings in mappings.items():
+        if model not in templates:
+            logging.warning(f"Le modèle {model} n'a pas de fichier modèle correspondant")
+        for col, mapping in model_mappings.items():
+            if not isinstance(mapping, dict) or "source_file" not in mapping:
+                continue
+            source = source_files.get(mapping["source_file"])
+            if source is None:
+                raise ConfigError(f"{model}.{col}: fichier source '{mapping['source_file']}' introuvable")
+            if mapping.get("source_col") not in source["columns"]:
+                raise ConfigError(f"{model}.{col}: colonne '{mapping.get('source_col')}' absente de {mapping['source_file']}")
+            if mapping.get("is_ref") and mapping.get("ref_model") not in mappings:
+                raise ConfigError(f"{model}.{col}: modèle référencé '{mapping.get('ref_model')}' non mappé")
+        # Source principale, jointures et colonnes de clé
+        try:
+            check_model_sources(model, model_mappings, {name: source["columns"] for name, source in source_files.items()})
+        except ValueError as e:
+            raise ConfigError(str(e))
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Génère les fichiers d'import Kimaiko sans interface graphique")
+    parser.add_argument("--templates", type=Path, required=True, help="Répertoire des modèles Kimaiko (.xlsx)")
+    parser.add_argument("--sources", type=Path, required=True, help="Répertoire des fichiers sources (.xlsx, .csv, .parquet, .feather, .arrow)")
+    parser.add_argument("--mapping", type=Path, required=True, help="Mapping JSON ou YAML (format DEFAULT_MAPPINGS)")
+    parser.add_argument("--output", type=Path, default=Path("import_kimaiko.zip"), help="Archive ZIP à produire")
+    parser.add_argument("--workers", type=int, default=1, help="Processus de lecture des sources et modèles traités en parallèle par couche")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--writer", choices=["xlsxwriter", "openpyxl"], default="xlsxwriter")
+    parser.add_argument("--deterministic-ids", action="store_true", help="UUID déterministes (uuid5)")
+    parser.add_argument("--arrow-strings", action="store_true", help="Chaînes stockées en string[pyarrow] (moins de mémoire)")
+    parser.add_argument("--registry", type=Path, help="Registre SQLite des UUID déjà émis")
+    parser.add_argument("--delta", action="store_true", help="N'écrire que les lignes nouvelles ou modifiées (requiert --registry)")
+    parser.add_argument("--cache-dir", type=Path, help="Cache des sources déjà lues (réutilisé si le contenu est identique)")
+    parser.add_argument("--chunk-size", type=int,
+                        help="Générer par lots de N lignes, pour des sources principales plus grandes que la mémoire "
+                             "(les sources jointes restent chargées en entier)")
+    parser.add_argument("--timings", type=Path, help="Écrire les durées par étape dans ce fichier JSON")
+    parser.add_argument("--gc-threshold", type=float,
+                        help="Part de la mémoire système utilisée (0-1) au-delà de laquelle une collecte complète est lancée entre deux modèles (défaut: 0.85)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Afficher les logs détaillés")
+    parser.add_argument("--trace", action="store_true",
+                        help="Tracer chaque référence non mappée et chaque ligne sans correspondance (très verbeux)")
+    args = parser.parse_args(argv)
+    if args.delta and args.registry is None:
+        parser.error("--delta requiert --registry")
+    if args.gc_threshold is not None and not 0 < args.gc_threshold <= 1:
+        parser.error("--gc-threshold doit être dans ]0, 1]")
+    if args.chunk_size is not None:
+        if args.chunk_size < 1:
+            parser.error("--chunk-size doit être positif")
+        if args.delta:
+            parser.error("--delta n'est pas disponible avec --chunk-size")
+        if args.writer != "xlsxwriter":
+            parser.error("--chunk-size requiert --writer xlsxwriter")
+    return args
+
+def main(argv: List[str] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.trace else logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    if args.trace:
+        # Variable d'environnement: également lue par les processus de travail
+        os.environ["KIMAIKO_TRACE"] = "1"
+
+    if args.gc_threshold is not None:
+        # Variable d'environnement: également lue par les processus de travail
+        os.environ["KIMAIKO_GC_THRESHOLD"] = str(args.gc_threshold)
+
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+    registry = None
+    try:
+        with stage("Lecture du mapping", timings):
+            mappings = load_mapping_file(args.mapping)
+        with stage("Chargement des modèles", timings):
+            templates = load_templates(args.templates)
+        cache = ParseCache(args.cache_dir) if args.cache_dir is not None else None
+        with stage("Lecture des en-têtes sources", timings):
+            source_files = read_directory_headers(args.sources, cache)
+        check_mapping(mappings, templates, source_files)
+        if args.chunk_size is not None:
+            # Sources principales lues lot par lot pendant la génération: seules les sources jointes sont chargées
+            joined = {name: source_files[name] for name in joined_source_names(mappings)}
+            with stage("Chargement des sources jointes", timings):
+                source_files = {**source_files, **load_sources(joined, mappings, args.workers, cache, args.arrow_strings)}
+        else:
+            with stage("Chargement des sources", timings):
+                source_files = load_sources(source_files, mappings, args.workers, cache, args.arrow_strings)
+    except ConfigError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return EXIT_CONFIG_ERROR
+    except Exception as e:
+        print(f"✗ Erreur lors du chargement: {e}", file=sys.stderr)
+        return EXIT_GENERATION_ERROR
+
+    try:
+        if args.registry is not None:
+            registry = UuidRegistry(args.registry)
+        writer_options = {"reproducible": True} if args.deterministic_ids and args.writer == "xlsxwriter" else {}
+        with stage("Génération", timings):
+            archive = generate_kimaiko_files(
+                mappings, source_files,
+                output_writer=get_output_writer(args.writer, **writer_options),
+                output_target=args.output.resolve(),
+                max_workers=args.workers, executor=args.executor,
+                deterministic_ids=args.deterministic_ids, arrow_strings=args.arrow_strings,
+                registry=registry, delta=args.delta, chunk_size=args.chunk_size
+            )
+            archive.close()
+    except Exception as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return EXIT_GENERATION_ERROR
+    finally:
+        if registry is not None:
+            registry.close()
+
+    timings["total"] = round(time.perf_counter() - start, 3)
+    print(f"✅ Archive générée: {args.output} ({timings['total']:.2f} s)", file=sys.stderr)
+    if args.timings is not None:
+        args.timings.write_text(json.dumps(timings, indent=2, ensure_ascii=False), encoding="utf-8")
+    return EXIT_OK
+
+if __name__ == "__main__":
+    sys.exit(main())
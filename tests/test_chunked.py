@@ -0,0 +1,53 @@
+import zipfile
+
+import pandas as pd
+
+from utils.excel_writer import get_output_writer
+from utils.file_operations import generate_kimaiko_files
+from utils.source_loader import iter_source_batches, load_mapped_sources, read_source_headers
+
+MAPPINGS = {
+    "A": {"ID": {"type": "uuid"},
+          "Code": {"source_file": "A", "source_col": "Code"},
+          "Quantite": {"source_file": "A", "source_col": "Quantite"}},
+    "B": {"ID": {"type": "uuid"},
+          "Nom": {"source_file": "B", "source_col": "Nom"},
+          "A": {"source_file": "B", "source_col": "CodeA", "is_ref": True, "ref_model": "A"}},
+}
+
+
+def _write_sources(tmp_path) -> dict:
+    # Par lots de 2: "001"/"002" se lisent comme des nombres, "abc" comme du texte
+    pd.DataFrame({"Code": ["001", "002", "abc", "004", "005"],
+                  "Quantite": ["1", "2", "", "4", "5.5"]}).to_csv(tmp_path / "A.csv", index=False)
+    pd.DataFrame({"Nom": ["x", "y", "z"], "CodeA": ["002", "abc", "005"]}).to_csv(tmp_path / "B.csv", index=False)
+    headers = {}
+    for name in ("A.csv", "B.csv"):
+        headers.update(read_source_headers(tmp_path / name))
+    return headers
+
+
+def _generate(source_files, chunk_size=None) -> dict:
+    writer = get_output_writer("xlsxwriter", reproducible=True)
+    archive = generate_kimaiko_files(MAPPINGS, source_files, output_writer=writer, output_target="memory",
+                                     deterministic_ids=True, chunk_size=chunk_size)
+    with zipfile.ZipFile(archive) as package:
+        return {name: package.read(name) for name in package.namelist() if name.endswith(".xlsx")}
+
+
+def test_batches_keep_the_types_of_a_full_read(tmp_path):
+    headers = _write_sources(tmp_path)
+    batches = list(iter_source_batches(headers["A"], ["Code", "Quantite"], 2))
+
+    assert [value for batch in batches for value in batch["Code"]] == ["001", "002", "abc", "004", "005"]
+    assert all(batch["Quantite"].dtype == "float64" for batch in batches)
+
+
+def test_chunked_output_matches_full_read_when_key_types_differ_across_batches(tmp_path):
+    headers = _write_sources(tmp_path)
+    expected = _generate(load_mapped_sources(headers, MAPPINGS, max_workers=1))
+
+    # B chargé en entier: ses références doivent trouver les clés de A lues par lots
+    loaded_b = {**headers, "B": load_mapped_sources({"B": headers["B"]}, MAPPINGS, max_workers=1)["B"]}
+    for source_files in (headers, loaded_b):
+        assert _generate(source_files, chunk_size=2) == expected
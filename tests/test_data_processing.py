@@ -0,0 +1,85 @@
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_processing import (UuidMap, check_mapping_integrity, create_uuid_mapping, model_namespace,
+                                   uuid5_bytes)
+
+CLEAN_REPORT = {"valid": True, "unique_values": 3, "mapped_values": 3,
+                "missing_count": 0, "missing_values": [], "extra_count": 0, "extra_values": [],
+                "duplicate_uuid_count": 0, "duplicate_uuids": {}}
+
+
+@pytest.mark.parametrize("as_dict", [False, True], ids=["UuidMap", "dict"])
+def test_clean_mapping(as_dict):
+    mapping = create_uuid_mapping(["a", "b", "c"])
+    if as_dict:
+        mapping = dict(mapping.items())
+
+    assert check_mapping_integrity(mapping, ["a", "b", None, "c", "a"]) == CLEAN_REPORT
+
+
+def test_missing_values():
+    report = check_mapping_integrity(create_uuid_mapping(["a"]), ["a", "b", "c", "b"])
+
+    assert not report["valid"]
+    assert (report["missing_count"], report["missing_values"]) == (2, ["b", "c"])
+    assert (report["unique_values"], report["mapped_values"]) == (3, 1)
+
+
+def test_extra_keys():
+    report = check_mapping_integrity(create_uuid_mapping(["a", "b", "z"]), ["a", "b"])
+
+    assert not report["valid"]
+    assert (report["extra_count"], report["extra_values"]) == (1, ["z"])
+    assert report["missing_count"] == 0
+
+
+def test_duplicate_uuids():
+    raw = create_uuid_mapping(["a", "b"]).raw
+    mapping = UuidMap(["a", "b", "c"], np.concatenate([raw, raw[:1]]))
+    shared = mapping["a"]
+
+    report = check_mapping_integrity(mapping, ["a", "b", "c"])
+    assert not report["valid"]
+    assert report["duplicate_uuid_count"] == 1
+    assert report["duplicate_uuids"] == {shared: ["a", "c"]}
+    assert report["missing_count"] == report["extra_count"] == 0
+
+
+def test_examples_are_capped():
+    report = check_mapping_integrity(create_uuid_mapping([]), [f"v{i}" for i in range(20)], max_examples=3)
+
+    assert report["missing_count"] == 20
+    assert report["missing_values"] == ["v0", "v1", "v2"]
+
+
+def test_uuid5_bytes_matches_stdlib():
+    namespace = model_namespace("Fournisseurs")
+    names = ["", "F001", "Société Générale", "a, b", "\x00"]
+
+    raw = uuid5_bytes(namespace, names)
+    assert [bytes(row) for row in raw] == [uuid.uuid5(namespace, name).bytes for name in names]
+
+
+def test_deterministic_ids_of_keys_with_the_same_text_differ():
+    mapping = create_uuid_mapping([1, "1", 2.5, "2.5"], namespace=model_namespace("A"))
+    booleans = create_uuid_mapping([True, "True"], namespace=model_namespace("A"))
+
+    assert len(mapping) == 4 and not mapping.duplicated().any()
+    assert booleans[True] != booleans["True"]
+    # Clés texte: uuid5 de leur texte seul
+    assert mapping["1"] == str(uuid.uuid5(model_namespace("A"), "1"))
+
+
+def test_deterministic_ids_do_not_depend_on_storage():
+    namespace = model_namespace("A")
+    python_keys = create_uuid_mapping([1, 2, datetime(2024, 1, 1)], namespace=namespace)
+    numpy_keys = create_uuid_mapping(np.array([1, 2], dtype=np.int64), namespace=namespace)
+    timestamps = create_uuid_mapping(pd.Series(pd.to_datetime(["2024-01-01"])), namespace=namespace)
+
+    assert numpy_keys[1] == python_keys[1] and numpy_keys[2] == python_keys[2]
+    assert timestamps[pd.Timestamp("2024-01-01")] == python_keys[datetime(2024, 1, 1)]
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.dtype_planner import CATEGORY_MAX_RATIO, DtypePlanner
+
+
+def _spread_column(rows: int, distinct: int) -> pd.Series:
+    # Chaque valeur répétée autant de fois, dans un ordre aléatoire
+    codes = np.random.default_rng(0).permutation(np.arange(rows) % distinct)
+    return pd.Series([f"v{code}" for code in codes], dtype=object)
+
+
+@pytest.mark.parametrize("distinct_ratio, expected", [(0.4, "category"), (0.6, None)])
+def test_sampled_cardinality_matches_full_column_at_threshold(distinct_ratio, expected):
+    rows = 100_000
+    series = _spread_column(rows, int(rows * distinct_ratio))
+    planner = DtypePlanner(sample_size=10_000)
+
+    # Un échantillon de 10k lignes voit plus de 90% de valeurs distinctes dans les deux cas
+    assert planner.plan_column(series) == expected
+    assert DtypePlanner(sample_size=rows).plan_column(series) == expected
+
+
+def test_unsampled_column_uses_exact_ratio():
+    rows = 1_000
+    planner = DtypePlanner(sample_size=rows)
+    below = _spread_column(rows, int(rows * CATEGORY_MAX_RATIO) - 1)
+    at = _spread_column(rows, int(rows * CATEGORY_MAX_RATIO))
+
+    assert planner.plan_column(below) == "category"
+    assert planner.plan_column(at) is None
@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+from utils.excel_writer import get_output_writer
+
+MAX_ROWS = 3
+WRITERS = ["xlsxwriter", "openpyxl"]
+
+
+def _frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({"Code": [f"c{i}" for i in range(rows)], "Valeur": list(range(rows))})
+
+
+def _read_parts(tmp_path, written) -> dict:
+    """{(file, sheet): frame} of every sheet of the written files"""
+    parts = {}
+    for name in written:
+        for sheet, frame in pd.read_excel(tmp_path / name, sheet_name=None).items():
+            parts[(name, sheet)] = frame
+    return parts
+
+
+@pytest.mark.parametrize("writer_name", WRITERS)
+@pytest.mark.parametrize("split_mode", ["files", "sheets"])
+def test_exactly_the_limit_is_not_split(tmp_path, writer_name, split_mode):
+    writer = get_output_writer(writer_name, max_rows=MAX_ROWS, split_mode=split_mode)
+    written = writer.write(_frame(MAX_ROWS), tmp_path / "Modele.xlsx")
+
+    parts = _read_parts(tmp_path, written)
+    assert list(parts) == [("Modele.xlsx", "Sheet1")]
+    pd.testing.assert_frame_equal(parts[("Modele.xlsx", "Sheet1")], _frame(MAX_ROWS))
+
+
+@pytest.mark.parametrize("writer_name", WRITERS)
+@pytest.mark.parametrize("split_mode, expected_parts", [
+    ("files", [("Modele.xlsx", "Sheet1"), ("Modele_2.xlsx", "Sheet1")]),
+    ("sheets", [("Modele.xlsx", "Sheet1"), ("Modele.xlsx", "Sheet1_2")]),
+])
+def test_one_row_over_the_limit_starts_a_part_with_the_header(tmp_path, writer_name, split_mode, expected_parts):
+    df = _frame(MAX_ROWS + 1)
+    writer = get_output_writer(writer_name, max_rows=MAX_ROWS, split_mode=split_mode)
+    written = writer.write(df, tmp_path / "Modele.xlsx")
+
+    parts = _read_parts(tmp_path, written)
+    assert list(parts) == expected_parts
+    first, second = parts.values()
+    # Chaque partie répète l'en-tête et reprend où la précédente s'arrête
+    pd.testing.assert_frame_equal(first, df.iloc[:MAX_ROWS])
+    pd.testing.assert_frame_equal(second, df.iloc[MAX_ROWS:].reset_index(drop=True))
+
+
+@pytest.mark.parametrize("split_mode", ["files", "sheets"])
+@pytest.mark.parametrize("rows", [MAX_ROWS, MAX_ROWS + 1])
+def test_batch_stream_splits_like_write(tmp_path, split_mode, rows):
+    df = _frame(rows)
+    writer = get_output_writer("xlsxwriter", max_rows=MAX_ROWS, split_mode=split_mode)
+    expected = _read_parts(tmp_path / "direct", writer.write(df, tmp_path / "direct" / "Modele.xlsx"))
+
+    with writer.open_stream(tmp_path / "stream" / "Modele.xlsx", list(df.columns)) as stream:
+        for start in range(0, rows, 2):
+            stream.append(df.iloc[start:start + 2])
+    streamed = _read_parts(tmp_path / "stream", stream.written)
+
+    assert list(streamed) == list(expected)
+    for key, frame in expected.items():
+        pd.testing.assert_frame_equal(streamed[key], frame)
@@ -0,0 +1,86 @@
+import zipfile
+
+import pandas as pd
+import pytest
+
+from utils.file_operations import generate_kimaiko_files
+from utils.model_sources import check_model_sources, model_sources
+
+
+def _source(**columns) -> dict:
+    data = pd.DataFrame(columns)
+    return {"data": data, "columns": list(data.columns), "row_count": len(data)}
+
+
+def _generate(mappings, source_files, model="Factures") -> pd.DataFrame:
+    archive = generate_kimaiko_files(mappings, source_files, output_target="memory")
+    with zipfile.ZipFile(archive) as package, package.open(f"fichiers_kimaiko/{model}.xlsx") as f:
+        return pd.read_excel(f, dtype=object)
+
+
+def _factures(**extra) -> dict:
+    return {"Factures": {
+        "ID": {"type": "uuid"},
+        "_sources": {"primary": "SF", "key": "Num",
+                     "joins": [{"source_file": "SC", "left_on": "Client", "right_on": "Code"}]},
+        "Numero": {"source_file": "SF", "source_col": "Num"},
+        **extra,
+    }}
+
+
+def test_mapping_without_sources_entry_keeps_first_column_source_and_key():
+    mappings = {"ID": {"type": "uuid"},
+                "Code": {"source_file": "SC", "source_col": "Code"},
+                "Nom": {"source_file": "SC", "source_col": "Nom"}}
+
+    assert model_sources(mappings, "Clients") == {"primary": "SC", "key": "Code", "joins": []}
+    clients = _generate({"Clients": mappings}, {"SC": _source(Code=["c1", "c2"], Nom=["Un", "Deux"])},
+                        model="Clients")
+    assert clients[["Code", "Nom"]].values.tolist() == [["c1", "Un"], ["c2", "Deux"]]
+
+
+def test_mapping_without_sources_entry_rejects_a_second_file():
+    mappings = {"Code": {"source_file": "SC", "source_col": "Code"},
+                "Total": {"source_file": "SF", "source_col": "Total"}}
+
+    with pytest.raises(ValueError, match="ni une source jointe"):
+        model_sources(mappings, "Clients")
+
+
+def test_join_on_duplicate_key_is_refused():
+    source_files = {"SF": _source(Num=["f1", "f2"], Client=["c1", "c2"]),
+                    "SC": _source(Code=["c1", "c1", "c2"], Nom=["Un", "Un bis", "Deux"])}
+    mappings = _factures(Client={"source_file": "SC", "source_col": "Nom"})
+
+    with pytest.raises(Exception, match="non unique"):
+        _generate(mappings, source_files)
+
+
+def test_missing_join_key_leaves_cells_empty():
+    source_files = {"SF": _source(Num=["f1", "f2", "f3"], Client=["c1", "c9", None]),
+                    "SC": _source(Code=["c1", "c2"], Nom=["Un", "Deux"])}
+    mappings = _factures(Client={"source_file": "SC", "source_col": "Nom"})
+
+    factures = _generate(mappings, source_files)
+    assert factures["Client"].tolist()[0] == "Un"
+    assert factures["Client"].iloc[1:].isna().all()
+
+
+def test_join_key_column_absent_from_source_is_reported():
+    mappings = _factures()
+
+    with pytest.raises(ValueError, match="colonne 'Code' absente de SC"):
+        check_model_sources("Factures", mappings["Factures"], {"SF": ["Num", "Client"], "SC": ["Id", "Nom"]})
+    with pytest.raises(ValueError, match="'left_on' et 'right_on'"):
+        model_sources({"_sources": {"primary": "SF", "joins": [{"source_file": "SC", "left_on": "Client"}]}},
+                      "Factures")
+
+
+def test_colliding_column_names_come_from_their_own_file():
+    source_files = {"SF": _source(Num=["f1", "f2"], Client=["c2", "c1"], Nom=["Facture 1", "Facture 2"]),
+                    "SC": _source(Code=["c1", "c2"], Nom=["Un", "Deux"])}
+    mappings = _factures(Libelle={"source_file": "SF", "source_col": "Nom"},
+                         Client={"source_file": "SC", "source_col": "Nom"})
+
+    factures = _generate(mappings, source_files)
+    assert factures[["Libelle", "Client"]].values.tolist() == [["Facture 1", "Deux"], ["Facture 2", "Un"]]
@@ -0,0 +1,61 @@
+import io
+import struct
+import zipfile
+
+import pandas as pd
+
+from utils.file_operations import generate_kimaiko_files
+from utils.packaging import BufferSink, ZipPackage
+
+
+def _package() -> bytes:
+    package = ZipPackage("memory")
+    with package.open("fichiers_kimaiko/A.xlsx") as f:
+        f.write(b"streamed")
+    buffered = BufferSink()
+    with buffered.open("fichiers_kimaiko/B.csv") as f:
+        f.write(b"buffered")
+    package.add_entries(buffered)
+    package.add_entries([("fichiers_kimaiko/C.csv", b"bytes")])
+    package.write_text("README.md", "Lisez-moi")
+    return package.fileobj().getvalue()
+
+
+def _local_extra_length(archive: bytes, info: zipfile.ZipInfo) -> int:
+    _, extra_length = struct.unpack("<HH", archive[info.header_offset + 26:info.header_offset + 30])
+    return extra_length
+
+
+def test_archive_bytes_only_depend_on_content():
+    archive = _package()
+
+    assert _package() == archive
+    with zipfile.ZipFile(io.BytesIO(archive)) as package:
+        assert {info.date_time for info in package.infolist()} == {(1980, 1, 1, 0, 0, 0)}
+        assert package.read("fichiers_kimaiko/B.csv") == b"buffered"
+
+
+def test_zip64_records_only_for_entries_of_unknown_size():
+    archive = _package()
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as package:
+        extra = {info.filename: _local_extra_length(archive, info) for info in package.infolist()}
+    # Seule l'entrée écrite en flux garde l'extension ZIP64 (20 octets)
+    assert extra == {"fichiers_kimaiko/A.xlsx": 20, "fichiers_kimaiko/B.csv": 0,
+                     "fichiers_kimaiko/C.csv": 0, "README.md": 0}
+
+
+def test_generated_entries_are_identical_between_runs():
+    data = pd.DataFrame({"Code": ["c1", "c2"], "Nom": ["Un", "Deux"]})
+    source_files = {"S": {"data": data, "columns": list(data.columns), "row_count": len(data)}}
+    mappings = {"Clients": {"ID": {"type": "uuid"}, "Code": {"source_file": "S", "source_col": "Code"},
+                            "Nom": {"source_file": "S", "source_col": "Nom"}}}
+
+    runs = []
+    for _ in range(2):
+        with zipfile.ZipFile(generate_kimaiko_files(mappings, source_files, output_target="memory",
+                                                   deterministic_ids=True)) as package:
+            # performances.json contient les durées mesurées
+            runs.append({info.filename: (info.CRC, info.date_time) for info in package.infolist()
+                         if not info.filename.endswith("performances.json")})
+    assert runs[0] == runs[1]
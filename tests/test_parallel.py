@@ -0,0 +1,26 @@
+import zipfile
+
+import pandas as pd
+
+from utils.excel_writer import get_output_writer
+from utils.file_operations import generate_kimaiko_files
+
+
+def _entries(max_workers: int) -> dict:
+    data = pd.DataFrame({"Code": ["a", "b", "c"], "Parent": ["b", None, "a"]})
+    source_files = {"Source": {"data": data, "columns": list(data.columns), "row_count": len(data)}}
+    mappings = {
+        "A": {"ID": {"type": "uuid"}, "Code": {"source_file": "Source", "source_col": "Code"}},
+        "B": {"ID": {"type": "uuid"}, "Code": {"source_file": "Source", "source_col": "Code"}},
+        "C": {"ID": {"type": "uuid"}, "Code": {"source_file": "Source", "source_col": "Code"},
+              "Parent": {"source_file": "Source", "source_col": "Parent", "is_ref": True, "ref_model": "A"}},
+    }
+    writer = get_output_writer("xlsxwriter", reproducible=True)
+    archive = generate_kimaiko_files(mappings, source_files, output_writer=writer, output_target="memory",
+                                     max_workers=max_workers, deterministic_ids=True)
+    with zipfile.ZipFile(archive) as package:
+        return {name: package.read(name) for name in package.namelist() if name.endswith(".xlsx")}
+
+
+def test_files_identical_whatever_the_number_of_workers():
+    assert _entries(1) == _entries(2)
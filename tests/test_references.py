@@ -0,0 +1,64 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_processing import create_uuid_mapping
+from utils.diagnostics import DEFAULT_MAX_MESSAGES, DiagnosticsCollector
+from utils.file_operations import generate_kimaiko_files, map_multi_references, resolve_multi_references
+
+CASES = {
+    "single": (["a", "b", "c"], ["a", "c", "b"]),
+    "multi_value_cells": (["a", "b", "c"], ["a, b", "c, a, b", "b, b"]),
+    "separator_whitespace": (["a", "b"], [" a , b", "a,  b", "a,b", "a, ", " b "]),
+    "missing_keys": (["a", "b"], ["zz", "a, zz", "zz, yy", ""]),
+    "nan": (["a", "b"], [None, "a", np.nan, "b, a"]),
+    "numeric_key_string_reference": ([1, 2], ["1", "2, 1", "3"]),
+    "string_key_numeric_reference": (["1", "2", "2.5"], [1, 2.5, np.nan, 3]),
+    "numeric_key_numeric_reference": ([1, 2], [1, 2, 3]),
+}
+
+
+@pytest.mark.parametrize("keys, cells", CASES.values(), ids=CASES.keys())
+def test_vectorised_resolution_matches_cell_by_cell_mapping(keys, cells):
+    uuid_map = create_uuid_mapping(keys)
+    values = pd.Series(cells, name="Ref")
+
+    expected = [map_multi_references(value, dict(uuid_map.items()), diagnostics=DiagnosticsCollector())
+                for value in values]
+    resolved, summary = resolve_multi_references(values, uuid_map)
+
+    assert resolved.tolist() == expected
+    assert summary["mapped_cells"] == sum(1 for text in expected if text)
+
+
+def test_arrow_strings_resolve_like_python_strings():
+    pytest.importorskip("pyarrow")
+    uuid_map = create_uuid_mapping(["a", "b"])
+    cells = ["a, b", None, " b", "zz, a"]
+
+    expected, _ = resolve_multi_references(pd.Series(cells, dtype=object), uuid_map)
+    resolved, _ = resolve_multi_references(pd.Series(cells, dtype="string[pyarrow]"), uuid_map)
+
+    assert resolved.tolist() == expected.tolist()
+
+
+def test_warning_rate_limit_is_per_generation_run(caplog):
+    data = pd.DataFrame({"Code": ["a"], "Ref": ["absente"]})
+    source_files = {"S": {"data": data, "columns": list(data.columns), "row_count": len(data)}}
+    mappings = {"A": {"ID": {"type": "uuid"}, "Code": {"source_file": "S", "source_col": "Code"}},
+                "B": {"ID": {"type": "uuid"}, "Code": {"source_file": "S", "source_col": "Code"},
+                      "A": {"source_file": "S", "source_col": "Ref", "is_ref": True, "ref_model": "A"}}}
+
+    for _ in range(DEFAULT_MAX_MESSAGES + 1):
+        with caplog.at_level(logging.WARNING):
+            caplog.clear()
+            generate_kimaiko_files(mappings, source_files, output_target="memory").close()
+        # Chaque génération résume ses propres références non mappées
+        assert "Références non mappées B.A -> A: 1 sur 1 cellules" in caplog.text
+    for _ in range(DEFAULT_MAX_MESSAGES + 1):
+        caplog.clear()
+        with caplog.at_level(logging.WARNING):
+            map_multi_references("absente", {})
+        assert "Référence non trouvée" in caplog.text
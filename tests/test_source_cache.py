@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.file_operations import SourceCache
+
+
+def _cache() -> tuple[SourceCache, pd.DataFrame]:
+    data = pd.DataFrame({"Code": ["c1", "c2", "c3"], "Nom": ["Un", "Deux", "Trois"], "Total": [1.5, 2.5, 3.5]})
+    return SourceCache({"S": {"data": data, "columns": list(data.columns)}}), data.copy()
+
+
+def test_mutating_a_returned_frame_leaves_the_cache_unchanged():
+    cache, original = _cache()
+    prepared = cache.frame("S").copy()
+
+    df = cache.frame("S")
+    df["Nom"] = "modifié"
+    df.loc[0, "Total"] = -1.0
+    df.drop(columns=["Code"], inplace=True)
+    df.rename(columns={"Total": "Montant"}, inplace=True)
+    column = cache.column("S", "Total")
+    column.iloc[1] = -2.0
+
+    pd.testing.assert_frame_equal(cache.frame("S"), prepared)
+    pd.testing.assert_series_equal(cache.column("S", "Total"), prepared["Total"])
+    pd.testing.assert_frame_equal(cache.source_files["S"]["data"], original)
+
+
+def test_key_index_rows_are_read_only():
+    cache, _ = _cache()
+    _, rows = cache.key_index("S", ["Code"])
+
+    with pytest.raises(ValueError):
+        rows[0] = 2
+    index, cached_rows = cache.key_index("S", ["Code"])
+    assert index.tolist() == ["c1", "c2", "c3"]
+    np.testing.assert_array_equal(cached_rows, [0, 1, 2])
+
+
+def test_bytes_saved_counts_the_avoided_copies():
+    cache, original = _cache()
+    for _ in range(3):
+        cache.frame("S")
+
+    stats = cache.stats()
+    assert (stats["sources_prepared"], stats["cache_hits"]) == (1, 2)
+    assert stats["bytes_saved"] == 2 * original.copy().memory_usage(index=True, deep=False).sum()
@@ -0,0 +1,24 @@
+import io
+
+import pandas as pd
+import pytest
+
+from utils.source_loader import read_source_headers
+
+CSV_FILES = {
+    "plain": b"Code,Nom\r\nc1,Un\r\nc2,Deux",
+    "blank_lines": b"\nCode,Nom\nc1,Un\n\nc2,Deux\n\n",
+    "quoted_multiline": b'Code;Nom\nc1;"Un\nsur deux lignes"\nc2;"Deux"\n\nc3;Trois\n',
+    "header_only": b"Code,Nom\n",
+}
+
+
+@pytest.mark.parametrize("content", CSV_FILES.values(), ids=CSV_FILES.keys())
+def test_csv_row_count_matches_loaded_rows(tmp_path, content):
+    path = tmp_path / "Clients.csv"
+    path.write_bytes(content)
+    sep = ";" if b";" in content else ","
+
+    expected = len(pd.read_csv(io.BytesIO(content), sep=sep))
+    assert read_source_headers(path)["Clients"]["row_count"] == expected
+    assert read_source_headers(io.BytesIO(content), filename="Clients.csv")["Clients"]["row_count"] == expected
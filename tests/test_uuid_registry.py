@@ -0,0 +1,82 @@
+import zipfile
+
+import pandas as pd
+import pytest
+
+from utils.data_processing import check_mapping_integrity
+from utils.file_operations import generate_kimaiko_files
+from utils.uuid_registry import UuidRegistry
+
+
+def _ids(archive) -> pd.Series:
+    with zipfile.ZipFile(archive) as package, package.open("fichiers_kimaiko/A.xlsx") as f:
+        return pd.read_excel(f)["ID"]
+
+
+def test_datetime_keys_reused_on_second_run(tmp_path):
+    data = pd.DataFrame({"Date": pd.to_datetime(["2024-01-01 00:00", "2024-01-02 08:30"]), "Nom": ["a", "b"]})
+    source_files = {"Source": {"data": data, "columns": list(data.columns), "row_count": len(data)}}
+    mappings = {"A": {"ID": {"type": "uuid"},
+                      "Date": {"source_file": "Source", "source_col": "Date"},
+                      "Nom": {"source_file": "Source", "source_col": "Nom"}}}
+
+    runs = []
+    for _ in range(2):
+        registry = UuidRegistry(tmp_path / "registre.db")
+        try:
+            archive = generate_kimaiko_files(mappings, source_files, output_target="memory", registry=registry)
+            runs.append(_ids(archive))
+        finally:
+            registry.close()
+
+    assert runs[0].notna().all()
+    pd.testing.assert_series_equal(runs[0], runs[1])
+
+
+def _delta_rows(source_files, mappings, registry_path) -> pd.DataFrame:
+    registry = UuidRegistry(registry_path)
+    try:
+        archive = generate_kimaiko_files(mappings, source_files, output_target="memory",
+                                         registry=registry, delta=True)
+        with zipfile.ZipFile(archive) as package, package.open("fichiers_kimaiko/A.xlsx") as f:
+            return pd.read_excel(f)
+    finally:
+        registry.close()
+
+
+def test_failed_run_does_not_record_row_hashes(tmp_path):
+    def sources(names):
+        a = pd.DataFrame({"Code": ["x", "y"], "Nom": names})
+        b = pd.DataFrame({"Code": ["z"]})
+        return {"SA": {"data": a, "columns": list(a.columns), "row_count": len(a)},
+                "SB": {"data": b, "columns": list(b.columns), "row_count": len(b)}}
+    mappings = {"A": {"ID": {"type": "uuid"},
+                      "Code": {"source_file": "SA", "source_col": "Code"},
+                      "Nom": {"source_file": "SA", "source_col": "Nom"}},
+                "B": {"ID": {"type": "uuid"}, "Code": {"source_file": "SB", "source_col": "Code"}}}
+    failing = {**mappings, "B": {**mappings["B"], "Nom": {"source_file": "SB", "source_col": "Absente"}}}
+    registry_path = tmp_path / "registre.db"
+
+    assert len(_delta_rows(sources(["a", "b"]), mappings, registry_path)) == 2
+    # B échoue après l'écriture de A: l'archive est abandonnée
+    with pytest.raises(Exception):
+        _delta_rows(sources(["a", "b2"]), failing, registry_path)
+
+    retry = _delta_rows(sources(["a", "b2"]), mappings, registry_path)
+    assert retry["Nom"].tolist() == ["b2"]
+
+
+def test_integrity_check_only_requires_keys_issued_by_this_run(tmp_path):
+    registry = UuidRegistry(tmp_path / "registre.db")
+    try:
+        registry.extend("A", ["a", "b"])
+        uuid_map, new_count = registry.extend("A", ["a", "c"])
+    finally:
+        registry.close()
+    new_keys = uuid_map.index[len(uuid_map) - new_count:]
+
+    # "b" vient de l'exécution précédente: absent de la source, il reste accepté
+    assert check_mapping_integrity(uuid_map, ["a", "c"], new_keys=new_keys)["valid"]
+    report = check_mapping_integrity(uuid_map, ["a"], new_keys=new_keys)
+    assert not report["valid"]
+    assert report["extra_values"] == ["c"]
@@ -2,6 +2,8 @@ import streamlit as st
 from pathlib import Path
 from utils.file_operations import load_demo_files, generate_kimaiko_files
 from utils.demo_config import DEFAULT_MAPPINGS, DEMO_DESCRIPTIONS
+from utils.profiling import StageProfiler
+from ui.standard_mode import render_performance_report
 
 def render_demo_mode():
     """Render the demo mode interface"""
@@ -57,9 +59,14 @@ def render_demo_mode():
         # File generation
         if st.button("✨ Générer et télécharger les résultats"):
             with st.spinner("Génération des fichiers en cours..."):
-                zip_data = generate_kimaiko_files(st.session_state.mappings, st.session_state.source_files)
+                # st.download_button attend des octets: l'archive est lue une seule fois puis fermée
+                profiler = StageProfiler()
+                with generate_kimaiko_files(st.session_state.mappings, st.session_state.source_files,
+                                            profiler=profiler) as archive:
+                    zip_data = archive.read()
                 
                 st.success("✅ Fichiers générés avec succès!")
+                render_performance_report(profiler)
                 
                 st.download_button(
                     label="📥 Télécharger le dossier des résultats",
@@ -1,8 +1,11 @@
 import streamlit as st
-import pandas as pd
 from pathlib import Path
 import logging
-from utils.file_operations import generate_kimaiko_files, optimize_dataframe
+from utils.file_operations import generate_kimaiko_files, read_template_columns
+from utils.model_sources import SOURCES_KEY
+from utils.parse_cache import ParseCache
+from utils.profiling import StageProfiler
+from utils.source_loader import SOURCE_EXTENSIONS, load_mapped_sources, read_source_headers
 
 # Configure logging
 logging.basicConfig(
@@ -10,6 +13,65 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+def render_source_summary(source: dict):
+    """Show the row count, preview and columns of a source read with read_source_headers"""
+    if source['row_count'] is not None:
+        st.write(f"Nombre total de lignes: {source['row_count']:,}")
+    st.write("Aperçu des données (5 premières lignes):")
+    st.dataframe(source['preview'])
+    st.write("Colonnes disponibles:")
+    for col in source['columns']:
+        st.markdown(f"- {col}")
+
+def render_performance_report(profiler: StageProfiler):
+    """Table of the time and memory spent in each generation stage"""
+    summary = profiler.summary()
+    if summary.empty:
+        return
+    with st.expander("⏱️ Performances par étape"):
+        st.dataframe(summary.rename(columns={
+            "model": "Modèle", "stage": "Étape", "calls": "Appels", "wall_s": "Durée (s)",
+            "cpu_s": "CPU (s)", "rows": "Lignes", "peak_rss_mb": "Mémoire max (Mo)"
+        }), hide_index=True)
+        st.caption("Détail complet dans performances.json, inclus dans l'archive")
+
+def render_join_settings(template_name: str, template_mapping: dict):
+    """Choose the primary source and the join keys of a model fed by several source files"""
+    used_sources = list(dict.fromkeys(
+        mapping["source_file"] for col, mapping in template_mapping.items()
+        if col != SOURCES_KEY and isinstance(mapping, dict) and "source_file" in mapping
+    ))
+    if len(used_sources) < 2:
+        template_mapping.pop(SOURCES_KEY, None)
+        return
+    
+    with st.expander("🔗 Sources et jointures", expanded=True):
+        st.caption("Les lignes de fichiers différents sont associées par une clé commune, jamais par leur position.")
+        primary = st.selectbox(
+            "Source principale (une ligne du modèle par ligne de cette source)",
+            options=used_sources,
+            key=f"{template_name}_primary_source"
+        )
+        joins = []
+        for source in used_sources:
+            if source == primary:
+                continue
+            left, right = st.columns(2)
+            with left:
+                left_on = st.selectbox(
+                    f"Clé dans {primary}",
+                    options=st.session_state.source_files[primary]['columns'],
+                    key=f"{template_name}_{source}_left_on"
+                )
+            with right:
+                right_on = st.selectbox(
+                    f"Clé correspondante dans {source}",
+                    options=st.session_state.source_files[source]['columns'],
+                    key=f"{template_name}_{source}_right_on"
+                )
+            joins.append({"source_file": source, "left_on": left_on, "right_on": right_on})
+        template_mapping[SOURCES_KEY] = {"primary": primary, "joins": joins}
+
 def render_standard_mode():
     """Render the standard mode interface"""
     if st.session_state.step == 1:
@@ -34,12 +96,12 @@ def render_standard_mode():
                 for i, file in enumerate(uploaded_files):
                     name = Path(file.name).stem
                     try:
-                        df = pd.read_excel(file)
-                        st.session_state.kimaiko_templates[name] = df.columns.tolist()
+                        columns = read_template_columns(file)
+                        st.session_state.kimaiko_templates[name] = columns
                         
                         with st.expander(f"📑 Modèle {name}"):
                             st.write("Colonnes requises:")
-                            for col in df.columns:
+                            for col in columns:
                                 st.markdown(f"- {col}")
                         
                         progress_bar.progress((i + 1) / len(uploaded_files))
@@ -65,16 +127,17 @@ def render_standard_mode():
             st.session_state.uploaded_source_files = set()
         
         uploaded_files = st.file_uploader(
-            "Choisissez vos fichiers sources (Excel)",
-            type=['xlsx'],
+            "Choisissez vos fichiers sources (Excel, CSV, Parquet, Arrow)",
+            type=SOURCE_EXTENSIONS,
             accept_multiple_files=True,
             key="source_upload"
         )
         
         if uploaded_files:
-            current_files = {Path(file.name).stem for file in uploaded_files}
+            current_files = {(file.name, file.size) for file in uploaded_files}
             
-            # Only process files if the set of uploaded files has changed
+            # Only process files if the set of uploaded files has changed; files
+            # already parsed (same content hash) are read back from the cache
             if current_files != st.session_state.uploaded_source_files:
                 with st.spinner("Chargement des données sources..."):
                     st.session_state.source_files = {}
@@ -83,25 +146,16 @@ def render_standard_mode():
                     for i, file in enumerate(uploaded_files):
                         name = Path(file.name).stem
                         try:
-                            df = pd.read_excel(file)
-                            df = optimize_dataframe(df)  # Optimize memory usage
-                            
-                            row_count = len(df)
-                            st.session_state.source_files[name] = {
-                                'columns': df.columns.tolist(),
-                                'data': df,
-                                'row_count': row_count
-                            }
+                            # En-têtes et aperçu seulement: les colonnes mappées sont lues à la génération
+                            # Une source par feuille pour les classeurs à plusieurs feuilles ("fichier/feuille")
+                            sources = read_source_headers(file, file.name, cache=ParseCache.default())
+                            st.session_state.source_files.update(sources)
                             
                             progress_bar.progress((i + 1) / len(uploaded_files))
                             
-                            with st.expander(f"📊 Données {name}"):
-                                st.write(f"Nombre total de lignes: {row_count:,}")
-                                st.write("Aperçu des données (5 premières lignes):")
-                                st.dataframe(df.head())
-                                st.write("Colonnes disponibles:")
-                                for col in df.columns:
-                                    st.markdown(f"- {col}")
+                            for source_name, source in sources.items():
+                                with st.expander(f"📊 Données {source_name}"):
+                                    render_source_summary(source)
                         except Exception as e:
                             st.error(f"Erreur lors du chargement de {name}: {str(e)}")
                             logging.error(f"Erreur lors du chargement de {name}: {str(e)}")
@@ -112,12 +166,7 @@ def render_standard_mode():
                 # Display existing file information
                 for name, info in st.session_state.source_files.items():
                     with st.expander(f"📊 Données {name}"):
-                        st.write(f"Nombre total de lignes: {info['row_count']:,}")
-                        st.write("Aperçu des données (5 premières lignes):")
-                        st.dataframe(info['data'].head())
-                        st.write("Colonnes disponibles:")
-                        for col in info['columns']:
-                            st.markdown(f"- {col}")
+                        render_source_summary(info)
             
             col1, col2 = st.columns(2)
             with col1:
@@ -192,24 +241,42 @@ def render_standard_mode():
                                             "source_col": source_col,
                                             "is_ref": is_ref
                                         }
+                
+                # Plusieurs fichiers sources: source principale et clés de jointure
+                render_join_settings(template_name, template_mapping)
 
         # Generate files
         if st.button("✨ Générer et télécharger les résultats"):
             try:
                 with st.spinner("Génération des fichiers en cours... Cette opération peut prendre quelques minutes pour les grands fichiers."):
                     logging.info("Début de la génération des fichiers")
-                    logging.info(f"Mappings configurés: {st.session_state.mappings}")
+                    # Le détail des mappings peut être volumineux: résumé seulement, détail en DEBUG
+                    logging.info("Mappings configurés: %d modèles, %d colonnes", len(st.session_state.mappings),
+                                 sum(len(m) for m in st.session_state.mappings.values()))
+                    logging.debug("Détail des mappings: %s", st.session_state.mappings)
                     
-                    # Calcul des statistiques avant la génération
-                    total_rows = sum(info['row_count'] for info in st.session_state.source_files.values())
+                    # Lecture des seules colonnes mappées; les données ne restent pas en session
+                    sources_progress = st.progress(0, text="Lecture des fichiers sources...")
+                    source_files = load_mapped_sources(
+                        st.session_state.source_files, st.session_state.mappings,
+                        cache=ParseCache.default(),
+                        progress_callback=lambda name, done, total: sources_progress.progress(
+                            done / total, text=f"Fichier source {name} lu ({done}/{total})")
+                    )
+                    total_rows = sum(info['row_count'] or 0 for info in source_files.values())
                     
                     # Génération des fichiers sans les statistiques
-                    zip_data = generate_kimaiko_files(st.session_state.mappings, st.session_state.source_files)
+                    # st.download_button attend des octets: l'archive est lue une seule fois puis fermée
+                    profiler = StageProfiler()
+                    with generate_kimaiko_files(st.session_state.mappings, source_files, profiler=profiler) as archive:
+                        zip_data = archive.read()
+                    del source_files
                     
                     st.success("✅ Fichiers générés avec succès!")
                     
                     # Affichage des statistiques uniquement dans l'interface
                     st.info(f"📊 Statistiques:\n- {len(st.session_state.source_files):,} fichiers traités\n- {total_rows:,} lignes au total")
+                    render_performance_report(profiler)
                     
                     st.download_button(
                         label="📥 Télécharger le dossier des résultats",
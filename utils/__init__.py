@@ -1,13 +1,15 @@
 # Utils package initialization
-from .data_processing import generate_uuid, create_uuid_mapping
-from .file_operations import load_demo_files, generate_kimaiko_files
+from .data_processing import generate_uuid, create_uuid_mapping, UuidMap
+from .file_operations import load_demo_files, generate_kimaiko_files, read_template_columns
 from .demo_config import DEFAULT_MAPPINGS, DEMO_DESCRIPTIONS
 
 __all__ = [
     'generate_uuid',
     'create_uuid_mapping',
+    'UuidMap',
     'load_demo_files',
     'generate_kimaiko_files',
+    'read_template_columns',
     'DEFAULT_MAPPINGS',
     'DEMO_DESCRIPTIONS'
 ]
@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+import logging
+import traceback
+from .data_processing import (check_mapping_integrity, create_uuid_mapping, model_namespace,
+                              unique_non_na, as_uuid_map)
+from .diagnostics import DiagnosticsCollector
+from .excel_writer import OutputWriter
+from .file_operations import SourceCache, process_model_references
+from .model_sources import model_sources
+from .packaging import OutputSink
+from .profiling import StageProfiler
+from .source_loader import iter_source_batches, load_mapped_sources
+from .uuid_registry import UuidRegistry
+
+# Lignes lues, résolues et écrites à la fois en génération par lots
+DEFAULT_CHUNK_SIZE = 100_000
+
+def joined_source_names(mappings: Dict) -> List[str]:
+    """Sources joined by at least one model: they are held in memory in chunked generation"""
+    names = []
+    for model_name, model_mappings in mappings.items():
+        for join in model_sources(model_mappings, model_name)["joins"]:
+            if join["source_file"] not in names:
+                names.append(join["source_file"])
+    return names
+
+def load_joined_sources(mappings: Dict, source_files: Dict, arrow_strings: bool = False) -> Dict:
+    """
+    Load the joined sources of the mapping (see joined_source_names).
+
+    Primary sources are left as they are (headers only, or already loaded):
+    they are only read batch by batch.
+
+    Returns:
+        New source_files dict whose joined entries have their 'data'
+    """
+    joined = {name: source_files[name] for name in joined_source_names(mappings) if name in source_files}
+    return {**source_files, **load_mapped_sources(joined, mappings, max_workers=1, arrow_strings=arrow_strings)}
+
+def primary_columns(model_mappings: Dict, model_name: str = "") -> List:
+    """Columns read from the primary source of a model: key, mapped columns and join keys"""
+    sources = model_sources(model_mappings, model_name)
+    columns = [sources["key"]]
+    columns += [mapping["source_col"] for col, mapping in model_mappings.items()
+                if col != "ID" and isinstance(mapping, dict) and mapping.get("source_file") == sources["primary"]]
+    for join in sources["joins"]:
+        if join["from"] == sources["primary"]:
+            columns += join["left_on"]
+    return list(dict.fromkeys(columns))
+
+def _merge_uniques(merged, pending: List):
+    parts = pending if merged is None else [merged, *pending]
+    if not parts:
+        return np.empty(0, dtype=object)
+    # pd.concat garde le type des valeurs (ex. chaînes Arrow), sans objet Python par clé
+    return pd.unique(pd.concat([pd.Series(part, copy=False) for part in parts], ignore_index=True))
+
+def streaming_unique_keys(source: Dict, key_col, chunk_size: int) -> tuple:
+    """
+    Unique non-NA values of a key column, read batch by batch.
+
+    Uniques of the batches are merged once they outnumber those already merged,
+    so the merge cost stays linear and memory holds the keys plus one batch.
+
+    Returns:
+        Tuple of (unique values in order of first appearance, like unique_non_na;
+        counts of total and NA values)
+    """
+    merged = None
+    pending = []
+    pending_len = 0
+    counts = {"total_values": 0, "na_values": 0}
+    for batch in iter_source_batches(source, [key_col], chunk_size):
+        values = batch[key_col]
+        counts["total_values"] += len(values)
+        counts["na_values"] += int(values.isna().sum())
+        pending.append(unique_non_na(values))
+        pending_len += len(pending[-1])
+        if pending_len >= max(0 if merged is None else len(merged), chunk_size):
+            merged = _merge_uniques(merged, pending)
+            pending, pending_len = [], 0
+    if pending or merged is None:
+        merged = _merge_uniques(merged, pending)
+    return merged, counts
+
+def streaming_uuid_mappings(processing_order: List[str], mappings: Dict, source_files: Dict,
+                            chunk_size: int = DEFAULT_CHUNK_SIZE, deterministic_ids: bool = False,
+                            registry: Optional[UuidRegistry] = None,
+                            profiler: Optional[StageProfiler] = None) -> tuple[Dict, Dict[str, Dict[str, int]]]:
+    """
+    First pass of chunked generation: the UUID map of each model.
+
+    Only the key column of each primary source is read, batch by batch (see
+    streaming_unique_keys), and the map is checked like in process_model_data.
+
+    Returns:
+        Tuple of (UuidMap per model; mapping statistics per model)
+
+    Raises:
+        ValueError: If a mapping fails its integrity check
+    """
+    profiler = profiler or StageProfiler()
+    uuid_mappings = {}
+    mapping_stats = {}
+    for model_name in processing_order:
+        sources = model_sources(mappings[model_name], model_name)
+        if sources["primary"] is None:
+            continue
+        if sources["primary"] not in source_files:
+            raise ValueError(f"Fichier source '{sources['primary']}' non trouvé")
+        namespace = model_namespace(model_name) if deterministic_ids else None
+        with profiler.stage(model_name, "uuid_mapping") as record:
+            unique_values, counts = streaming_unique_keys(source_files[sources["primary"]], sources["key"], chunk_size)
+            new_keys = None
+            if registry is not None:
+                uuid_map, new_count = registry.extend(model_name, unique_values, namespace=namespace)
+                new_keys = uuid_map.index[len(uuid_map) - new_count:]
+            else:
+                uuid_map = create_uuid_mapping(unique_values, namespace=namespace)
+            record["rows"] = counts["total_values"]
+
+        with profiler.stage(model_name, "integrity_check", rows=len(unique_values)):
+            integrity = check_mapping_integrity(uuid_map, unique_values, new_keys=new_keys)
+        if not integrity["valid"]:
+            logging.error(f"Échec de la vérification d'intégrité du mapping UUID pour {model_name}: {integrity}")
+            raise ValueError(f"Échec de la vérification d'intégrité du mapping UUID pour {model_name}")
+
+        uuid_mappings[model_name] = uuid_map
+        mapping_stats[model_name] = {
+            "total_values": counts["total_values"],
+            "unique_values": len(unique_values),
+            "mapped_values": len(uuid_map),
+            "na_values": counts["na_values"]
+        }
+        logging.info("Statistiques de mapping pour %s: %s", model_name, mapping_stats[model_name])
+    return uuid_mappings, mapping_stats
+
+def generate_model_file_chunked(model_name: str, model_mappings: Dict, source_files: Dict, uuid_mappings: Dict,
+                                output_writer: OutputWriter, sink: OutputSink, source_cache: SourceCache,
+                                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                profiler: Optional[StageProfiler] = None,
+                                diagnostics: Optional[DiagnosticsCollector] = None) -> int:
+    """
+    Second pass of chunked generation: stream one model to sink, batch by batch.
+
+    Each batch of primary source rows gets its IDs from the model's UUID map,
+    is joined onto the in-memory secondary sources and has its references
+    resolved (see process_model_references), then is appended to the model
+    file (see OutputWriter.open_stream). Only one batch of rows is held at a time.
+
+    Returns:
+        Number of rows written
+    """
+    profiler = profiler or StageProfiler()
+    sources = model_sources(model_mappings, model_name)
+    uuid_map = as_uuid_map(uuid_mappings[model_name])
+    key_col = sources["key"]
+    header = ["ID"] + [col for col, mapping in model_mappings.items()
+                       if col != "ID" and isinstance(mapping, dict) and "source_file" in mapping]
+    output_path = f"fichiers_kimaiko/{model_name}.xlsx"
+    batch = None
+    final_df = None
+    try:
+        with profiler.stage(model_name, "total") as model_record:
+            logging.info("Traitement par lots du modèle %s, fichier source: %s (%d lignes par lot)",
+                         model_name, sources["primary"], chunk_size)
+            batches = iter_source_batches(source_files[sources["primary"]],
+                                          primary_columns(model_mappings, model_name), chunk_size)
+            with output_writer.open_stream(output_path, header, sink=sink) as stream:
+                while True:
+                    with profiler.stage(model_name, "load_source") as record:
+                        batch = next(batches, None)
+                        record["rows"] = 0 if batch is None else len(batch)
+                    if batch is None:
+                        break
+
+                    with profiler.stage(model_name, "assign_ids", rows=len(batch)):
+                        final_df = pd.DataFrame({"ID": uuid_map.codes(batch[key_col])})
+                        unmapped = final_df["ID"].to_numpy() < 0
+                    if unmapped.any():
+                        missing_values = batch[key_col][unmapped].unique()
+                        logging.error(f"Les valeurs suivantes n'ont pas pu être mappées : {missing_values}")
+                        raise ValueError(f"Certains UUID n'ont pas pu être mappés pour le modèle {model_name}")
+
+                    formatters = {"ID": uuid_map.formatter()}
+                    formatters.update(process_model_references(
+                        final_df, model_mappings, source_files, uuid_mappings,
+                        source_cache=source_cache, model_name=model_name,
+                        profiler=profiler, diagnostics=diagnostics, primary=batch
+                    ))
+                    with profiler.stage(model_name, "write", rows=len(final_df)):
+                        stream.append(final_df[header], formatters)
+                    batch = final_df = None
+            model_record["rows"] = stream.rows
+            logging.info("Fichier sauvegardé avec succès: %s (%d lignes)", ", ".join(stream.written), stream.rows)
+            return stream.rows
+    except Exception as e:
+        logging.error(f"Erreur lors du traitement du modèle {model_name}")
+        logging.error(f"Message d'erreur: {str(e)}")
+        logging.error(f"Traceback: {traceback.format_exc()}")
+        raise Exception(f"'{model_name}': {str(e)}")
+    finally:
+        batch = final_df = None
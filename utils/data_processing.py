@@ -1,26 +1,291 @@
 import uuid
-from typing import Dict, List, Set, Any
+import hashlib
+import numbers
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional, Set, Any
+import numpy as np
 import pandas as pd
 import logging
 import json
 import os
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Espace de noms racine des UUID déterministes (uuid5)
+KIMAIKO_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "import.kimaiko")
+
+# Two hex digits for each byte value, read as one uint16 per byte
+_HEX_PAIRS = np.frombuffer(b"".join(f"{i:02x}".encode("ascii") for i in range(256)), dtype=np.uint16)
+# Value of each ASCII hex digit, 255 for any other byte
+_HEX_VALUES = np.full(256, 255, dtype=np.uint8)
+for _digit in "0123456789abcdefABCDEF":
+    _HEX_VALUES[ord(_digit)] = int(_digit, 16)
+# (start, end) in the 36-character canonical form, start in the 32 hex digits
+_UUID_GROUPS = [(0, 8, 0), (9, 13, 8), (14, 18, 12), (19, 23, 16), (24, 36, 20)]
+_UUID_DASHES = [8, 13, 18, 23]
+
 def generate_uuid() -> str:
     """Generate a unique UUID string"""
     return str(uuid.uuid4())
 
-def create_uuid_mapping(values) -> Dict[str, str]:
+def model_namespace(model_name: str, root: uuid.UUID = KIMAIKO_NAMESPACE) -> uuid.UUID:
+    """Namespace used to derive the deterministic UUIDs of one model"""
+    return uuid.uuid5(root, model_name)
+
+def format_uuid_bytes(raw: np.ndarray) -> np.ndarray:
+    """
+    Format 16-byte UUIDs to their canonical 36-character text in one vectorised pass.
+    
+    Args:
+        raw: uint8 array of shape (n, 16)
+        
+    Returns:
+        Array of n str, e.g. '1b4e28ba-2fa1-11d2-883f-0016d3cca427'
+    """
+    digits = _HEX_PAIRS[raw].view(np.uint8)
+    text = np.full((len(raw), 36), ord("-"), dtype=np.uint8)
+    for start, end, offset in _UUID_GROUPS:
+        text[:, start:end] = digits[:, offset:offset + end - start]
+    return text.view("S36").ravel().astype(str)
+
+def parse_uuid_text(texts: Iterable[str]) -> np.ndarray:
+    """
+    Parse canonical UUID strings to an (n, 16) uint8 array, the inverse of format_uuid_bytes.
+    
+    Raises:
+        ValueError: If a value is not a 36-character hyphenated UUID
+    """
+    text = np.array(list(texts), dtype="S36").reshape(-1)
+    chars = text.view(np.uint8).reshape(len(text), 36)
+    if len(text) and (chars[:, _UUID_DASHES] != ord("-")).any():
+        raise ValueError("UUID invalide: format attendu xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx")
+    nibbles = _HEX_VALUES[np.delete(chars, _UUID_DASHES, axis=1)]
+    if (nibbles == 255).any():
+        raise ValueError("UUID invalide: caractère non hexadécimal")
+    return (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+
+def uuid4_bytes(count: int) -> np.ndarray:
+    """
+    Generate count random (version 4) UUIDs at once, as a (count, 16) uint8 array.
+    
+    The random bytes come from a single os.urandom call, the source uuid.uuid4
+    uses, and the version/variant bits are set on the whole array: no Python
+    call per UUID.
+    """
+    raw = np.frombuffer(os.urandom(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # variant RFC 4122
+    return raw
+
+def uuid5_bytes(namespace: uuid.UUID, names) -> np.ndarray:
+    """
+    Derive name-based (version 5) UUIDs for many names at once, as an (n, 16) uint8 array.
+    
+    Same bytes as uuid.uuid5(namespace, name).bytes for each name, but hashing is
+    the only per-name work: version/variant bits are set on the whole array.
+    """
+    prefix = namespace.bytes
+    digests = b"".join(hashlib.sha1(prefix + name.encode("utf-8")).digest()[:16] for name in names)
+    raw = np.frombuffer(digests, dtype=np.uint8).reshape(-1, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x50  # version 5
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # variant RFC 4122
+    return raw
+
+def uuid5_name(value) -> str:
+    """
+    Name a key is hashed under by uuid5: its text, tagged with its kind unless it is a str.
+
+    Without the tag, keys of different types with the same text (1 and "1",
+    True and "True") would get the same UUID. The kind does not depend on the
+    storage (numpy or Python integers, Timestamp or datetime), and str keys keep
+    their plain text.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, np.datetime64):
+        value = pd.Timestamp(value)
+    elif isinstance(value, np.timedelta64):
+        value = pd.Timedelta(value)
+    if isinstance(value, (bool, np.bool_)):
+        kind = "bool"
+    elif isinstance(value, numbers.Integral):
+        kind = "int"
+    elif isinstance(value, numbers.Real):
+        kind = "float"
+    elif isinstance(value, datetime):
+        kind = "datetime"
+    elif isinstance(value, date):
+        kind = "date"
+    elif isinstance(value, timedelta):
+        kind = "timedelta"
+    else:
+        kind = type(value).__name__
+    # NUL: absent des textes lus dans les sources, le nom balisé ne peut pas valoir une chaîne
+    return f"{kind}\x00{value}"
+
+def generate_uuid5_batch(namespace: uuid.UUID, names) -> np.ndarray:
+    """
+    Derive name-based (version 5) UUIDs for many names at once.
+    
+    Same result as str(uuid.uuid5(namespace, name)) for each name, formatted in
+    one vectorised pass (see uuid5_bytes).
+    """
+    return format_uuid_bytes(uuid5_bytes(namespace, names))
+
+def code_dtype(size: int) -> type:
+    """Smallest of int32/int64 able to hold codes up to size"""
+    return np.int32 if size < np.iinfo(np.int32).max else np.int64
+
+def _key_index(values) -> pd.Index:
+    """Index over mapping keys, keeping their storage (object keys are not copied)"""
+    if isinstance(values, pd.Categorical):
+        values = np.asarray(values)
+    dtype = values.dtype if isinstance(values, np.ndarray) else None
+    return pd.Index(values, dtype=dtype, copy=False)
+
+class UuidFormatter:
+    """
+    Render a column of UUID codes to text, when (and only as much as) it is written.
+    
+    Codes below len(raw) are positions in raw, an (n, 16) uint8 array such as
+    UuidMap.raw; codes from len(raw) on are positions in extra, cells already
+    rendered because they hold several UUIDs; negative codes give empty.
+    Writers call it on each chunk of rows, so a model's UUID column never exists
+    as text all at once.
+    """
+    
+    def __init__(self, raw: np.ndarray, extra: Optional[np.ndarray] = None, empty: str = ''):
+        self.raw = raw
+        self.extra = extra
+        self.empty = empty
+    
+    def __call__(self, codes) -> np.ndarray:
+        codes = np.asarray(codes, dtype=np.int64)
+        result = np.full(len(codes), self.empty, dtype=object)
+        single = (codes >= 0) & (codes < len(self.raw))
+        if single.any():
+            result[single] = format_uuid_bytes(self.raw[codes[single]])
+        if self.extra is not None:
+            multi = codes >= len(self.raw)
+            result[multi] = self.extra[codes[multi] - len(self.raw)]
+        return result
+
+class UuidMap(Mapping):
+    """
+    Read-only mapping of original values to UUIDs, each UUID held as 16 raw bytes.
+    
+    Keys live in a pandas Index, so a whole column is looked up in one
+    vectorised call (codes), and UUIDs in an (n, 16) uint8 array: 16 bytes per
+    key instead of a 36-character str (about 85 bytes) plus a dict entry.
+    Columns built from it hold codes (positions in the map) and are rendered to
+    text by a UuidFormatter at write time.
+    
+    It behaves like the Dict[value, str] it replaces: map[key], get(), in, len()
+    and iteration work, the text being produced on demand.
+    
+    Args:
+        keys: Unique original values
+        raw: uint8 array of shape (len(keys), 16)
+    """
+    
+    def __init__(self, keys, raw: np.ndarray):
+        self.index = keys if isinstance(keys, pd.Index) else _key_index(keys)
+        self.raw = np.ascontiguousarray(raw, dtype=np.uint8).reshape(-1, 16)
+        if len(self.index) != len(self.raw):
+            raise ValueError(f"{len(self.index)} clés pour {len(self.raw)} UUID")
+    
+    @classmethod
+    def from_dict(cls, mapping: Dict) -> "UuidMap":
+        """Build from a {value: UUID text} dict (e.g. loaded from a registry)"""
+        return cls(list(mapping.keys()), parse_uuid_text(mapping.values()))
+    
+    def __len__(self) -> int:
+        return len(self.index)
+    
+    def __iter__(self):
+        return iter(self.index)
+    
+    def __contains__(self, key) -> bool:
+        try:
+            return key in self.index
+        except TypeError:
+            return False
+    
+    def __getitem__(self, key) -> str:
+        try:
+            position = self.index.get_loc(key)
+        except TypeError:
+            raise KeyError(key)
+        return format_uuid_bytes(self.raw[position:position + 1])[0]
+    
+    def items(self):
+        """(value, UUID text) pairs, rendered in one pass"""
+        return zip(self.index.tolist(), format_uuid_bytes(self.raw).tolist())
+    
+    def values(self):
+        return format_uuid_bytes(self.raw).tolist()
+    
+    def codes(self, values) -> np.ndarray:
+        """
+        Position of each value's UUID in the map (-1 when unmapped), like values.map(mapping).
+        
+        Values held in an extension dtype (string[pyarrow], category) are factorized
+        first, so only their distinct values are looked up and no Python object is
+        created per row.
+        """
+        dtype = code_dtype(len(self))
+        if getattr(values, "dtype", None) is not None and isinstance(values.dtype, np.dtype):
+            return self.index.get_indexer(values).astype(dtype, copy=False)
+        codes, uniques = pd.factorize(values)
+        positions = self.index.get_indexer(uniques).astype(dtype, copy=False)
+        result = positions.take(codes) if len(positions) else np.full(len(codes), -1, dtype=dtype)
+        result[codes < 0] = -1
+        return result
+    
+    def format(self, codes, empty: str = '') -> np.ndarray:
+        """UUID text of each code (empty for negative codes)"""
+        return UuidFormatter(self.raw, empty=empty)(codes)
+    
+    def formatter(self) -> UuidFormatter:
+        """Formatter rendering the codes of this map (e.g. an ID column) at write time"""
+        return UuidFormatter(self.raw)
+    
+    def duplicated(self) -> np.ndarray:
+        """Mask of the keys whose UUID is also held by another key"""
+        pairs = pd.DataFrame(self.raw.view("<u8"))
+        return pairs.duplicated(keep=False).to_numpy()
+    
+    def merge(self, other: "UuidMap") -> "UuidMap":
+        """Map holding the keys of self followed by those of other (keys must not overlap)"""
+        return UuidMap(self.index.append(other.index), np.concatenate([self.raw, other.raw]))
+
+def as_uuid_map(mapping: Mapping) -> UuidMap:
+    """Return mapping as a UuidMap, converting a {value: UUID text} dict"""
+    return mapping if isinstance(mapping, UuidMap) else UuidMap.from_dict(mapping)
+
+def unique_non_na(values) -> np.ndarray:
+    """Unique non-NA values, in order of first appearance"""
+    if isinstance(values, pd.Series):
+        series = values
+    elif isinstance(values, pd.api.extensions.ExtensionArray):
+        # Garde le stockage d'origine (ex. string[pyarrow]): pas de chaîne Python par ligne
+        series = pd.Series(values, copy=False)
+    else:
+        series = pd.Series(values, dtype=object)
+    return pd.unique(series.dropna())
+
+def create_uuid_mapping(values, namespace: Optional[uuid.UUID] = None) -> UuidMap:
     """
     Create a mapping of values to UUIDs, handling duplicates and NA values.
     
     Args:
         values: An iterable of values to map to UUIDs
+        namespace: If given, UUIDs are derived deterministically with uuid5 from
+            this namespace and uuid5_name(value), so reruns produce the same IDs
         
     Returns:
-        Dict mapping unique values to UUIDs
+        UuidMap of unique values to UUIDs (a read-only mapping, UUIDs held as bytes)
         
     Example:
         >>> values = ['A', 'B', 'A', 'C', None]
@@ -30,51 +295,95 @@ def create_uuid_mapping(values) -> Dict[str, str]:
         >>> mapping['A'] == mapping['A']  # Same value maps to same UUID
         True
     """
-    # Convert to set to get unique values, filtering out NA/None
-    unique_values: Set = {value for value in values if pd.notna(value)}
+    # Unique values, filtering out NA/None
+    unique_values = unique_non_na(values)
+    
+    if namespace is not None:
+        return UuidMap(unique_values, uuid5_bytes(namespace, (uuid5_name(value) for value in unique_values)))
     
-    # Create mapping with consistent UUIDs for duplicate values
-    return {value: generate_uuid() for value in unique_values}
+    # One UUID per unique value: duplicates share it
+    return UuidMap(unique_values, uuid4_bytes(len(unique_values)))
 
-def verify_mapping_integrity(mapping: Dict[str, str], values) -> bool:
+def check_mapping_integrity(mapping: Mapping, values, max_examples: int = 10,
+                            new_keys=None) -> Dict[str, Any]:
     """
-    Verify the integrity of a UUID mapping.
+    Check the integrity of a UUID mapping in linear time and report violations.
     
     Args:
-        mapping: Dict mapping values to UUIDs
+        mapping: UuidMap (or dict) mapping values to UUIDs
         values: Original values used to create the mapping
+        max_examples: Maximum number of offending values kept per violation type
+        new_keys: Keys of mapping issued by this run, when the others come from
+            earlier runs (e.g. a persistent registry): only these must appear
+            in values. None checks every key
         
     Returns:
-        bool: True if mapping is valid, False otherwise
+        Dict containing:
+        - valid: True if no violation was found
+        - unique_values: Number of unique non-NA source values
+        - mapped_values: Number of keys in the mapping
+        - missing_count / missing_values: Source values without a UUID
+        - extra_count / extra_values: Mapping keys (new_keys when given) absent
+          from the source values
+        - duplicate_uuid_count / duplicate_uuids: UUIDs shared by several values,
+          with the values that share them
         
     Checks:
     1. All non-NA values have a mapping
     2. Each unique value maps to a unique UUID
-    3. Same value always maps to same UUID
+    3. Same value always maps to same UUID (guaranteed by the dict itself once 2 holds)
     """
-    # Get unique non-NA values
-    unique_values = {value for value in values if pd.notna(value)}
+    # Unique non-NA values and mapping keys, compared with hash tables instead of pairwise scans
+    unique_values = _key_index(unique_non_na(values))
+    if isinstance(mapping, UuidMap):
+        mapped_values = mapping.index
+    else:
+        mapped_values = pd.Index(list(mapping.keys()), dtype=object)
     
-    # Check all values have mappings
-    mapped_values = set(mapping.keys())
-    if unique_values != mapped_values:
-        return False
+    missing = unique_values[mapped_values.get_indexer(unique_values) < 0]
+    checked_keys = mapped_values if new_keys is None else _key_index(new_keys)
+    extra = checked_keys[unique_values.get_indexer(checked_keys) < 0]
     
-    # Check UUID uniqueness (no two different values map to same UUID)
-    if len(set(mapping.values())) != len(mapping):
-        return False
+    # Inverse index: UUIDs appearing more than once (only those are rendered to text)
+    if isinstance(mapping, UuidMap):
+        positions = np.flatnonzero(mapping.duplicated())
+        shared = pd.Series(mapping.format(positions), index=mapping.index[positions], dtype=object)
+    else:
+        uuid_series = pd.Series(list(mapping.values()), index=mapped_values, dtype=object)
+        shared = uuid_series[uuid_series.duplicated(keep=False)]
+    duplicate_uuids: Dict[str, List] = {}
+    for value, uuid_val in shared.items():
+        if uuid_val in duplicate_uuids or len(duplicate_uuids) < max_examples:
+            duplicate_uuids.setdefault(uuid_val, []).append(value)
     
-    # Check consistency (same value always maps to same UUID)
-    for value in values:
-        if pd.notna(value) and value in mapping:
-            uuid_val = mapping[value]
-            # Verify this is the only value that maps to this UUID
-            if sum(1 for v, u in mapping.items() if u == uuid_val) > 1:
-                return False
+    return {
+        "valid": missing.empty and extra.empty and shared.empty,
+        "unique_values": len(unique_values),
+        "mapped_values": len(mapping),
+        "missing_count": len(missing),
+        "missing_values": missing[:max_examples].tolist(),
+        "extra_count": len(extra),
+        "extra_values": extra[:max_examples].tolist(),
+        "duplicate_uuid_count": int(shared.nunique()),
+        "duplicate_uuids": duplicate_uuids
+    }
+
+def verify_mapping_integrity(mapping: Mapping, values) -> bool:
+    """
+    Verify the integrity of a UUID mapping.
     
-    return True
+    Args:
+        mapping: Dict mapping values to UUIDs
+        values: Original values used to create the mapping
+        
+    Returns:
+        bool: True if mapping is valid, False otherwise
+        
+    See check_mapping_integrity for the detailed report.
+    """
+    return check_mapping_integrity(mapping, values)["valid"]
 
-def get_mapping_stats(mapping: Dict[str, str], values) -> Dict[str, int]:
+def get_mapping_stats(mapping: Mapping, values) -> Dict[str, int]:
     """
     Get statistics about a UUID mapping.
     
@@ -90,8 +399,9 @@ def get_mapping_stats(mapping: Dict[str, str], values) -> Dict[str, int]:
         - na_values: Number of NA values
     """
     total_values = len(values)
-    na_values = sum(1 for v in values if pd.isna(v))
-    unique_values = len({v for v in values if pd.notna(v)})
+    unique = unique_non_na(values)
+    na_values = int(pd.Series(values, copy=False).isna().sum())
+    unique_values = len(unique)
     mapped_values = len(mapping)
     
     return {
@@ -164,8 +474,14 @@ def process_model(model, source_data, mappings):
         logger.error(f"Erreur lors du traitement du modèle {model}: {str(e)}")
         raise ProcessingError(f"Échec du traitement pour {model}") from e
 
-def generate_kimaiko_files(source_data, mappings, output_dir):
-    """Version modifiée qui vérifie d'abord l'ordre de traitement"""
+def generate_kimaiko_files(source_data, mappings, output_dir, interactive: bool = True):
+    """
+    Version modifiée qui vérifie d'abord l'ordre de traitement
+    
+    Args:
+        interactive: Demander confirmation de l'ordre de traitement (désactiver
+            pour les exécutions sans terminal, ex. cron ou cli.py)
+    """
     try:
         # Analyser l'ordre de traitement
         order_analysis = suggest_processing_order(mappings)
@@ -183,10 +499,11 @@ def generate_kimaiko_files(source_data, mappings, output_dir):
                 logger.info(f"   Dépend de: {', '.join(deps['depends_on'])}")
         
         # Demander confirmation à l'utilisateur
-        proceed = input("Voulez-vous continuer avec cet ordre de traitement ? (o/n): ")
-        if proceed.lower() != 'o':
-            logger.info("Opération annulée par l'utilisateur")
-            return
+        if interactive:
+            proceed = input("Voulez-vous continuer avec cet ordre de traitement ? (o/n): ")
+            if proceed.lower() != 'o':
+                logger.info("Opération annulée par l'utilisateur")
+                return
         
         # Procéder au traitement dans l'ordre déterminé
         for model in order_analysis['processing_order']:
@@ -0,0 +1,101 @@
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+
+# Messages identiques (même clé) écrits avant d'être seulement comptés
+DEFAULT_MAX_MESSAGES = 20
+
+def trace_enabled() -> bool:
+    """
+    Row-level tracing switch: KIMAIKO_TRACE=1, and the DEBUG level enabled.
+
+    Traces log one line per unmapped reference or unmatched row; on dirty data
+    that can be millions of lines, so they are off unless asked for.
+    """
+    return os.environ.get("KIMAIKO_TRACE", "") not in ("", "0") and logging.getLogger().isEnabledFor(logging.DEBUG)
+
+class DiagnosticsCollector:
+    """
+    Aggregated, rate-limited data quality diagnostics of a generation run.
+
+    Unmapped references are counted per model and column, keeping the most
+    frequent values as examples, and reported once at the end (log_summary)
+    instead of one log line per cell. warn() writes the first max_messages
+    messages of a key, then only counts them. Messages use lazy %-style
+    arguments, formatted only when actually written.
+
+    The collector can be sent to worker processes; the parent merges what they
+    return with merge().
+    """
+
+    def __init__(self, max_examples: int = 10, max_messages: int = DEFAULT_MAX_MESSAGES):
+        self.max_examples = max_examples
+        self.max_messages = max_messages
+        self.unmapped: Dict[Tuple[str, str], Dict] = {}
+        self.messages: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict:
+        return {"max_examples": self.max_examples, "max_messages": self.max_messages,
+                "unmapped": self.unmapped, "messages": self.messages}
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add_unmapped(self, model: str, column: str, count: int, examples: Dict,
+                     ref_model: Optional[str] = None, total: int = 0) -> None:
+        """
+        Count unmapped references of a column (examples: value -> occurrences).
+
+        total is the number of cells checked; calls without unmapped references
+        still add it, so batches and workers all count in the summary.
+        """
+        with self._lock:
+            entry = self.unmapped.setdefault((model, column), {
+                "ref_model": ref_model, "count": 0, "total": 0, "examples": Counter()})
+            entry["count"] += count
+            entry["total"] += total
+            entry["examples"].update(examples)
+            # Ne garder que les exemples les plus fréquents
+            entry["examples"] = Counter(dict(entry["examples"].most_common(self.max_examples)))
+
+    def warn(self, key: str, msg: str, *args) -> None:
+        """logging.warning(msg, *args), written for the first max_messages calls with this key"""
+        with self._lock:
+            self.messages[key] += 1
+            seen = self.messages[key]
+        if seen <= self.max_messages:
+            logging.warning(msg, *args)
+            if seen == self.max_messages:
+                logging.warning("%s: messages suivants seulement comptés (voir le récapitulatif)", key)
+
+    def merge(self, other: "DiagnosticsCollector") -> None:
+        """Add the diagnostics collected elsewhere (worker process)"""
+        for (model, column), entry in other.unmapped.items():
+            self.add_unmapped(model, column, entry["count"], entry["examples"], entry["ref_model"], entry["total"])
+        with self._lock:
+            self.messages.update(other.messages)
+
+    def summary(self) -> List[Dict]:
+        """One entry per column with unmapped references, most affected first"""
+        with self._lock:
+            items = list(self.unmapped.items())
+        return sorted(({"model": model, "column": column, "ref_model": entry["ref_model"],
+                        "unmapped": entry["count"], "total": entry["total"],
+                        "examples": dict(entry["examples"].most_common(self.max_examples))}
+                       for (model, column), entry in items if entry["count"]), key=lambda e: -e["unmapped"])
+
+    def log_summary(self) -> None:
+        """One warning per affected column, plus the number of messages not written"""
+        for entry in self.summary():
+            logging.warning("Références non mappées %s.%s -> %s: %d sur %d cellules, exemples: %s",
+                            entry["model"], entry["column"], entry["ref_model"], entry["unmapped"],
+                            entry["total"], entry["examples"])
+        with self._lock:
+            suppressed = {key: seen - self.max_messages for key, seen in self.messages.items()
+                          if seen > self.max_messages}
+        for key, count in suppressed.items():
+            logging.warning("%s: %d messages supplémentaires non écrits", key, count)
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Hashable, Optional
+import logging
+import threading
+
+# Au-delà de cette part de valeurs distinctes, une colonne texte n'est pas catégorisée
+CATEGORY_MAX_RATIO = 0.5
+DEFAULT_SAMPLE_SIZE = 10_000
+
+# Chaînes stockées par Arrow: un buffer contigu au lieu d'un objet Python par cellule
+ARROW_STRING_DTYPE = "string[pyarrow]"
+
+_INT_DTYPES = [np.int8, np.int16, np.int32]
+
+def _expected_distinct(distinct: float, rows: int, sample_size: int) -> float:
+    """
+    Distinct values expected in a sample drawn without replacement.
+
+    Assumes the rows hold distinct values equally often: each one is missed
+    by the sample with probability (1 - sample_size/rows)^(rows/distinct).
+    A sample of all the rows sees every value.
+    """
+    if distinct <= 0:
+        return 0.0
+    return distinct * (1 - (1 - sample_size / rows) ** (rows / distinct))
+
+class DtypePlanner:
+    """
+    Choose compact dtypes for a DataFrame and remember the choice.
+
+    A plan maps each column to a target dtype ('category', a downcast numeric
+    type, string_dtype for text columns, or None to keep the column as is). Text
+    cardinality is checked on a sample of sample_size non-null values, so
+    planning a 5M-row column costs about as much as a 10k-row one: the distinct
+    values of the sample are compared with those a sample of a column exactly
+    at category_ratio would show (see _expected_distinct), since a sample sees
+    a larger share of distinct values than the full column does. Numeric
+    downcasts use the full min/max (or a lossless float32 check), like
+    pd.to_numeric(downcast=...).
+
+    Plans are cached per (plan_key, column). The key must identify the content
+    (e.g. the parse cache key of a source): a plan computed for one file is
+    never valid for another one with the same name. Without a key the frame is
+    planned every time.
+
+    Args:
+        sample_size: Number of non-null values used to estimate cardinality
+        category_ratio: Distinct/rows ratio below which text becomes 'category'
+        string_dtype: Dtype for the other text columns (e.g. 'string[pyarrow]'), None keeps object
+    """
+
+    def __init__(self, sample_size: int = DEFAULT_SAMPLE_SIZE, category_ratio: float = CATEGORY_MAX_RATIO,
+                 string_dtype: Optional[str] = None):
+        self.sample_size = sample_size
+        self.category_ratio = category_ratio
+        self.string_dtype = string_dtype
+        self._plans: Dict[tuple, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def plan_column(self, series: pd.Series) -> Optional[str]:
+        """Choose the target dtype of one column"""
+        if len(series) == 0:
+            return None
+        dtype = series.dtype
+        if dtype == object:
+            values = series.dropna()
+            if len(values) == 0:
+                return None
+            sample = values.sample(self.sample_size, random_state=0) if len(values) > self.sample_size else values
+            threshold = _expected_distinct(self.category_ratio * len(series), len(values), len(sample))
+            if sample.nunique() < threshold:
+                return "category"
+            if self.string_dtype is not None and pd.api.types.infer_dtype(values, skipna=True) == "string":
+                return self.string_dtype
+            return None
+        if dtype == np.float64:
+            values = series.to_numpy()
+            # Comme pd.to_numeric(downcast='float'): float32 seulement sans perte
+            if np.array_equal(values.astype(np.float32).astype(np.float64), values, equal_nan=True):
+                return "float32"
+            return None
+        if dtype == np.int64:
+            low, high = series.min(), series.max()
+            for int_dtype in _INT_DTYPES:
+                info = np.iinfo(int_dtype)
+                if info.min <= low and high <= info.max:
+                    return np.dtype(int_dtype).name
+            return None
+        return None
+
+    def plan(self, df: pd.DataFrame, plan_key: Optional[Hashable] = None) -> Dict[Hashable, Optional[str]]:
+        """Return the plan of df, reusing the cached choices of plan_key"""
+        plan = {}
+        for col in df.columns:
+            cache_key = (plan_key, col)
+            if plan_key is not None and cache_key in self._plans:
+                plan[col] = self._plans[cache_key]
+                self.hits += 1
+                continue
+            plan[col] = self.plan_column(df[col])
+            self.misses += 1
+            if plan_key is not None:
+                with self._lock:
+                    self._plans[cache_key] = plan[col]
+        return plan
+
+    def apply(self, df: pd.DataFrame, plan: Dict[Hashable, Optional[str]]) -> pd.DataFrame:
+        """Convert the columns whose dtype differs from the plan (other columns are not copied)"""
+        conversions = {col: dtype for col, dtype in plan.items()
+                       if dtype is not None and col in df.columns and df[col].dtype != dtype}
+        if not conversions:
+            return df
+        # Copie superficielle: seules les colonnes converties sont de nouveaux tableaux
+        df = df.copy(deep=False)
+        for col, dtype in conversions.items():
+            df[col] = df[col].astype(dtype)
+        return df
+
+    def optimize(self, df: pd.DataFrame, plan_key: Optional[Hashable] = None) -> pd.DataFrame:
+        """Plan (or reuse the plan of plan_key) and apply it"""
+        plan = self.plan(df, plan_key)
+        logging.debug(f"Plan de types {plan_key}: {plan}")
+        return self.apply(df, plan)
+
+    def forget(self, plan_key: Hashable) -> None:
+        """Drop the cached plan of a key"""
+        with self._lock:
+            for cache_key in [k for k in self._plans if k[0] == plan_key]:
+                del self._plans[cache_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+            self.hits = 0
+            self.misses = 0
+
+# Planificateurs partagés par optimize_dataframe
+DEFAULT_PLANNER = DtypePlanner()
+ARROW_PLANNER = DtypePlanner(string_dtype=ARROW_STRING_DTYPE)
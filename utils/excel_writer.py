@@ -0,0 +1,287 @@
+import pandas as pd
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Callable, Dict, Hashable, List, Optional, Union
+import io
+import logging
+import xlsxwriter
+from .packaging import DirectorySink, OutputSink
+
+# Excel hard limit, header row included
+EXCEL_MAX_ROWS = 1_048_576
+
+class _ForwardOnly(io.RawIOBase):
+    """
+    Non-seekable view on a writable file.
+
+    zipfile lays out an archive differently when it can seek back (sizes in the
+    local headers) or not (data descriptors). Hiding seek gives the same bytes
+    whether the workbook goes to an archive entry, a BufferSink or a file.
+    """
+
+    def __init__(self, fileobj: BinaryIO):
+        self._fileobj = fileobj
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._fileobj.write(data)
+        return len(data)
+
+class OutputWriter:
+    """
+    Base class for the writers used to save generated Kimaiko files.
+
+    A model larger than the Excel row limit is split either across several sheets
+    of the same workbook (split_mode="sheets") or across several workbooks named
+    <model>_2.xlsx, <model>_3.xlsx... (split_mode="files").
+
+    Columns can be given a formatter (e.g. a UuidFormatter turning UUID codes
+    into text); it is applied to the rows being written only.
+
+    Writers with supports_batches can also write a model batch by batch
+    (open_stream), without ever holding all of its rows.
+    """
+
+    extension = ".xlsx"
+    supports_batches = False
+
+    def __init__(self, split_mode: str = "files", max_rows: int = EXCEL_MAX_ROWS - 1,
+                 sheet_name: str = "Sheet1"):
+        if split_mode not in ("sheets", "files"):
+            raise ValueError(f"Mode de découpage inconnu: {split_mode}")
+        self.split_mode = split_mode
+        self.max_rows = max_rows  # Lignes de données par feuille, en-tête exclu
+        self.sheet_name = sheet_name
+
+    def _row_slices(self, df: pd.DataFrame) -> List[slice]:
+        """Split the row range of df into slices that each fit in one sheet"""
+        if len(df) == 0:
+            return [slice(0, 0)]
+        return [slice(start, min(start + self.max_rows, len(df)))
+                for start in range(0, len(df), self.max_rows)]
+
+    def _part_name(self, name: str, part: int) -> str:
+        if part == 1:
+            return name
+        path = PurePosixPath(name)
+        return str(path.with_name(f"{path.stem}_{part}{path.suffix}"))
+
+    def _part_sheet_name(self, part: int) -> str:
+        return self.sheet_name if part == 1 else f"{self.sheet_name}_{part}"
+
+    def write(self, df: pd.DataFrame, target: Union[str, Path], sink: Optional[OutputSink] = None,
+              formatters: Optional[Dict[Hashable, Callable]] = None) -> List[str]:
+        """
+        Write df, splitting it if it exceeds the row limit.
+
+        Args:
+            df: Data to write
+            target: Entry name inside sink, or a filesystem path when sink is None
+            sink: Destination of the entries (a ZipPackage streams them into the archive)
+            formatters: Functions converting the values of a column to what is written
+
+        Returns:
+            List of the entry names written
+        """
+        sink, name = _sink_entry(target, sink)
+        slices = self._row_slices(df)
+        if len(slices) > 1:
+            logging.info(f"{name}: {len(df):,} lignes découpées en {len(slices)} parties ({self.split_mode})")
+
+        if self.split_mode == "sheets":
+            with sink.open(name) as f:
+                self._write_sheets(df, f, [(self._part_sheet_name(i), s) for i, s in enumerate(slices, 1)],
+                                   formatters)
+            return [name]
+
+        written = []
+        for i, rows in enumerate(slices, 1):
+            part_name = self._part_name(name, i)
+            with sink.open(part_name) as f:
+                self._write_sheets(df, f, [(self.sheet_name, rows)], formatters)
+            written.append(part_name)
+        return written
+
+    def _write_sheets(self, df: pd.DataFrame, fileobj: BinaryIO, sheets: List[tuple],
+                      formatters: Optional[Dict[Hashable, Callable]] = None) -> None:
+        raise NotImplementedError
+
+    def open_stream(self, target: Union[str, Path], columns: List,
+                    sink: Optional[OutputSink] = None) -> "BatchStream":
+        """
+        Start writing a file batch by batch (see BatchStream).
+
+        Args:
+            target: Entry name inside sink, or a filesystem path when sink is None
+            columns: Header of the file; every batch must have these columns
+            sink: Destination of the entries
+        """
+        raise NotImplementedError(f"{type(self).__name__} ne permet pas l'écriture par lots")
+
+class XlsxWriterStreamingWriter(OutputWriter):
+    """
+    Writer based on XlsxWriter in constant_memory mode.
+
+    Rows are flushed to disk as soon as they are written, so memory stays bounded
+    by chunk_size rows converted to Python objects at a time. With reproducible=True
+    the document creation date is fixed, so identical data gives identical bytes.
+    """
+
+    supports_batches = True
+
+    def __init__(self, chunk_size: int = 50_000, reproducible: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.chunk_size = chunk_size
+        self.reproducible = reproducible
+
+    def _new_workbook(self, fileobj: BinaryIO) -> tuple:
+        """(workbook, header format) writing to fileobj"""
+        workbook = xlsxwriter.Workbook(_ForwardOnly(fileobj), {
+            "constant_memory": True,
+            "strings_to_urls": False,
+            "strings_to_formulas": False,
+            "default_date_format": "yyyy-mm-dd hh:mm:ss"
+        })
+        if self.reproducible:
+            workbook.set_properties({"created": datetime(2000, 1, 1)})
+        return workbook, workbook.add_format({"bold": True})
+
+    def _write_sheets(self, df: pd.DataFrame, fileobj: BinaryIO, sheets: List[tuple],
+                      formatters: Optional[Dict[Hashable, Callable]] = None) -> None:
+        workbook, header_format = self._new_workbook(fileobj)
+        try:
+            header = [str(col) for col in df.columns]
+            for sheet_name, rows in sheets:
+                worksheet = workbook.add_worksheet(sheet_name)
+                worksheet.write_row(0, 0, header, header_format)
+                row_idx = 1
+                for start in range(rows.start, rows.stop, self.chunk_size):
+                    stop = min(start + self.chunk_size, rows.stop)
+                    for values in _chunk_rows(df.iloc[start:stop], formatters):
+                        worksheet.write_row(row_idx, 0, values)
+                        row_idx += 1
+        finally:
+            workbook.close()
+
+    def open_stream(self, target: Union[str, Path], columns: List,
+                    sink: Optional[OutputSink] = None) -> "BatchStream":
+        return BatchStream(self, target, columns, sink)
+
+class BatchStream:
+    """
+    Incremental writing of one model file, batch after batch.
+
+    Rows are converted and flushed chunk_size at a time, so memory holds one
+    batch at most. A part is started whenever the current sheet is full, with
+    the same names and split_mode as OutputWriter.write. Use as a context
+    manager; written lists the entries once closed.
+    """
+
+    def __init__(self, writer: XlsxWriterStreamingWriter, target: Union[str, Path], columns: List,
+                 sink: Optional[OutputSink] = None):
+        self.writer = writer
+        self.sink, self.name = _sink_entry(target, sink)
+        self.header = [str(col) for col in columns]
+        self.written: List[str] = []
+        self.rows = 0
+        self._parts = 0
+        self._entry = None
+        self._workbook = None
+        self._header_format = None
+        self._worksheet = None
+        self._row_idx = 0
+        self._next_part()
+
+    def _next_part(self) -> None:
+        self._parts += 1
+        if self.writer.split_mode == "files" or self._workbook is None:
+            self._close_file()
+            part_name = self.writer._part_name(self.name, self._parts)
+            self._entry = self.sink.open(part_name)
+            self._workbook, self._header_format = self.writer._new_workbook(self._entry)
+            self.written.append(part_name)
+        sheet_name = (self.writer._part_sheet_name(self._parts) if self.writer.split_mode == "sheets"
+                      else self.writer.sheet_name)
+        self._worksheet = self._workbook.add_worksheet(sheet_name)
+        self._worksheet.write_row(0, 0, self.header, self._header_format)
+        self._row_idx = 1
+
+    def _close_file(self) -> None:
+        try:
+            if self._workbook is not None:
+                self._workbook.close()
+        finally:
+            self._workbook = None
+            if self._entry is not None:
+                self._entry.close()
+                self._entry = None
+
+    def append(self, df: pd.DataFrame, formatters: Optional[Dict[Hashable, Callable]] = None) -> None:
+        """Write the rows of df after those already written"""
+        start = 0
+        while start < len(df):
+            if self._row_idx > self.writer.max_rows:
+                self._next_part()
+            stop = min(start + self.writer.chunk_size, len(df),
+                       start + self.writer.max_rows - self._row_idx + 1)
+            for values in _chunk_rows(df.iloc[start:stop], formatters):
+                self._worksheet.write_row(self._row_idx, 0, values)
+                self._row_idx += 1
+            start = stop
+        self.rows += len(df)
+
+    def close(self) -> None:
+        self._close_file()
+        if self._parts > 1:
+            logging.info(f"{self.name}: {self.rows:,} lignes découpées en {self._parts} parties ({self.writer.split_mode})")
+
+    def __enter__(self) -> "BatchStream":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class OpenpyxlWriter(OutputWriter):
+    """Legacy writer using DataFrame.to_excel with openpyxl (whole workbook in memory)"""
+
+    def _write_sheets(self, df: pd.DataFrame, fileobj: BinaryIO, sheets: List[tuple],
+                      formatters: Optional[Dict[Hashable, Callable]] = None) -> None:
+        with pd.ExcelWriter(fileobj, engine="openpyxl") as excel_writer:
+            for sheet_name, rows in sheets:
+                _format_columns(df.iloc[rows], formatters).to_excel(excel_writer, sheet_name=sheet_name, index=False)
+
+def _sink_entry(target: Union[str, Path], sink: Optional[OutputSink]) -> tuple:
+    """(sink, entry name) for a target, a DirectorySink on its folder when sink is None"""
+    if sink is None:
+        target = Path(target)
+        return DirectorySink(target.parent), target.name
+    return sink, str(target)
+
+def _format_columns(chunk: pd.DataFrame, formatters: Optional[Dict[Hashable, Callable]]) -> pd.DataFrame:
+    """Apply the column formatters to a slice of rows"""
+    if not formatters:
+        return chunk
+    chunk = chunk.copy(deep=False)
+    for col, formatter in formatters.items():
+        if col in chunk.columns:
+            chunk[col] = pd.Series(formatter(chunk[col].to_numpy()), index=chunk.index, dtype=object)
+    return chunk
+
+def _chunk_rows(chunk: pd.DataFrame, formatters: Optional[Dict[Hashable, Callable]] = None) -> List[list]:
+    """Convert a slice of rows to Python values, NA becoming empty cells"""
+    values = _format_columns(chunk, formatters).astype(object)
+    values = values.where(values.notna(), None)
+    return values.to_numpy().tolist()
+
+OUTPUT_WRITERS: Dict[str, type] = {
+    "xlsxwriter": XlsxWriterStreamingWriter,
+    "openpyxl": OpenpyxlWriter
+}
+
+def get_output_writer(name: str = "xlsxwriter", **options) -> OutputWriter:
+    """Instantiate an output writer by name ('xlsxwriter' or 'openpyxl')"""
+    if name not in OUTPUT_WRITERS:
+        raise ValueError(f"Writer inconnu: {name}. Disponibles: {list(OUTPUT_WRITERS.keys())}")
+    return OUTPUT_WRITERS[name](**options)
@@ -1,13 +1,94 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
-import zipfile
-import tempfile
-import os
-from typing import Dict, Optional
-import gc
+from typing import BinaryIO, Dict, List, Optional, Union
+import hashlib
+import io
+import itertools
 import logging
+import threading
+import time
 import traceback
-from .data_processing import generate_uuid, create_uuid_mapping, verify_mapping_integrity, get_mapping_stats
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from openpyxl import load_workbook
+from .excel_writer import OutputWriter, get_output_writer
+from .packaging import BufferSink, OutputSink, ZipPackage
+from .uuid_registry import UuidRegistry
+from .dtype_planner import ARROW_PLANNER, DEFAULT_PLANNER
+from .model_sources import model_sources
+from .diagnostics import DiagnosticsCollector, trace_enabled
+from .memory import release_memory
+from .profiling import REPORT_NAME, StageProfiler
+from .data_processing import (generate_uuid, create_uuid_mapping, check_mapping_integrity, get_mapping_stats,
+                              model_namespace, as_uuid_map, code_dtype, UuidFormatter, UuidMap)
+
+# Template headers already parsed, keyed by SHA-256 of the workbook content
+_TEMPLATE_COLUMNS_CACHE: Dict[str, List] = {}
+
+def _read_file_bytes(file) -> bytes:
+    """Return the raw content of a path or a file-like object (e.g. a Streamlit upload)"""
+    if isinstance(file, (str, Path)):
+        return Path(file).read_bytes()
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    position = file.tell()
+    file.seek(0)
+    content = file.read()
+    file.seek(position)
+    return content
+
+def _normalize_header(header_row: tuple) -> List:
+    """Apply the same header rules as pd.read_excel (trailing blanks, Unnamed, duplicates)"""
+    values = list(header_row)
+    while values and values[-1] is None:
+        values.pop()
+
+    columns = []
+    seen: Dict = {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if value is None else value
+        if name in seen:
+            seen[name] += 1
+            deduped = f"{name}.{seen[name]}"
+            while deduped in seen:
+                seen[name] += 1
+                deduped = f"{name}.{seen[name]}"
+            seen[deduped] = 0
+            name = deduped
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+def read_template_columns(file) -> List:
+    """
+    Read only the header row of a Kimaiko template workbook.
+
+    The workbook is opened in read-only (streaming) mode and parsing stops after
+    the first row, so sample rows left in the template are never loaded. Results
+    are cached by content hash, which makes Streamlit reruns free.
+
+    Args:
+        file: Path or file-like object of the .xlsx template
+
+    Returns:
+        List of column names, as pd.read_excel would return them
+    """
+    content = _read_file_bytes(file)
+    digest = hashlib.sha256(content).hexdigest()
+    if digest in _TEMPLATE_COLUMNS_CACHE:
+        return list(_TEMPLATE_COLUMNS_CACHE[digest])
+
+    workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        header_row = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+    finally:
+        workbook.close()
+
+    columns = _normalize_header(header_row)
+    _TEMPLATE_COLUMNS_CACHE[digest] = columns
+    return list(columns)
 
 def load_demo_files(demo_dir: Path) -> tuple[Dict, Dict]:
     """Load demonstration files and return templates and source files"""
@@ -23,13 +104,7 @@ def load_demo_files(demo_dir: Path) -> tuple[Dict, Dict]:
         }
         
         for name, filename in kimaiko_files.items():
-            df = None
-            try:
-                df = pd.read_excel(demo_dir / filename)
-                kimaiko_templates[name] = df.columns.tolist()
-            finally:
-                del df  # Free memory even if error occurs
-                gc.collect()
+            kimaiko_templates[name] = read_template_columns(demo_dir / filename)
         
         # Load source files
         source_files_map = {
@@ -39,73 +114,259 @@ def load_demo_files(demo_dir: Path) -> tuple[Dict, Dict]:
         }
         
         for name, filename in source_files_map.items():
-            df = None
-            try:
-                df = pd.read_excel(demo_dir / filename)
-                source_files[name] = {
-                    'columns': df.columns.tolist(),
-                    'data': df
-                }
-            finally:
-                if df is not None:
-                    del df
-                gc.collect()
+            df = pd.read_excel(demo_dir / filename)
+            source_files[name] = {
+                'columns': df.columns.tolist(),
+                'data': df
+            }
         
         return kimaiko_templates, source_files
     except Exception as e:
         raise Exception(f"Erreur lors du chargement des fichiers: {str(e)}")
-    finally:
-        gc.collect()
 
-def optimize_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    """Optimize DataFrame memory usage"""
+def optimize_dataframe(df: pd.DataFrame, plan_key: Optional[str] = None,
+                       arrow_strings: bool = False) -> pd.DataFrame:
+    """
+    Optimize DataFrame memory usage.
+
+    Text columns with few distinct values (estimated on a sample) become
+    categorical and numeric columns are downcast, in a single astype. The
+    input frame is not modified.
+
+    Args:
+        df: DataFrame to optimize
+        plan_key: Content key (e.g. the parse cache key of a source) under which the
+            dtype plan is remembered, so the same data is never analysed twice
+        arrow_strings: Store the remaining text columns as string[pyarrow]
+    """
     try:
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                # Convert string columns to categorical if they have few unique values
-                if df[col].nunique() / len(df) < 0.5:  # Less than 50% unique values
-                    df[col] = df[col].astype('category')
-            elif df[col].dtype == 'float64':
-                # Downcast float columns where possible
-                df[col] = pd.to_numeric(df[col], downcast='float')
-            elif df[col].dtype == 'int64':
-                # Downcast integer columns where possible
-                df[col] = pd.to_numeric(df[col], downcast='integer')
-        return df
+        planner = ARROW_PLANNER if arrow_strings else DEFAULT_PLANNER
+        return planner.optimize(df, plan_key)
     except Exception as e:
         raise Exception(f"Erreur lors de l'optimisation du DataFrame: {str(e)}")
 
+class SourceCache:
+    """
+    Per-run cache of prepared source DataFrames.
+    
+    Each source file is optimised exactly once, the first time a model or a column
+    asks for it. Every later request gets a shallow copy of the prepared frame (or
+    of one of its columns) instead of a new copy()+optimize_dataframe: the data
+    buffers are shared, but adding, replacing or dropping columns on what is handed
+    out never reaches the cache, and copy-on-write copies a buffer before any
+    in-place cell write. With arrow_strings=True, high-cardinality text columns are held as string[pyarrow].
+    Hash indexes on join keys are built once too (key_index).
+    """
+    
+    def __init__(self, source_files: Dict, arrow_strings: bool = False):
+        self.source_files = source_files
+        self.arrow_strings = arrow_strings
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._prepare_seconds: Dict[str, float] = {}
+        self._copy_bytes: Dict[str, int] = {}
+        self._hits: Dict[str, int] = {}
+        self._key_indexes: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+    
+    def frame(self, source_name: str) -> pd.DataFrame:
+        """Return the prepared DataFrame for a source file, preparing it on first use"""
+        if source_name not in self.source_files:
+            logging.error(f"Fichier source '{source_name}' non trouvé")
+            logging.error(f"Fichiers sources disponibles: {list(self.source_files.keys())}")
+            raise ValueError(f"Fichier source '{source_name}' non trouvé")
+        
+        # Verrou: plusieurs modèles peuvent demander la même source en parallèle
+        with self._lock:
+            if source_name in self._frames:
+                self._hits[source_name] += 1
+                return self._frames[source_name].copy(deep=False)
+            
+            start = time.perf_counter()
+            source = self.source_files[source_name]
+            raw_df = source["data"]
+            # Octets alloués par copy(): les colonnes objet ne copient que leurs pointeurs
+            self._copy_bytes[source_name] = int(raw_df.memory_usage(index=True, deep=False).sum())
+            # optimize_dataframe ne modifie pas raw_df: plus besoin de copie
+            prepared = optimize_dataframe(raw_df, plan_key=source.get("cache_key"), arrow_strings=self.arrow_strings)
+            self._prepare_seconds[source_name] = time.perf_counter() - start
+            self._frames[source_name] = prepared
+            self._hits[source_name] = 0
+            return prepared.copy(deep=False)
+    
+    def column(self, source_name: str, column: str) -> pd.Series:
+        """Return a view on one column of a prepared source file"""
+        df = self.frame(source_name)
+        if column not in df.columns:
+            logging.error(f"Colonne source '{column}' non trouvée dans {source_name}")
+            logging.error(f"Colonnes disponibles: {df.columns.tolist()}")
+            raise ValueError(f"Colonne source '{column}' non trouvée")
+        return df[column]
+    
+    def key_index(self, source_name: str, columns: List) -> tuple[pd.Index, np.ndarray]:
+        """
+        Hash index on the key columns of a source, built once per run.
+        
+        Rows with a missing key component are left out of the index.
+        
+        Returns:
+            Tuple of (Index, or MultiIndex for several columns, of the keys;
+            read-only row position of each entry in the source)
+            
+        Raises:
+            ValueError: If a key appears on several rows (the join would be ambiguous)
+        """
+        cache_key = (source_name, tuple(columns))
+        with self._lock:
+            if cache_key in self._key_indexes:
+                return self._key_indexes[cache_key]
+        
+        keys = [self.column(source_name, col) for col in columns]
+        valid = np.logical_and.reduce([key.notna().to_numpy() for key in keys])
+        rows = np.flatnonzero(valid)
+        rows.flags.writeable = False
+        if len(keys) == 1:
+            index = pd.Index(keys[0].array[valid])
+        else:
+            index = pd.MultiIndex.from_arrays([key.array[valid] for key in keys])
+        if not index.is_unique:
+            duplicates = index[index.duplicated()].unique()
+            raise ValueError(
+                f"Clé de jointure non unique dans {source_name} ({', '.join(map(str, columns))}): "
+                f"{len(duplicates):,} valeurs sur plusieurs lignes, exemples: {duplicates[:5].tolist()}"
+            )
+        with self._lock:
+            self._key_indexes[cache_key] = (index, rows)
+        return index, rows
+    
+    def stats(self) -> Dict[str, float]:
+        """
+        Report how much copying and optimisation work the cache avoided.
+        
+        bytes_saved counts what the avoided copy() calls would have allocated:
+        the data buffers of each reused source, with object columns counted as
+        their pointer arrays since copy() never duplicates the Python strings.
+        """
+        return {
+            "sources_prepared": len(self._frames),
+            "cache_hits": sum(self._hits.values()),
+            "bytes_saved": sum(self._copy_bytes[name] * hits for name, hits in self._hits.items()),
+            "time_saved_s": round(sum(self._prepare_seconds[name] * hits
+                                      for name, hits in self._hits.items()), 3)
+        }
+    
+    def clear(self) -> None:
+        """Drop every prepared frame and key index"""
+        self._frames.clear()
+        self._key_indexes.clear()
+
+def join_sources(model_name: str, sources: Dict, source_cache: SourceCache,
+                 max_examples: int = 5, primary: Optional[pd.DataFrame] = None,
+                 diagnostics: Optional[DiagnosticsCollector] = None) -> Dict[str, Optional[np.ndarray]]:
+    """
+    Hash-join the secondary sources of a model onto its primary source.
+    
+    Each join probes the prebuilt key index of the secondary source (see
+    SourceCache.key_index) with the key columns of the source it starts from,
+    in one vectorised call. Unmatched rows are summarised in one log line per join.
+    
+    Args:
+        sources: Result of model_sources for the model
+        primary: Rows of the primary source to join (a batch, in chunked
+            generation); the whole source from source_cache if None
+        diagnostics: Collector rate-limiting the unmatched rows warnings
+        
+    Returns:
+        Dict of the row of each source matching each primary row: None for the
+        primary source itself, otherwise an array of positions (-1: no match)
+    """
+    positions: Dict[str, Optional[np.ndarray]] = {sources["primary"]: None}
+    for join in sources["joins"]:
+        left_keys = [model_column(source_cache, positions, join["from"], col, primary) for col in join["left_on"]]
+        index, rows = source_cache.key_index(join["source_file"], join["right_on"])
+        if len(left_keys) == 1:
+            found = index.get_indexer(left_keys[0])
+        else:
+            found = index.get_indexer(pd.MultiIndex.from_arrays([key.array for key in left_keys]))
+        matched = np.where(found >= 0, rows.take(found), -1) if len(rows) else np.full(len(found), -1)
+        positions[join["source_file"]] = matched
+        
+        # Une ligne de log par jointure, avec les clés sans correspondance les plus fréquentes
+        keys = f"{'+'.join(map(str, join['left_on']))} = {join['source_file']}.{'+'.join(map(str, join['right_on']))}"
+        has_key = np.logical_and.reduce([key.notna().to_numpy() for key in left_keys])
+        unmatched = has_key & (matched < 0)
+        logging.info("Jointure %s: %s, %d/%d lignes appariées", model_name, keys, int((matched >= 0).sum()), len(matched))
+        if unmatched.any():
+            examples = left_keys[0][unmatched].value_counts().head(max_examples)
+            message = ("Jointure %s: %d lignes sans correspondance dans %s (%s), exemples: %s",
+                       model_name, int(unmatched.sum()), join["source_file"], keys,
+                       dict(zip(examples.index.tolist(), examples.tolist())))
+            if diagnostics is not None:
+                # Génération par lots: un message par lot, limité
+                diagnostics.warn(f"Jointure {model_name} {join['source_file']}", *message)
+            else:
+                logging.warning(*message)
+            if trace_enabled():
+                for row in np.flatnonzero(unmatched):
+                    logging.debug("Jointure %s: ligne %d sans correspondance (%s)", model_name, row + 1,
+                                  [key.iloc[row] for key in left_keys])
+    return positions
+
+def model_column(source_cache: SourceCache, positions: Dict[str, Optional[np.ndarray]],
+                 source_name: str, column: str, primary: Optional[pd.DataFrame] = None) -> pd.Series:
+    """
+    A source column aligned on the rows of the model.
+    
+    Primary source columns are returned as they are (from primary when given,
+    see join_sources); joined source columns are gathered with the join
+    positions, missing where a row had no match.
+    """
+    rows = positions[source_name]
+    if rows is None and primary is not None:
+        return primary[column]
+    values = source_cache.column(source_name, column)
+    if rows is None:
+        return values
+    return pd.Series(pd.api.extensions.take(values.array, rows, allow_fill=True), name=column)
+
 def process_model_data(model_name: str, model_mappings: Dict, source_files: Dict, 
-                       existing_uuid_map: Optional[Dict[str, str]] = None) -> tuple[pd.DataFrame, Dict[str, str], Dict[str, int]]:
-    """Process data for a single model, with proper memory management"""
+                       existing_uuid_map: Optional[Dict[str, str]] = None,
+                       source_cache: Optional[SourceCache] = None,
+                       arrow_strings: bool = False,
+                       profiler: Optional[StageProfiler] = None,
+                       new_keys=None) -> tuple[pd.DataFrame, UuidMap, Dict[str, int]]:
+    """
+    Process data for a single model, with proper memory management.
+    
+    The ID column of the returned frame holds codes into the returned UuidMap,
+    rendered to text by its formatter when the file is written. Each step is
+    measured by profiler (see StageProfiler). When existing_uuid_map also holds
+    keys from earlier runs (persistent registry), new_keys lists those issued by
+    this run: only they must appear in the source (see check_mapping_integrity).
+    """
     source_df = None
+    source_cache = source_cache or SourceCache(source_files, arrow_strings=arrow_strings)
+    profiler = profiler or StageProfiler()
     final_df = None
     try:
-        # Find the first mapping with a source file
-        source_mapping = next((m for m in model_mappings.values() 
-                               if isinstance(m, dict) and "source_file" in m), None)
-        if not source_mapping:
+        # Source principale: une ligne du modèle par ligne de cette source
+        sources = model_sources(model_mappings, model_name)
+        if sources["primary"] is None:
             logging.error(f"Aucun mapping source trouvé pour le modèle {model_name}")
             logging.error(f"Mappings disponibles: {model_mappings}")
             return None, None, None
 
-        logging.info(f"Traitement du modèle {model_name}")
-        logging.info(f"Fichier source: {source_mapping['source_file']}")
-
-        if source_mapping["source_file"] not in source_files:
-            logging.error(f"Fichier source '{source_mapping['source_file']}' non trouvé")
-            logging.error(f"Fichiers sources disponibles: {list(source_files.keys())}")
-            raise ValueError(f"Fichier source '{source_mapping['source_file']}' non trouvé")
+        logging.info("Traitement du modèle %s, fichier source: %s", model_name, sources["primary"])
 
-        source_df = source_files[source_mapping["source_file"]]["data"].copy()
-        source_df = optimize_dataframe(source_df)
+        with profiler.stage(model_name, "load_source") as record:
+            source_df = source_cache.frame(sources["primary"])
+            record["rows"] = len(source_df)
 
-        logging.info(f"Colonnes source disponibles: {source_df.columns.tolist()}")
+        logging.debug("Colonnes source disponibles: %s", source_df.columns.tolist())
 
         # Create and verify UUID mapping
-        key_col = source_mapping["source_col"]
+        key_col = sources["key"]
         if key_col not in source_df.columns:
-            logging.error(f"Colonne source '{key_col}' non trouvée dans {source_mapping['source_file']}")
+            logging.error(f"Colonne source '{key_col}' non trouvée dans {sources['primary']}")
             logging.error(f"Colonnes disponibles: {source_df.columns.tolist()}")
             raise ValueError(f"Colonne source '{key_col}' non trouvée")
 
@@ -113,30 +374,42 @@ def process_model_data(model_name: str, model_mappings: Dict, source_files: Dict
 
         # Utiliser le mapping UUID existant si fourni
         if existing_uuid_map:
-            uuid_map = existing_uuid_map
+            uuid_map = as_uuid_map(existing_uuid_map)
         else:
-            uuid_map = create_uuid_mapping(values)
+            with profiler.stage(model_name, "uuid_mapping", rows=len(values)):
+                uuid_map = create_uuid_mapping(values)
 
         # Assign UUIDs to final_df['ID'] using the uuid_map
-        final_df = pd.DataFrame(index=range(len(source_df)))
-        final_df["ID"] = source_df[key_col].map(uuid_map)
+        with profiler.stage(model_name, "assign_ids", rows=len(values)):
+            final_df = pd.DataFrame(index=range(len(source_df)))
+            final_df["ID"] = uuid_map.codes(source_df[key_col])
+            unmapped = final_df["ID"].to_numpy() < 0
 
         # Vérifier s'il y a des valeurs non mappées
-        if final_df["ID"].isna().any():
-            missing_values = source_df[final_df["ID"].isna()][key_col].unique()
+        if unmapped.any():
+            missing_values = source_df[key_col][unmapped].unique()
             logging.error(f"Les valeurs suivantes n'ont pas pu être mappées : {missing_values}")
             raise ValueError(f"Certains UUID n'ont pas pu être mappés pour le modèle {model_name}")
 
         # Verify mapping integrity
-        if not verify_mapping_integrity(uuid_map, values):
+        with profiler.stage(model_name, "integrity_check", rows=len(values)):
+            integrity = check_mapping_integrity(uuid_map, values, new_keys=new_keys)
+        if not integrity["valid"]:
             logging.error(f"Échec de la vérification d'intégrité du mapping UUID pour {model_name}")
-            logging.error(f"Valeurs uniques: {len(set(values))}")
-            logging.error(f"UUIDs uniques: {len(set(uuid_map.values()))}")
+            logging.error(f"Valeurs uniques: {integrity['unique_values']}")
+            logging.error(f"Valeurs mappées: {integrity['mapped_values']}")
+            if integrity["missing_count"]:
+                logging.error(f"Valeurs sans UUID ({integrity['missing_count']}): {integrity['missing_values']}")
+            if integrity["extra_count"]:
+                logging.error(f"Clés absentes des données ({integrity['extra_count']}): {integrity['extra_values']}")
+            if integrity["duplicate_uuid_count"]:
+                logging.error(f"UUID partagés ({integrity['duplicate_uuid_count']}): {integrity['duplicate_uuids']}")
             raise ValueError(f"Échec de la vérification d'intégrité du mapping UUID pour {model_name}")
 
         # Get mapping statistics
-        mapping_stats = get_mapping_stats(uuid_map, values)
-        logging.info(f"Statistiques de mapping pour {model_name}: {mapping_stats}")
+        with profiler.stage(model_name, "mapping_stats", rows=len(values)):
+            mapping_stats = get_mapping_stats(uuid_map, values)
+        logging.info("Statistiques de mapping pour %s: %s", model_name, mapping_stats)
 
         return final_df, uuid_map, mapping_stats
     except Exception as e:
@@ -145,17 +418,19 @@ def process_model_data(model_name: str, model_mappings: Dict, source_files: Dict
         logging.error(f"Traceback: {traceback.format_exc()}")
         raise
     finally:
-        if source_df is not None:
-            del source_df
-        gc.collect()
+        # Le traceback d'une erreur garde les variables locales: libérer la source ici
+        source_df = None
 
-def map_multi_references(value: str, uuid_map: Dict[str, str]) -> str:
+def map_multi_references(value: str, uuid_map: Dict[str, str],
+                         diagnostics: Optional[DiagnosticsCollector] = None) -> str:
     """
     Map multiple references separated by commas to their corresponding UUIDs.
     
     Args:
         value: String containing one or more references separated by ", "
         uuid_map: Dictionary mapping original values to UUIDs
+        diagnostics: Collector rate-limiting the "reference not found" warnings,
+            one per generation run; without it every warning is written
         
     Returns:
         String of mapped UUIDs separated by ", " or empty string if no valid mappings
@@ -174,37 +449,145 @@ def map_multi_references(value: str, uuid_map: Dict[str, str]) -> str:
             if uuid:
                 mapped_refs.append(uuid)
             else:
-                logging.warning(f"Référence non trouvée dans le mapping: '{ref}'")
-                logging.debug(f"Valeurs disponibles dans le mapping: {list(uuid_map.keys())[:5]}...")
+                message = ("Référence non trouvée dans le mapping: %r", ref)
+                if diagnostics is not None:
+                    diagnostics.warn("Référence non trouvée", *message)
+                else:
+                    logging.warning(*message)
         
         return ", ".join(mapped_refs) if mapped_refs else ''
     except Exception as e:
         logging.error(f"Erreur lors du mapping de la référence '{value}': {str(e)}")
         return ''
 
-def process_model_references(final_df: pd.DataFrame, model_mappings: Dict, source_files: Dict, uuid_mappings: Dict) -> None:
-    """Process references for a single model, with proper memory management"""
-    source_df = None
+def resolve_reference_codes(values: pd.Series, uuid_map: UuidMap,
+                            max_examples: int = 10) -> tuple[np.ndarray, UuidFormatter, Dict]:
+    """
+    Resolve a reference column to UUID codes, rendered to text only when written.
+    
+    Cells holding a single reference get the position of its UUID in uuid_map.
+    Only cells containing ", " are exploded, mapped in one pass and joined back
+    in their original order; their text is built here and kept in the returned
+    formatter, which gives them codes from len(uuid_map) on.
+    
+    Args:
+        values: Source column with one or more references per cell
+        uuid_map: UuidMap of the referenced model
+        max_examples: Number of most frequent unmapped references kept in the summary
+        
+    Returns:
+        Tuple of (codes aligned on values, -1 when nothing could be mapped;
+        UuidFormatter rendering them; summary dict of the resolution)
+    """
+    codes = np.full(len(values), -1, dtype=code_dtype(len(uuid_map) + len(values)))
+    not_na = values.notna().to_numpy()
+    refs = values[not_na]
+    if not isinstance(refs.dtype, pd.StringDtype):
+        refs = refs.astype(str)
+    refs.index = np.flatnonzero(not_na)
+    
+    is_multi = refs.str.contains(", ", regex=False).to_numpy()
+    single = refs[~is_multi].str.strip()
+    multi = refs[is_multi].str.split(", ").explode().str.strip()
+    
+    single_codes = uuid_map.codes(single)
+    multi_codes = uuid_map.codes(multi)
+    
+    found = single_codes >= 0
+    codes[single.index[found]] = single_codes[found]
+    multi_found = multi_codes >= 0
+    extra = None
+    if multi_found.any():
+        rendered = pd.Series(uuid_map.format(multi_codes[multi_found]), index=multi.index[multi_found])
+        joined = rendered.groupby(level=0, sort=False).agg(", ".join)
+        extra = joined.to_numpy(dtype=object)
+        codes[joined.index] = len(uuid_map) + np.arange(len(joined))
+    
+    unmapped = pd.concat([single[~found], multi[~multi_found]])
+    unmapped = unmapped[unmapped != '']
+    top_unmapped = unmapped.value_counts().head(max_examples)
+    if trace_enabled():
+        # Trace ligne par ligne (KIMAIKO_TRACE=1 et niveau DEBUG)
+        for row, ref in unmapped.items():
+            logging.debug("Référence non trouvée (%s) ligne %d: %r", values.name, row + 1, ref)
+    
+    summary = {
+        "total_cells": len(values),
+        "na_cells": int((~not_na).sum()),
+        "total_refs": len(single) + len(multi),
+        "mapped_cells": int((codes >= 0).sum()),
+        "unmapped_refs": len(unmapped),
+        "unmapped_unique": int(unmapped.nunique()),
+        "unmapped_examples": dict(zip(top_unmapped.index.tolist(), top_unmapped.tolist()))
+    }
+    return codes, UuidFormatter(uuid_map.raw, extra), summary
+
+def resolve_multi_references(values: pd.Series, uuid_map: Dict[str, str],
+                             max_examples: int = 10) -> tuple[pd.Series, Dict]:
+    """
+    Column-wide equivalent of map_multi_references.
+    
+    Text counterpart of resolve_reference_codes, for callers that need the
+    mapped UUIDs right away.
+    
+    Args:
+        values: Source column with one or more references per cell
+        uuid_map: UuidMap or dictionary mapping original values to UUIDs
+        max_examples: Number of most frequent unmapped references kept in the summary
+        
+    Returns:
+        Tuple of (Series of mapped UUIDs aligned on values.index, '' when nothing
+        could be mapped; summary dict of the resolution)
+    """
+    codes, formatter, summary = resolve_reference_codes(values, as_uuid_map(uuid_map), max_examples)
+    return pd.Series(formatter(codes), index=values.index, dtype=object), summary
+
+def process_model_references(final_df: pd.DataFrame, model_mappings: Dict, source_files: Dict, uuid_mappings: Dict,
+                             source_cache: Optional[SourceCache] = None,
+                             arrow_strings: bool = False, model_name: str = "",
+                             profiler: Optional[StageProfiler] = None,
+                             diagnostics: Optional[DiagnosticsCollector] = None,
+                             primary: Optional[pd.DataFrame] = None) -> Dict[str, UuidFormatter]:
+    """
+    Process references for a single model, with proper memory management.
+    
+    Columns from joined sources are aligned on the primary source rows with a
+    hash join (see join_sources), never by position. Reference columns are added
+    to final_df as UUID codes. The join, the copied columns and the resolved
+    references are measured by profiler (see StageProfiler).
+    
+    With primary (a batch of primary source rows, in chunked generation),
+    final_df holds the rows of that batch and only the joined sources are read
+    from source_cache.
+    
+    Unmapped references are counted per column in diagnostics, reported by its
+    owner at the end of the run; without a collector, they are reported when
+    this function returns.
+    
+    Returns:
+        Dict of the formatter rendering each reference column
+    """
+    source_cache = source_cache or SourceCache(source_files, arrow_strings=arrow_strings)
+    profiler = profiler or StageProfiler()
+    own_diagnostics = diagnostics is None
+    diagnostics = diagnostics or DiagnosticsCollector()
+    formatters = {}
     try:
+        with profiler.stage(model_name, "join_sources", rows=len(final_df)):
+            positions = join_sources(model_name, model_sources(model_mappings, model_name), source_cache,
+                                     primary=primary, diagnostics=None if own_diagnostics else diagnostics)
         for col, mapping in model_mappings.items():
             if col == "ID" or not isinstance(mapping, dict) or "source_file" not in mapping:
                 continue
             
-            logging.info(f"Traitement de la colonne {col}")
-            logging.info(f"Mapping: {mapping}")
+            logging.debug("Traitement de la colonne %s: %s", col, mapping)
             
-            if mapping["source_file"] not in source_files:
-                logging.error(f"Fichier source '{mapping['source_file']}' non trouvé")
-                logging.error(f"Fichiers sources disponibles: {list(source_files.keys())}")
-                raise ValueError(f"Fichier source '{mapping['source_file']}' non trouvé")
-                
-            source_df = source_files[mapping["source_file"]]["data"].copy()
-            source_df = optimize_dataframe(source_df)
-            
-            if mapping["source_col"] not in source_df.columns:
-                logging.error(f"Colonne source '{mapping['source_col']}' non trouvée dans {mapping['source_file']}")
-                logging.error(f"Colonnes disponibles: {source_df.columns.tolist()}")
-                raise ValueError(f"Colonne source '{mapping['source_col']}' non trouvée")
+            # Colonne alignée sur les lignes du modèle (copiée telle quelle si ce n'est pas une référence)
+            with profiler.stage(model_name, "columns", rows=len(final_df)):
+                source_values = model_column(source_cache, positions, mapping["source_file"], mapping["source_col"],
+                                             primary)
+                if not mapping.get("is_ref"):
+                    final_df[col] = source_values
             
             if mapping.get("is_ref"):
                 ref_model = mapping["ref_model"]
@@ -213,48 +596,325 @@ def process_model_references(final_df: pd.DataFrame, model_mappings: Dict, sourc
                     logging.error(f"Mappings UUID disponibles: {list(uuid_mappings.keys())}")
                     raise ValueError(f"Mapping UUID non trouvé pour le modèle référencé {ref_model}")
                 
-                # Log des informations de mapping pour le débogage
-                logging.info(f"Mapping de références pour {col} vers {ref_model}")
-                logging.info(f"Nombre de valeurs dans uuid_mappings[{ref_model}]: {len(uuid_mappings[ref_model])}")
-                logging.debug(f"Exemple de valeurs dans le mapping: {dict(list(uuid_mappings[ref_model].items())[:3])}")
-                
-                source_values = source_df[mapping["source_col"]]
-                # Log des valeurs source pour le débogage
-                logging.debug(f"Exemple de valeurs source: {source_values.head().tolist()}")
+                if logging.getLogger().isEnabledFor(logging.DEBUG):
+                    logging.debug("Exemple de valeurs dans le mapping %s: %s", ref_model,
+                                  dict(itertools.islice(uuid_mappings[ref_model].items(), 3)))
                 
-                final_df[col] = source_values.apply(lambda x: map_multi_references(x, uuid_mappings[ref_model]))
+                with profiler.stage(model_name, "references", rows=len(source_values)):
+                    final_df[col], formatters[col], summary = resolve_reference_codes(
+                        source_values, as_uuid_map(uuid_mappings[ref_model]))
                 
-                # Vérification des valeurs non mappées
-                unmapped = source_values[final_df[col] == '']
-                if not unmapped.empty:
-                    logging.warning(f"Valeurs non mappées pour {col}: {unmapped.unique().tolist()[:5]}")
-                
-                # Log reference mapping statistics
-                total_refs = len(source_values)
-                mapped_refs = sum(final_df[col] != '')
-                logging.info(f"Statistiques de référence pour {col}:")
-                logging.info(f"Total références: {total_refs}")
-                logging.info(f"Références mappées: {mapped_refs}")
-                logging.info(f"Références non mappées: {total_refs - mapped_refs}")
-            else:
-                final_df[col] = source_df[mapping["source_col"]]
+                # Références non mappées comptées par colonne, résumées en fin de génération
+                diagnostics.add_unmapped(model_name, col, summary["unmapped_refs"], summary["unmapped_examples"],
+                                         ref_model=ref_model, total=summary["total_cells"])
+                logging.info("Références %s -> %s: %d cellules, %d mappées, %d références non mappées",
+                             col, ref_model, summary["total_cells"], summary["mapped_cells"], summary["unmapped_refs"])
             
-            del source_df
-            source_df = None
-            gc.collect()
+            del source_values
+        if own_diagnostics:
+            diagnostics.log_summary()
+        return formatters
     except Exception as e:
         logging.error(f"Erreur lors du traitement des références")
         logging.error(f"Message d'erreur: {str(e)}")
         logging.error(f"Traceback: {traceback.format_exc()}")
         raise
+
+def generate_model_file(model_name: str, model_mappings: Dict, source_files: Dict, uuid_mappings: Dict,
+                        output_writer: OutputWriter, sink: OutputSink,
+                        source_cache: Optional[SourceCache] = None,
+                        registry: Optional[UuidRegistry] = None, delta: bool = False,
+                        arrow_strings: bool = False,
+                        profiler: Optional[StageProfiler] = None,
+                        diagnostics: Optional[DiagnosticsCollector] = None,
+                        pending_hashes: Optional[List[tuple]] = None,
+                        new_keys=None) -> Optional[Dict[str, int]]:
+    """
+    Build one Kimaiko model (IDs, columns, references) and write it to sink.
+    
+    IDs and references are held as codes into the UUID mappings until the
+    writer renders them, chunk by chunk. With a registry, row hashes are
+    recorded, or appended to pending_hashes when given (the caller records them
+    once all the files are written); with delta=True only the rows that are new
+    or changed since the previous run are written; new_keys are the keys the
+    registry issued in this run (see process_model_data). With arrow_strings=True source text columns are
+    held as string[pyarrow] (see generate_kimaiko_files). Every stage, and the
+    model as a whole ("total"), is measured by profiler; unmapped references
+    are counted in diagnostics (see process_model_references).
+    """
+    final_df = None
+    profiler = profiler or StageProfiler()
+    try:
+        with profiler.stage(model_name, "total") as model_record:
+            final_df, uuid_map, stats = process_model_data(
+                model_name, 
+                model_mappings, 
+                source_files,
+                existing_uuid_map=uuid_mappings.get(model_name),  # Utiliser le mapping existant
+                source_cache=source_cache,
+                arrow_strings=arrow_strings,
+                profiler=profiler,
+                new_keys=new_keys
+            )
+            
+            if final_df is None:
+                return None
+            
+            formatters = {"ID": uuid_map.formatter()}
+            formatters.update(process_model_references(
+                final_df, 
+                model_mappings, 
+                source_files, 
+                uuid_mappings,
+                source_cache=source_cache,
+                arrow_strings=arrow_strings,
+                model_name=model_name,
+                profiler=profiler,
+                diagnostics=diagnostics
+            ))
+            
+            if registry is not None:
+                with profiler.stage(model_name, "registry_hashes", rows=len(final_df)):
+                    changed, hashes = registry.changed_rows(model_name, final_df, formatters=formatters)
+                    if pending_hashes is None:
+                        registry.record_hashes(hashes)
+                    else:
+                        pending_hashes.extend(hashes)
+                logging.info("%s: %d lignes nouvelles ou modifiées sur %d", model_name, int(changed.sum()), len(final_df))
+                if delta:
+                    final_df = final_df[changed.to_numpy()].reset_index(drop=True)
+            
+            # Save optimized DataFrame
+            with profiler.stage(model_name, "optimize", rows=len(final_df)):
+                final_df = optimize_dataframe(final_df)
+            output_path = f"fichiers_kimaiko/{model_name}.xlsx"
+            logging.info("Sauvegarde du fichier: %s", output_path)
+            with profiler.stage(model_name, "write", rows=len(final_df)):
+                written = output_writer.write(final_df, output_path, sink=sink, formatters=formatters)
+            model_record["rows"] = len(final_df)
+            logging.info("Fichier sauvegardé avec succès: %s", ", ".join(written))
+            return stats
+    except Exception as e:
+        logging.error(f"Erreur lors du traitement du modèle {model_name}")
+        logging.error(f"Message d'erreur: {str(e)}")
+        logging.error(f"Traceback: {traceback.format_exc()}")
+        raise Exception(f"'{model_name}': {str(e)}")
     finally:
-        if source_df is not None:
-            del source_df
-        gc.collect()
+        final_df = None
+        # Fin d'un modèle: collecte complète seulement sous pression mémoire
+        release_memory()
 
-def generate_kimaiko_files(mappings: Dict, source_files: Dict) -> bytes:
-    """Generate Kimaiko format files with UUID handling and package them in a zip"""
-    temp_dir = None
+def _generate_model_file_in_process(model_name: str, model_mappings: Dict, source_files: Dict,
+                                    uuid_mappings: Dict, output_writer: OutputWriter,
+                                    registry: Optional[UuidRegistry], delta: bool,
+                                    arrow_strings: bool = False, new_keys=None) -> tuple:
+    """
+    Process pool entry point: returns the stats, the written entries as bytes,
+    the stage records, the diagnostics and the row hashes left to record
+    """
+    buffer = BufferSink()
+    profiler = StageProfiler()
+    diagnostics = DiagnosticsCollector()
+    hashes = []
+    try:
+        stats = generate_model_file(model_name, model_mappings, source_files, uuid_mappings, output_writer, buffer,
+                                    registry=registry, delta=delta, arrow_strings=arrow_strings, profiler=profiler,
+                                    diagnostics=diagnostics, pending_hashes=hashes, new_keys=new_keys)
+        return stats, buffer.to_bytes(), profiler.records, diagnostics, hashes
+    finally:
+        buffer.close()
+        if registry is not None:
+            registry.close()
+
+def _model_inputs(model_mappings: Dict, source_cache: SourceCache, uuid_mappings: Dict,
+                  model_name: str) -> tuple[Dict, Dict]:
+    """Subset of prepared sources and UUID mappings a model needs (sent to worker processes)"""
+    sources = model_sources(model_mappings, model_name)
+    needed_sources = {m["source_file"] for m in model_mappings.values()
+                      if isinstance(m, dict) and "source_file" in m}
+    needed_sources |= {sources["primary"]} | {join["source_file"] for join in sources["joins"]}
+    needed_models = {model_name} | {m["ref_model"] for m in model_mappings.values()
+                                    if isinstance(m, dict) and m.get("is_ref")}
+    sources = {name: {"data": source_cache.frame(name)} for name in needed_sources}
+    maps = {name: uuid_mappings[name] for name in needed_models if name in uuid_mappings}
+    return sources, maps
+
+def run_model_layers(layers: List[List[str]], mappings: Dict, source_files: Dict, uuid_mappings: Dict,
+                     output_writer: OutputWriter, package: ZipPackage, source_cache: SourceCache,
+                     max_workers: int = 1, executor: str = "thread",
+                     deterministic: bool = True, registry: Optional[UuidRegistry] = None,
+                     delta: bool = False, arrow_strings: bool = False,
+                     profiler: Optional[StageProfiler] = None,
+                     diagnostics: Optional[DiagnosticsCollector] = None,
+                     pending_hashes: Optional[List[tuple]] = None,
+                     new_keys: Optional[Dict] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Generate the models of each dependency layer, running a layer's models concurrently.
+    
+    Models of the same layer never reference each other, so they can be built in
+    parallel; a layer only starts once the previous one is written. With
+    deterministic=True, files enter the archive in layer order, sorted by model
+    name, whatever the completion order.
+    
+    Args:
+        layers: Models grouped by topological layer
+        max_workers: Pool size; 1 processes models one after another in this thread
+        executor: "thread" or "process"
+        deterministic: Keep a stable archive order
+        registry, delta, arrow_strings, profiler, diagnostics, pending_hashes: See generate_model_file
+        new_keys: Keys issued by the registry in this run, per model (see generate_model_file)
+        
+    Returns:
+        Dict of mapping statistics per model
+    """
+    if executor not in ("thread", "process"):
+        raise ValueError(f"Type d'exécuteur inconnu: {executor}")
+    
+    profiler = profiler or StageProfiler()
+    diagnostics = diagnostics if diagnostics is not None else DiagnosticsCollector()
+    mapping_stats = {}
+    new_keys = new_keys or {}
+    if max_workers <= 1:
+        for layer in layers:
+            for model_name in layer:
+                logging.info("Traitement du modèle: %s", model_name)
+                stats = generate_model_file(model_name, mappings[model_name], source_files,
+                                            uuid_mappings, output_writer, package, source_cache,
+                                            registry=registry, delta=delta, arrow_strings=arrow_strings,
+                                            profiler=profiler, diagnostics=diagnostics,
+                                            pending_hashes=pending_hashes, new_keys=new_keys.get(model_name))
+                if stats is not None:
+                    mapping_stats[model_name] = stats
+        return mapping_stats
+    
+    pool_class = ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor
+    with pool_class(max_workers=max_workers) as pool:
+        for layer_idx, layer in enumerate(layers, 1):
+            logging.info("Couche %d/%d: %s (%s, %d workers)", layer_idx, len(layers), layer, executor, max_workers)
+            futures = {}
+            for model_name in layer:
+                if executor == "thread":
+                    buffer = BufferSink()
+                    future = pool.submit(generate_model_file, model_name, mappings[model_name], source_files,
+                                         uuid_mappings, output_writer, buffer, source_cache,
+                                         registry=registry, delta=delta, arrow_strings=arrow_strings,
+                                         profiler=profiler, diagnostics=diagnostics,
+                                         pending_hashes=pending_hashes, new_keys=new_keys.get(model_name))
+                else:
+                    buffer = None
+                    sources, maps = _model_inputs(mappings[model_name], source_cache, uuid_mappings, model_name)
+                    future = pool.submit(_generate_model_file_in_process, model_name, mappings[model_name],
+                                         sources, maps, output_writer, registry, delta, arrow_strings,
+                                         new_keys.get(model_name))
+                futures[future] = (model_name, buffer)
+            
+            if deterministic:
+                completed = sorted(futures, key=lambda f: futures[f][0])
+            else:
+                completed = as_completed(futures)
+            try:
+                for future in completed:
+                    model_name, buffer = futures[future]
+                    result = future.result()
+                    if buffer is not None:
+                        stats, entries = result, buffer
+                    else:
+                        stats, entries, records, worker_diagnostics, hashes = result
+                        profiler.extend(records)
+                        diagnostics.merge(worker_diagnostics)
+                        if pending_hashes is not None:
+                            pending_hashes.extend(hashes)
+                        elif hashes:
+                            registry.record_hashes(hashes)
+                    # Copie des fichiers produits par le worker dans l'archive
+                    with profiler.stage(model_name, "archive_entries"):
+                        package.add_entries(entries)
+                    if stats is not None:
+                        mapping_stats[model_name] = stats
+            finally:
+                # En cas d'erreur, attendre les modèles en cours avant de libérer leurs buffers
+                for future in futures:
+                    future.cancel()
+                wait(futures)
+                for _, buffer in futures.values():
+                    if buffer is not None:
+                        buffer.close()
+    return mapping_stats
+
+def generate_kimaiko_files(mappings: Dict, source_files: Dict,
+                           output_writer: Optional[OutputWriter] = None,
+                           output_target: Union[str, Path] = "spooled",
+                           max_workers: int = 1, executor: str = "thread",
+                           deterministic: bool = True, deterministic_ids: bool = False,
+                           registry: Optional[UuidRegistry] = None, delta: bool = False,
+                           arrow_strings: bool = False,
+                           profiler: Optional[StageProfiler] = None,
+                           diagnostics: Optional[DiagnosticsCollector] = None,
+                           chunk_size: Optional[int] = None) -> BinaryIO:
+    """
+    Generate Kimaiko format files with UUID handling and package them in a zip.
+    
+    Each file is streamed into the archive as soon as it is produced. output_target
+    selects where the archive lives: "memory", "spooled" (memory, then a temporary
+    file once large) or a Path. The returned file-like object is positioned at the
+    start of the archive and should be closed by the caller.
+    
+    Models of the same dependency layer are processed on a pool of max_workers
+    threads or processes (see run_model_layers).
+    
+    With deterministic_ids=True, IDs are uuid5 values derived from the model name
+    and the original key instead of random uuid4: a rerun gives the same IDs, and
+    byte-identical files for models whose data did not change.
+    
+    With a registry (UuidRegistry), UUIDs issued by earlier runs are reused and
+    only new keys get new ones; delta=True then writes only new or changed rows,
+    and references_uuid.xlsx is exported from the registry. Row hashes are
+    recorded only once the archive is complete, so a failed run is fully
+    emitted again by the next delta run.
+    
+    UUIDs are held as 16-byte values (UuidMap) and IDs and references as codes
+    into them; the canonical text is only produced by the writers.
+    
+    With arrow_strings=True (requires pyarrow), source text columns are held as
+    string[pyarrow] rather than Python str objects.
+    
+    Wall time, CPU time, rows and peak RSS of each stage, per model, are recorded
+    by profiler (a new StageProfiler if None; pass one to read the measures
+    afterwards) and written to the archive as performances.json. Unmapped
+    references are counted per column in diagnostics and logged once, at the
+    end (see DiagnosticsCollector).
+    
+    With chunk_size, primary sources larger than memory are generated out of
+    core (see utils.chunked): a first pass reads only their key columns to build
+    the UUID maps, a second one streams them chunk_size rows at a time through
+    ID assignment, joins and references to the writer, which must support
+    batches. Their entries need no 'data' (read_source_headers is enough). Peak
+    memory is then about one batch plus the UUID maps and the joined sources,
+    which are still loaded whole. Models are processed one after another; a
+    registry still provides the UUIDs, but row hashes are not recorded and
+    delta is not available (both need the whole model).
+    """
+    if chunk_size is not None:
+        if chunk_size < 1:
+            raise ValueError(f"Taille de lot invalide: {chunk_size}")
+        if delta:
+            raise ValueError("Le mode delta n'est pas disponible en génération par lots")
+        if registry is not None:
+            logging.warning("Génération par lots: les empreintes des lignes ne sont pas enregistrées dans le registre")
+    if arrow_strings:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("pyarrow est requis pour arrow_strings=True (pip install pyarrow)")
+    output_writer = output_writer or get_output_writer("xlsxwriter", reproducible=deterministic_ids)
+    if chunk_size is not None and not output_writer.supports_batches:
+        raise ValueError(f"{type(output_writer).__name__} ne permet pas la génération par lots")
+    profiler = profiler if profiler is not None else StageProfiler()
+    diagnostics = diagnostics if diagnostics is not None else DiagnosticsCollector()
+    package = None
+    source_cache = None
+    # Empreintes des lignes, enregistrées dans le registre une fois l'archive terminée
+    pending_hashes = [] if registry is not None else None
     try:
         logging.info("Début de la génération des fichiers Kimaiko")
         
@@ -272,7 +932,8 @@ def generate_kimaiko_files(mappings: Dict, source_files: Dict) -> bytes:
                 if isinstance(field_mapping, dict) and field_mapping.get('is_ref'):
                     dependencies[model].add(field_mapping['ref_model'])
         
-        # Tri topologique
+        # Tri topologique, par couches de modèles indépendants
+        layers = []
         while remaining_models:
             available = [m for m in remaining_models 
                        if not dependencies[m].intersection(remaining_models)]
@@ -280,102 +941,113 @@ def generate_kimaiko_files(mappings: Dict, source_files: Dict) -> bytes:
             if not available:
                 raise ValueError("Dépendances circulaires détectées")
             
+            layers.append(sorted(available))
             for model in sorted(available):
                 processing_order.append(model)
                 remaining_models.remove(model)
         
-        logging.info(f"Ordre de traitement: {processing_order}")
+        logging.info("Ordre de traitement: %s", processing_order)
+        
+        package = ZipPackage(output_target)
+        
+        if chunk_size is not None:
+            # Import différé: utils.chunked dépend de ce module
+            from .chunked import generate_model_file_chunked, load_joined_sources, streaming_uuid_mappings
+            source_files = load_joined_sources(mappings, source_files, arrow_strings=arrow_strings)
         
-        temp_dir = tempfile.mkdtemp()
-        result_dir = Path(temp_dir) / "import_kimaiko"
-        os.makedirs(result_dir)
-        os.makedirs(result_dir / "fichiers_kimaiko")
-        os.makedirs(result_dir / "references")
+        # Chaque fichier source est préparé une seule fois pour toute la génération
+        source_cache = SourceCache(source_files, arrow_strings=arrow_strings)
         
-        # Store generated UUIDs and mapping statistics
+        # Store generated UUIDs
         uuid_mappings = {}
-        mapping_stats = {}
+        new_keys = {}
         
         # Première passe : générer tous les UUIDs
-        for model_name in processing_order:
-            source_mapping = next((m for m in mappings[model_name].values() 
-                                if isinstance(m, dict) and "source_file" in m), None)
-            if source_mapping:
-                source_df = source_files[source_mapping["source_file"]]["data"]
-                key_col = source_mapping["source_col"]
-                values = source_df[key_col].values
-                if model_name not in global_uuid_mappings:
-                    global_uuid_mappings[model_name] = create_uuid_mapping(values)
-                    # Stocker aussi dans uuid_mappings pour la génération du fichier de références
-                    uuid_mappings[model_name] = global_uuid_mappings[model_name]
+        if chunk_size is not None:
+            # Colonnes de clé seules, lues lot par lot
+            global_uuid_mappings, _ = streaming_uuid_mappings(
+                processing_order, mappings, source_files, chunk_size=chunk_size,
+                deterministic_ids=deterministic_ids, registry=registry, profiler=profiler
+            )
+            uuid_mappings.update(global_uuid_mappings)
+        else:
+            for model_name in processing_order:
+                sources = model_sources(mappings[model_name], model_name)
+                if sources["primary"] is not None:
+                    values = source_cache.column(sources["primary"], sources["key"]).values
+                    if model_name not in global_uuid_mappings:
+                        namespace = model_namespace(model_name) if deterministic_ids else None
+                        with profiler.stage(model_name, "uuid_mapping", rows=len(values)):
+                            if registry is not None:
+                                global_uuid_mappings[model_name], new_count = registry.extend(
+                                    model_name, values, namespace=namespace)
+                                # Clés émises par cette exécution: les dernières du mapping
+                                uuid_map = global_uuid_mappings[model_name]
+                                new_keys[model_name] = uuid_map.index[len(uuid_map) - new_count:]
+                            else:
+                                global_uuid_mappings[model_name] = create_uuid_mapping(values, namespace=namespace)
+                        # Stocker aussi dans uuid_mappings pour la génération du fichier de références
+                        uuid_mappings[model_name] = global_uuid_mappings[model_name]
         
         # Deuxième passe : traiter les fichiers avec les UUIDs cohérents
-        for model_name in processing_order:
-            logging.info(f"\nTraitement du modèle: {model_name}")
-            final_df = None
-            try:
-                final_df, _, stats = process_model_data(
-                    model_name, 
-                    mappings[model_name], 
-                    source_files,
-                    existing_uuid_map=global_uuid_mappings[model_name]  # Utiliser le mapping existant
-                )
-                
-                if final_df is not None:
-                    mapping_stats[model_name] = stats
-                    
-                    # Utiliser global_uuid_mappings au lieu de uuid_mappings
-                    process_model_references(
-                        final_df, 
-                        mappings[model_name], 
-                        source_files, 
-                        global_uuid_mappings
-                    )
-                    
-                    # Save optimized DataFrame
-                    final_df = optimize_dataframe(final_df)
-                    output_path = result_dir / "fichiers_kimaiko" / f"{model_name}.xlsx"
-                    logging.info(f"Sauvegarde du fichier: {output_path}")
-                    final_df.to_excel(
-                        output_path,
-                        index=False,
-                        engine='openpyxl'
-                    )
-                    logging.info(f"Fichier sauvegardé avec succès: {model_name}.xlsx")
-            except Exception as e:
-                logging.error(f"Erreur lors du traitement du modèle {model_name}")
-                logging.error(f"Message d'erreur: {str(e)}")
-                logging.error(f"Traceback: {traceback.format_exc()}")
-                raise Exception(f"'{model_name}': {str(e)}")
-            finally:
-                if final_df is not None:
-                    del final_df
-                gc.collect()
+        if chunk_size is not None:
+            # Un modèle à la fois: l'archive reçoit les lots au fil de l'eau
+            for model_name in processing_order:
+                if model_name in global_uuid_mappings:
+                    generate_model_file_chunked(model_name, mappings[model_name], source_files,
+                                                global_uuid_mappings, output_writer, package, source_cache,
+                                                chunk_size=chunk_size, profiler=profiler, diagnostics=diagnostics)
+                    release_memory()
+        else:
+            # Statistiques de mapping déjà journalisées par modèle
+            run_model_layers(
+                layers, mappings, source_files, global_uuid_mappings, output_writer, package, source_cache,
+                max_workers=max_workers, executor=executor, deterministic=deterministic,
+                registry=registry, delta=delta, arrow_strings=arrow_strings, profiler=profiler,
+                diagnostics=diagnostics, pending_hashes=pending_hashes, new_keys=new_keys
+            )
+        diagnostics.log_summary()
+        
+        cache_stats = source_cache.stats()
+        logging.info(
+            "Cache des sources: %d fichiers préparés, %d réutilisations, %.1f Mo de copies évitées, %.3f s économisées",
+            cache_stats["sources_prepared"], cache_stats["cache_hits"],
+            cache_stats["bytes_saved"] / 1024 ** 2, cache_stats["time_saved_s"]
+        )
+        source_cache.clear()
         
         # Create UUID mapping file without statistics
         mapping_df = None
         try:
             mapping_dfs = []
-            for model_name, mapping in global_uuid_mappings.items():
+            mapping_raws = []
+            if registry is not None:
+                # Le registre contient aussi les UUID émis lors des exécutions précédentes
+                mapping_dfs.append(registry.to_frame(list(global_uuid_mappings.keys())))
+            for model_name, mapping in ({} if registry is not None else global_uuid_mappings).items():
                 if not mapping:
-                    logging.warning(f"Mapping vide pour le modèle {model_name}")
+                    logging.warning("Mapping vide pour le modèle %s", model_name)
                     continue
-                    
-                df = pd.DataFrame(list(mapping.items()), columns=['Valeur Originale', 'UUID'])
+                
+                # UUID: codes dans la concaténation des mappings, mis en texte à l'écriture
+                offset = sum(len(raw) for raw in mapping_raws)
+                df = pd.DataFrame({
+                    'Valeur Originale': mapping.index,
+                    'UUID': np.arange(offset, offset + len(mapping), dtype=code_dtype(offset + len(mapping)))
+                })
                 df['Modèle'] = model_name
                 mapping_dfs.append(df)
+                mapping_raws.append(mapping.raw)
             
-            if mapping_dfs:
+            if any(len(df) for df in mapping_dfs):
                 mapping_df = pd.concat(mapping_dfs, ignore_index=True)
                 mapping_df = optimize_dataframe(mapping_df)
+                formatters = {'UUID': UuidFormatter(np.concatenate(mapping_raws))} if mapping_raws else None
                 
-                output_path = result_dir / "references" / "references_uuid.xlsx"
-                mapping_df.to_excel(
-                    output_path,
-                    index=False,
-                    engine='openpyxl'
-                )
-                logging.info(f"Fichier de références sauvegardé: {output_path}")
+                output_path = "references/references_uuid.xlsx"
+                with profiler.stage("", "references_uuid", rows=len(mapping_df)):
+                    output_writer.write(mapping_df, output_path, sink=package, formatters=formatters)
+                logging.info("Fichier de références sauvegardé: %s", output_path)
             else:
                 logging.error("Aucune donnée de mapping à sauvegarder")
         except Exception as e:
@@ -384,9 +1056,7 @@ def generate_kimaiko_files(mappings: Dict, source_files: Dict) -> bytes:
             logging.error(f"Traceback: {traceback.format_exc()}")
             raise
         finally:
-            if mapping_df is not None:
-                del mapping_df
-            gc.collect()
+            mapping_df = None
         
         # Create README
         readme_content = """# Import Kimaiko - Fichiers Générés
@@ -412,25 +1082,23 @@ Contient les fichiers prêts à être importés dans Kimaiko.
 - Les références multiples dans une cellule (séparées par ", ") sont correctement gérées
 - Les références manquantes sont remplacées par des valeurs vides
 - Les fichiers ont été optimisés pour gérer de grands volumes de données
-- Les statistiques de mapping sont incluses dans references_uuid.xlsx"""
-        
-        with open(result_dir / "README.md", "w", encoding="utf-8") as f:
-            f.write(readme_content)
+- Les statistiques de mapping sont incluses dans references_uuid.xlsx
+
+## Performances
+
+Le fichier `performances.json` détaille, pour chaque modèle et chaque étape, la durée,
+le temps CPU, le nombre de lignes traitées et la mémoire maximale utilisée."""
         
-        # Create ZIP file
-        zip_path = Path(temp_dir) / "import_kimaiko.zip"
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(result_dir):
-                for file in files:
-                    file_path = Path(root) / file
-                    arc_name = file_path.relative_to(result_dir)
-                    zipf.write(file_path, arc_name)
+        package.write_text("README.md", readme_content)
+        package.write_text(REPORT_NAME, profiler.to_json())
         
         logging.info("Génération des fichiers terminée avec succès")
         
-        # Read ZIP content for download
-        with open(zip_path, 'rb') as f:
-            return f.read()
+        archive = package.fileobj()
+        if pending_hashes:
+            registry.record_hashes(pending_hashes)
+        package = None
+        return archive
     
     except Exception as e:
         error_msg = f"Erreur lors de la génération des fichiers: {str(e)}"
@@ -438,8 +1106,9 @@ Contient les fichiers prêts à être importés dans Kimaiko.
         logging.error(f"Traceback: {traceback.format_exc()}")
         raise Exception(error_msg)
     finally:
-        # Clean up temporary directory
-        if temp_dir and os.path.exists(temp_dir):
-            import shutil
-            shutil.rmtree(temp_dir, ignore_errors=True)
-        gc.collect()
+        if source_cache is not None:
+            source_cache.clear()
+        # Archive incomplète en cas d'erreur
+        if package is not None:
+            package.discard()
+        release_memory()
@@ -0,0 +1,49 @@
+from typing import Optional
+import gc
+import logging
+import os
+
+# Part de la mémoire système utilisée au-delà de laquelle une collecte complète est lancée
+# (modifiable par KIMAIKO_GC_THRESHOLD, ex. 0.9)
+DEFAULT_GC_THRESHOLD = 0.85
+
+def gc_threshold() -> float:
+    """Memory pressure threshold, from KIMAIKO_GC_THRESHOLD or the default"""
+    value = os.environ.get("KIMAIKO_GC_THRESHOLD")
+    if not value:
+        return DEFAULT_GC_THRESHOLD
+    try:
+        return float(value)
+    except ValueError:
+        logging.warning(f"KIMAIKO_GC_THRESHOLD invalide ({value}), seuil par défaut {DEFAULT_GC_THRESHOLD}")
+        return DEFAULT_GC_THRESHOLD
+
+def memory_pressure() -> Optional[float]:
+    """Share of the system memory in use (0 to 1), None without psutil"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory = psutil.virtual_memory()
+    return 1 - memory.available / memory.total
+
+def release_memory(threshold: Optional[float] = None) -> bool:
+    """
+    Run a full garbage collection only when memory is under pressure.
+
+    DataFrames, arrays and UUID maps are freed by reference counting as soon as
+    their owner drops them; a full collection only helps with reference cycles,
+    and walks the whole heap each time. It is therefore run at model boundaries,
+    and only when the share of system memory in use reaches threshold
+    (gc_threshold() by default). Without psutil, no collection is forced.
+
+    Returns:
+        True if a collection was run
+    """
+    threshold = gc_threshold() if threshold is None else threshold
+    pressure = memory_pressure()
+    if pressure is None or pressure < threshold:
+        return False
+    freed = gc.collect()
+    logging.info(f"Mémoire utilisée à {pressure:.0%} (seuil {threshold:.0%}): collecte complète, {freed} objets libérés")
+    return True
@@ -0,0 +1,118 @@
+from typing import Dict, List
+
+# Entrée du mapping d'un modèle déclarant sa source principale et ses jointures
+SOURCES_KEY = "_sources"
+
+def _as_list(value) -> List:
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+def _mapped_columns(model_mappings: Dict) -> List[tuple]:
+    """(column, mapping) of the model columns read from a source file"""
+    return [(col, mapping) for col, mapping in model_mappings.items()
+            if col != SOURCES_KEY and isinstance(mapping, dict) and "source_file" in mapping]
+
+def model_sources(model_mappings: Dict, model_name: str = "") -> Dict:
+    """
+    Resolve the primary source, ID key and joined sources of a model.
+
+    A model has one row per row of its primary source. Columns may also come
+    from secondary sources, joined on declared keys: each primary row is matched
+    with the secondary row holding the same key (many-to-one, so a secondary key
+    must be unique; rows without a match get empty cells). Joins are declared
+    under the "_sources" entry of the model mapping:
+
+        "_sources": {
+            "primary": "Ancien Factures",
+            "key": "NumeroFacture",
+            "joins": [
+                {"source_file": "Anciens Clients", "left_on": "CodeClient", "right_on": "Code"},
+                {"source_file": "Anciennes Régions", "from": "Anciens Clients",
+                 "left_on": ["Pays", "Region"], "right_on": ["Pays", "Code"]}
+            ]
+        }
+
+    "from" (default: the primary source) chains a join on an already joined
+    source. Without "_sources", the primary source is the one of the first mapped
+    column; "key" defaults to the first column mapped from the primary source.
+
+    Args:
+        model_mappings: Mapping of one model
+        model_name: Used in error messages
+
+    Returns:
+        Dict containing:
+        - primary: Primary source name (None if no column is mapped)
+        - key: Column of the primary source whose values get the UUIDs
+        - joins: List of dicts (source_file, from, left_on, right_on), keys as lists
+
+    Raises:
+        ValueError: If the declaration is malformed, or a column comes from a source
+            that is neither the primary source nor a joined one
+    """
+    columns = _mapped_columns(model_mappings)
+    declared = model_mappings.get(SOURCES_KEY) or {}
+    if not isinstance(declared, dict):
+        raise ValueError(f"{model_name}: '{SOURCES_KEY}' doit être un dictionnaire")
+
+    primary = declared.get("primary") or (columns[0][1]["source_file"] if columns else None)
+    key = declared.get("key")
+    if key is None:
+        key = next((mapping["source_col"] for _, mapping in columns if mapping["source_file"] == primary), None)
+
+    joins = []
+    joined = {primary}
+    for join in declared.get("joins", []):
+        if not isinstance(join, dict) or "source_file" not in join:
+            raise ValueError(f"{model_name}: chaque jointure doit indiquer 'source_file'")
+        source = join["source_file"]
+        left = join.get("from", primary)
+        if left not in joined:
+            raise ValueError(f"{model_name}: la jointure de '{source}' part de '{left}', "
+                             f"qui n'est ni la source principale ni une source déjà jointe")
+        if source in joined:
+            raise ValueError(f"{model_name}: la source '{source}' est jointe plusieurs fois")
+        if "left_on" not in join or "right_on" not in join:
+            raise ValueError(f"{model_name}: la jointure de '{source}' doit indiquer 'left_on' et 'right_on'")
+        left_on, right_on = _as_list(join["left_on"]), _as_list(join["right_on"])
+        if len(left_on) != len(right_on):
+            raise ValueError(f"{model_name}: 'left_on' et 'right_on' de la jointure de '{source}' "
+                             f"n'ont pas le même nombre de colonnes")
+        joins.append({"source_file": source, "from": left, "left_on": left_on, "right_on": right_on})
+        joined.add(source)
+
+    for col, mapping in columns:
+        if mapping["source_file"] not in joined:
+            raise ValueError(
+                f"{model_name}.{col}: la source '{mapping['source_file']}' n'est ni la source principale "
+                f"'{primary}' ni une source jointe; déclarez une jointure dans '{SOURCES_KEY}' "
+                f"(les lignes de deux fichiers ne sont jamais appariées par leur position)"
+            )
+    if primary is not None and key is None:
+        raise ValueError(f"{model_name}: aucune colonne de la source principale '{primary}' pour les identifiants")
+
+    return {"primary": primary, "key": key, "joins": joins}
+
+def source_key_columns(model_mappings: Dict, model_name: str = "") -> Dict[str, List]:
+    """Columns each source must provide for the ID key and the joins of a model"""
+    sources = model_sources(model_mappings, model_name)
+    needed: Dict[str, List] = {}
+    if sources["primary"] is not None:
+        needed.setdefault(sources["primary"], []).append(sources["key"])
+    for join in sources["joins"]:
+        needed.setdefault(join["from"], []).extend(join["left_on"])
+        needed.setdefault(join["source_file"], []).extend(join["right_on"])
+    return needed
+
+def check_model_sources(model_name: str, model_mappings: Dict, source_columns: Dict[str, List]) -> None:
+    """
+    Check the sources and key columns of a model against the available source headers.
+
+    Raises:
+        ValueError: On an unknown source or column
+    """
+    for source, columns in source_key_columns(model_mappings, model_name).items():
+        if source not in source_columns:
+            raise ValueError(f"{model_name}: fichier source '{source}' introuvable")
+        for col in columns:
+            if col not in source_columns[source]:
+                raise ValueError(f"{model_name}: colonne '{col}' absente de {source}")
@@ -0,0 +1,182 @@
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, List, Optional, Union
+import io
+import logging
+import shutil
+import tempfile
+import zipfile
+
+# Entrées déjà compressées: inutile de les recompresser dans l'archive
+_STORED_SUFFIXES = {".xlsx", ".zip", ".parquet"}
+
+# Date fixe des entrées: deux générations des mêmes fichiers donnent la même archive
+_ENTRY_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+class OutputSink:
+    """Destination for generated files, addressed by relative POSIX names"""
+
+    def open(self, name: str) -> BinaryIO:
+        """Open a new entry for binary writing (use as a context manager)"""
+        raise NotImplementedError
+
+    def write_text(self, name: str, text: str) -> None:
+        with self.open(name) as f:
+            f.write(text.encode("utf-8"))
+
+class DirectorySink(OutputSink):
+    """Write entries as plain files below a directory"""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def open(self, name: str) -> BinaryIO:
+        path = self.root / PurePosixPath(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return open(path, "wb")
+
+class _EntryHandle(io.RawIOBase):
+    """Writable view on a buffer that survives the `with` block closing it"""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        return self._buffer.write(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._buffer.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._buffer.tell()
+
+class BufferSink(OutputSink):
+    """
+    Keep entries in spooled temporary files until they are copied into a package.
+
+    Used by parallel workers: each one fills its own BufferSink and the results
+    are added to the shared ZipPackage one at a time.
+    """
+
+    def __init__(self, spool_max_size: int = 64 * 1024 ** 2):
+        self.spool_max_size = spool_max_size
+        self.entries: List[tuple] = []
+
+    def open(self, name: str) -> BinaryIO:
+        buffer = tempfile.SpooledTemporaryFile(max_size=self.spool_max_size)
+        self.entries.append((name, buffer))
+        return _EntryHandle(buffer)
+
+    def to_bytes(self) -> List[tuple]:
+        """Return the entries as (name, bytes) pairs, e.g. to leave a worker process"""
+        result = []
+        for name, buffer in self.entries:
+            buffer.seek(0)
+            result.append((name, buffer.read()))
+            buffer.close()
+        self.entries = []
+        return result
+
+    def close(self) -> None:
+        for _, buffer in self.entries:
+            buffer.close()
+        self.entries = []
+
+class ZipPackage(OutputSink):
+    """
+    Result archive written entry by entry as files are produced.
+
+    Args:
+        target: "memory" (BytesIO), "spooled" (kept in memory up to spool_max_size,
+            then spilled to a temporary file) or a Path where the archive is written
+        spool_max_size: Size in bytes above which a spooled archive moves to disk
+
+    Only one entry can be open at a time. Once close() has been called, fileobj()
+    returns the archive as a readable file-like object positioned at the start.
+    Entries carry a fixed timestamp, so the archive bytes only depend on its content.
+    """
+
+    def __init__(self, target: Union[str, Path] = "spooled", spool_max_size: int = 64 * 1024 ** 2):
+        if isinstance(target, Path) or target not in ("memory", "spooled"):
+            self.path = Path(target)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fileobj = open(self.path, "w+b")
+        elif target == "memory":
+            self.path = None
+            self._fileobj = io.BytesIO()
+        else:
+            self.path = None
+            self._fileobj = tempfile.SpooledTemporaryFile(max_size=spool_max_size)
+        self._zip = zipfile.ZipFile(self._fileobj, "w", zipfile.ZIP_DEFLATED)
+        self.entries: List[str] = []
+
+    def open(self, name: str, size: Optional[int] = None) -> BinaryIO:
+        """
+        Open a new entry for binary writing.
+
+        Args:
+            name: Entry name in the archive
+            size: Uncompressed size when known in advance. zipfile then adds ZIP64
+                records only if the entry needs them; a streamed entry of unknown
+                size always gets them, since it may grow past 2 GiB
+        """
+        compress_type = zipfile.ZIP_STORED if PurePosixPath(name).suffix in _STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+        info = zipfile.ZipInfo(name, date_time=_ENTRY_DATE_TIME)
+        info.compress_type = compress_type
+        if size is not None:
+            info.file_size = size
+        self.entries.append(name)
+        return self._zip.open(info, "w", force_zip64=size is None)
+
+    def write_text(self, name: str, text: str) -> None:
+        data = text.encode("utf-8")
+        with self.open(name, len(data)) as f:
+            f.write(data)
+
+    def add_entries(self, buffered: Union[BufferSink, List[tuple]]) -> List[str]:
+        """Copy entries buffered elsewhere (BufferSink or (name, bytes) pairs) into the archive"""
+        names = []
+        if isinstance(buffered, BufferSink):
+            for name, buffer in buffered.entries:
+                size = buffer.seek(0, io.SEEK_END)
+                buffer.seek(0)
+                with self.open(name, size) as f:
+                    shutil.copyfileobj(buffer, f, 1024 ** 2)
+                names.append(name)
+            buffered.close()
+        else:
+            for name, data in buffered:
+                with self.open(name, len(data)) as f:
+                    f.write(data)
+                names.append(name)
+        return names
+
+    def close(self) -> None:
+        """Write the central directory; the archive becomes readable"""
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+            logging.info(f"Archive finalisée: {len(self.entries)} fichiers")
+
+    def fileobj(self) -> BinaryIO:
+        """Return the finished archive as a file-like object positioned at the start"""
+        self.close()
+        self._fileobj.seek(0)
+        return self._fileobj
+
+    def discard(self) -> None:
+        """Abandon the archive and release its storage"""
+        try:
+            if self._zip is not None:
+                self._zip.close()
+        except Exception:
+            pass
+        self._zip = None
+        self._fileobj.close()
+        if self.path is not None and self.path.exists():
+            self.path.unlink()
@@ -0,0 +1,181 @@
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from io import StringIO
+
+# Taille maximale du cache par défaut (modifiable par KIMAIKO_CACHE_MAX_MB)
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+def file_digest(file) -> str:
+    """SHA-256 of a path or file-like object, read in blocks"""
+    digest = hashlib.sha256()
+    if isinstance(file, (str, Path)):
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(1024 ** 2), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    if hasattr(file, "getbuffer"):
+        digest.update(file.getbuffer())
+        return digest.hexdigest()
+    position = file.tell()
+    file.seek(0)
+    for block in iter(lambda: file.read(1024 ** 2), b""):
+        digest.update(block)
+    file.seek(position)
+    return digest.hexdigest()
+
+class ParseCache:
+    """
+    On-disk cache of parsed source files, keyed by the SHA-256 of their content.
+
+    Each file has a small JSON header entry (columns, preview and row count of
+    each sheet) and each source a Feather file holding the optimized columns
+    parsed so far; a later run that needs more columns only parses the missing
+    ones. The cache is shared by Streamlit reruns, sessions and the command line,
+    and survives "Recommencer".
+
+    Entries are evicted least recently used first once the total size exceeds
+    max_bytes. Writes go through a temporary file and an atomic rename, so worker
+    processes can use the same directory.
+
+    Columns Arrow cannot store (mixed Python types, non-string names) are not
+    cached and are parsed again when needed.
+    """
+
+    def __init__(self, root: Union[str, Path], max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def default(cls) -> "ParseCache":
+        """Cache in KIMAIKO_CACHE_DIR (~/.cache/kimaiko/sources by default)"""
+        root = os.environ.get("KIMAIKO_CACHE_DIR", Path.home() / ".cache" / "kimaiko" / "sources")
+        max_mb = os.environ.get("KIMAIKO_CACHE_MAX_MB")
+        return cls(root, int(max_mb) * 1024 ** 2 if max_mb else DEFAULT_CACHE_MAX_BYTES)
+
+    def _path(self, digest: str, suffix: str) -> Path:
+        return self.root / f"{digest}{suffix}"
+
+    def _touch(self, path: Path) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _write_atomic(self, path: Path, write) -> None:
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        try:
+            write(tmp_name)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def get_header(self, digest: str) -> Optional[List[Dict]]:
+        """Return the cached sheets (columns, preview, row count) of a source file, or None"""
+        path = self._path(digest, ".header.json")
+        try:
+            sheets = json.loads(path.read_text(encoding="utf-8"))["sheets"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        self._touch(path)
+        for sheet in sheets:
+            sheet["preview"] = pd.read_json(StringIO(sheet["preview"]), orient="split")
+        return sheets
+
+    def put_header(self, digest: str, sheets: List[Dict]) -> None:
+        """Store the sheets of a source file as returned by the header reader"""
+        try:
+            text = json.dumps({"sheets": [
+                {**sheet, "preview": sheet["preview"].to_json(orient="split", index=False, date_format="iso")}
+                for sheet in sheets
+            ]}, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logging.warning(f"En-tête non mis en cache ({digest[:12]}): {e}")
+            return
+        self._write_atomic(self._path(digest, ".header.json"),
+                           lambda tmp: Path(tmp).write_text(text, encoding="utf-8"))
+        self.evict()
+
+    def get_columns(self, key: str, columns: List) -> tuple[Optional[pd.DataFrame], List]:
+        """
+        Read the requested columns that are cached.
+
+        Returns:
+            Tuple of (cached columns, or None if none is cached; columns still to parse)
+        """
+        path = self._path(key, ".feather")
+        try:
+            import pyarrow.ipc as ipc
+            cached_columns = ipc.open_file(str(path)).schema.names
+        except (ImportError, OSError):
+            return None, list(columns)
+        hits = [col for col in columns if col in cached_columns]
+        missing = [col for col in columns if col not in cached_columns]
+        if not hits:
+            return None, missing
+        self._touch(path)
+        return pd.read_feather(path, columns=hits), missing
+
+    def put_columns(self, key: str, df: pd.DataFrame) -> None:
+        """Add parsed columns to the cache entry of a source (file digest, or digest-sheet index)"""
+        try:
+            import pyarrow as pa
+            import pyarrow.feather as feather
+        except ImportError:
+            return
+        storable = {}
+        for col in df.columns:
+            if not isinstance(col, str):
+                continue
+            try:
+                storable[col] = pa.Array.from_pandas(df[col])
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                logging.info(f"Colonne {col} non mise en cache (types mixtes)")
+        if not storable:
+            return
+
+        path = self._path(key, ".feather")
+        table = pa.table(storable)
+        if path.exists():
+            try:
+                existing = feather.read_table(str(path))
+                for name in existing.column_names:
+                    if name not in table.column_names and existing.num_rows == table.num_rows:
+                        table = table.append_column(existing.field(name), existing.column(name))
+            except (OSError, pa.ArrowInvalid):
+                pass
+        self._write_atomic(path, lambda tmp: feather.write_feather(table, tmp))
+        self.evict()
+
+    def size(self) -> int:
+        return sum(path.stat().st_size for path in self.root.iterdir() if path.is_file())
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        files = []
+        for path in self.root.iterdir():
+            if path.is_file() and not path.name.endswith(".tmp"):
+                stat = path.stat()
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(files, key=lambda entry: entry[0]):
+            path.unlink(missing_ok=True)
+            total -= size
+            logging.info(f"Cache de lecture: {path.name} supprimé ({size / 1024 ** 2:,.1f} Mo)")
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        for path in self.root.iterdir():
+            if path.is_file():
+                path.unlink(missing_ok=True)
@@ -0,0 +1,132 @@
+import pandas as pd
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+import json
+import os
+import threading
+import time
+
+# Intervalle d'échantillonnage de la mémoire résidente pendant une étape
+DEFAULT_SAMPLE_INTERVAL = 0.05
+
+# Nom de l'entrée du rapport dans l'archive générée
+REPORT_NAME = "performances.json"
+
+def _process():
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process(os.getpid())
+
+class StageProfiler:
+    """
+    Wall time, CPU time, rows and peak resident memory of each pipeline stage.
+
+    Stages are recorded per model (use "" for stages shared by all models). CPU
+    time is the one of the thread running the stage. RSS is sampled by a
+    background thread while stages are open; it is the memory of the whole
+    process, so stages of models running concurrently share their peaks. Without
+    psutil, memory fields are None.
+
+    Records are plain dicts, so a worker process keeps its own profiler, sends
+    the records back and the parent merges them with extend().
+    """
+
+    def __init__(self, sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.sample_interval = sample_interval
+        self.records: List[Dict] = []
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self._lock = threading.Lock()
+        self._open: List[Dict] = []
+        self._sampler: Optional[threading.Thread] = None
+        self._process = _process()
+
+    def _rss(self) -> Optional[int]:
+        if self._process is None:
+            return None
+        try:
+            return self._process.memory_info().rss
+        except Exception:
+            return None
+
+    def _sample(self) -> None:
+        while True:
+            rss = self._rss()
+            with self._lock:
+                if not self._open:
+                    self._sampler = None
+                    return
+                for record in self._open:
+                    record["_peak"] = max(record["_peak"], rss or 0)
+            time.sleep(self.sample_interval)
+
+    @contextmanager
+    def stage(self, model: str, name: str, rows: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Measure the enclosed block as stage name of model.
+
+        Yields the record, so rows can be set once known (record["rows"] = n).
+        Failed stages are recorded too, with status "error".
+        """
+        rss = self._rss()
+        record = {"model": model, "stage": name, "rows": rows, "status": "error",
+                  "_peak": rss or 0, "_rss_start": rss}
+        with self._lock:
+            self._open.append(record)
+            if self._process is not None and self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name="stage-profiler", daemon=True)
+                self._sampler.start()
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+            record["status"] = "ok"
+        finally:
+            wall, cpu = time.perf_counter() - start, time.thread_time() - cpu_start
+            rss_end = self._rss()
+            with self._lock:
+                self._open = [r for r in self._open if r is not record]
+                peak = max(record.pop("_peak"), rss_end or 0)
+                rss_start = record.pop("_rss_start")
+                record.update({
+                    "wall_s": round(wall, 4),
+                    "cpu_s": round(cpu, 4),
+                    "peak_rss_mb": round(peak / 1024 ** 2, 1) if rss_end is not None else None,
+                    "rss_delta_mb": (round((rss_end - rss_start) / 1024 ** 2, 1)
+                                     if rss_end is not None and rss_start is not None else None),
+                    "pid": os.getpid()
+                })
+                self.records.append(record)
+
+    def extend(self, records: List[Dict]) -> None:
+        """Add records measured elsewhere (worker process)"""
+        with self._lock:
+            self.records.extend(records)
+
+    def summary(self) -> pd.DataFrame:
+        """One row per model and stage: times and rows summed, peak RSS maximum"""
+        columns = ["model", "stage", "calls", "wall_s", "cpu_s", "rows", "peak_rss_mb"]
+        if not self.records:
+            return pd.DataFrame(columns=columns)
+        df = pd.DataFrame(self.records)
+        summary = df.groupby(["model", "stage"], sort=False).agg(
+            calls=("stage", "size"), wall_s=("wall_s", "sum"), cpu_s=("cpu_s", "sum"),
+            rows=("rows", lambda rows: rows.sum(min_count=1)), peak_rss_mb=("peak_rss_mb", "max")
+        ).reset_index()
+        summary["rows"] = summary["rows"].astype("Int64")
+        return summary[columns]
+
+    def report(self) -> Dict:
+        """Machine-readable report: one entry per measured stage, plus totals"""
+        with self._lock:
+            records = list(self.records)
+        peaks = [r["peak_rss_mb"] for r in records if r["peak_rss_mb"] is not None]
+        return {
+            "started_at": self.started_at,
+            "peak_rss_mb": max(peaks) if peaks else None,
+            "stages": records
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.report(), indent=2, ensure_ascii=False, default=str)
@@ -0,0 +1,618 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import csv
+import io
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import closing
+from openpyxl import load_workbook
+from pandas.io.parsers import TextParser
+from .file_operations import _normalize_header, _read_file_bytes, optimize_dataframe, read_template_columns
+from .model_sources import source_key_columns
+from .parse_cache import ParseCache, file_digest
+
+# Formats de fichiers sources acceptés (extension sans le point)
+SOURCE_EXTENSIONS = ["xlsx", "csv", "parquet", "feather", "arrow"]
+
+_CSV_SNIFF_BYTES = 64 * 1024
+_CSV_COUNT_CHUNK_ROWS = 1_000_000
+# Lignes ignorées par pd.read_csv (skip_blank_lines)
+_BLANK_LINES = (b"", b"\r")
+
+# Rough ratio between the in-memory size of a parsed frame and the file size,
+# used to keep concurrent parses within the available memory
+_MEMORY_EXPANSION = {"xlsx": 10, "csv": 3, "parquet": 5, "feather": 2, "arrow": 2}
+
+def source_format(filename: str) -> str:
+    """Return the source format from a file name, raising ValueError if unsupported"""
+    extension = Path(filename).suffix.lower().lstrip(".")
+    if extension not in SOURCE_EXTENSIONS:
+        raise ValueError(f"Format non supporté: .{extension} (formats acceptés: {', '.join(SOURCE_EXTENSIONS)})")
+    return extension
+
+def _rewind(file) -> None:
+    if hasattr(file, "seek"):
+        file.seek(0)
+
+def _require_pyarrow(extension: str) -> None:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(f"pyarrow est requis pour lire les fichiers .{extension} (pip install pyarrow)")
+
+def _csv_options(file) -> Dict:
+    """Detect the delimiter and encoding of a CSV file from its first bytes"""
+    if isinstance(file, (str, Path)):
+        with open(file, "rb") as f:
+            head = f.read(_CSV_SNIFF_BYTES)
+    else:
+        _rewind(file)
+        head = file.read(_CSV_SNIFF_BYTES)
+        _rewind(file)
+
+    try:
+        text, encoding = head.decode("utf-8-sig"), "utf-8-sig"
+    except UnicodeDecodeError:
+        # Exports ERP français souvent en Windows-1252
+        text, encoding = head.decode("cp1252", errors="replace"), "cp1252"
+    try:
+        delimiter = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=",;\t|").delimiter
+    except csv.Error:
+        delimiter = ","
+    return {"sep": delimiter, "encoding": encoding}
+
+def source_name(filename: str, sheet: Optional[str] = None) -> str:
+    """Logical source name: the file stem, or 'file/sheet' for a sheet of a multi-sheet workbook"""
+    stem = Path(filename).stem
+    return stem if sheet is None else f"{stem}/{sheet}"
+
+def _read_xlsx_sheets(file, preview_rows: int) -> List[Dict]:
+    """Enumerate the sheets of a workbook with their header, preview rows and row count"""
+    workbook = load_workbook(io.BytesIO(_read_file_bytes(file)), read_only=True, data_only=True)
+    try:
+        sheets = []
+        for worksheet in workbook.worksheets:
+            rows = worksheet.iter_rows(min_row=1, max_row=preview_rows + 1, values_only=True)
+            columns = _normalize_header(next(rows, ()))
+            # Dimension déclarée dans le fichier, absente de certains exports
+            row_count = worksheet.max_row - 1 if worksheet.max_row else None
+            sheets.append({
+                'sheet': worksheet.title,
+                'columns': columns,
+                'preview': pd.DataFrame([row[:len(columns)] for row in rows], columns=columns),
+                'row_count': row_count
+            })
+    finally:
+        workbook.close()
+
+    if len(sheets) == 1:
+        sheets[0]['sheet'] = None  # Classeur à une feuille: nommé comme le fichier
+    else:
+        # Feuilles vides (notes, graphiques) ignorées
+        sheets = [sheet for sheet in sheets if sheet['columns']] or sheets[:1]
+    return sheets
+
+def read_source_columns(file, filename: Optional[str] = None, sheet: Optional[str] = None) -> List:
+    """
+    Read only the column names of a source file.
+
+    Args:
+        file: Path or file-like object (e.g. a Streamlit upload)
+        filename: Name used to detect the format when file is not a path
+        sheet: Sheet of a workbook (first sheet when None)
+    """
+    extension = source_format(filename or str(file))
+    if extension == "xlsx":
+        if sheet is None:
+            return read_template_columns(file)
+        for entry in _read_xlsx_sheets(file, 0):
+            if entry['sheet'] == sheet:
+                return entry['columns']
+        raise ValueError(f"Feuille '{sheet}' absente de {filename or file}")
+    if extension == "csv":
+        options = _csv_options(file)
+        columns = pd.read_csv(file, nrows=0, **options).columns.tolist()
+        _rewind(file)
+        return columns
+
+    _require_pyarrow(extension)
+    if extension == "parquet":
+        import pyarrow.parquet as pq
+        schema = pq.read_schema(file)
+    else:
+        import pyarrow.ipc as ipc
+        schema = ipc.open_file(file).schema
+    _rewind(file)
+    # Colonnes d'index écrites par pandas (ex. __index_level_0__)
+    return [name for name in schema.names if not name.startswith("__index_level_")]
+
+def _iter_blocks(file, block_size: int = 1024 ** 2) -> Iterator:
+    """Content of a path or file-like object, read in blocks (like file_digest)"""
+    if isinstance(file, (str, Path)):
+        with open(file, "rb") as f:
+            yield from iter(lambda: f.read(block_size), b"")
+        return
+    if hasattr(file, "getbuffer"):
+        # Copie un bloc à la fois du contenu en mémoire, pas le fichier entier
+        with file.getbuffer() as buffer:
+            for start in range(0, len(buffer), block_size):
+                yield bytes(buffer[start:start + block_size])
+        return
+    position = file.tell()
+    file.seek(0)
+    try:
+        yield from iter(lambda: file.read(block_size), b"")
+    finally:
+        file.seek(position)
+
+def _file_size(file) -> int:
+    """Size in bytes of a path or file-like object, without reading it"""
+    if isinstance(file, (str, Path)):
+        return os.path.getsize(file)
+    if isinstance(getattr(file, "size", None), int):
+        return file.size  # Fichier téléversé (Streamlit)
+    position = file.tell()
+    size = file.seek(0, io.SEEK_END)
+    file.seek(position)
+    return size
+
+def _count_csv_rows(file) -> int:
+    """
+    Data rows of a CSV file, as pd.read_csv loads them.
+
+    Files without any quote character are counted line by line while streaming
+    them in blocks, skipping blank lines like read_csv. A quoted cell may hold
+    line breaks, so files with quotes are counted by the CSV parser itself.
+    """
+    rows = 0
+    partial = b""
+    quoted = False
+    with closing(_iter_blocks(file)) as blocks:
+        for block in blocks:
+            if b'"' in block:
+                quoted = True
+                break
+            lines = (partial + block).split(b"\n")
+            partial = lines.pop()
+            rows += sum(1 for line in lines if line not in _BLANK_LINES)
+    if quoted:
+        _rewind(file)
+        with pd.read_csv(file, usecols=[0], dtype=str, chunksize=_CSV_COUNT_CHUNK_ROWS,
+                         **_csv_options(file)) as reader:
+            return sum(len(chunk) for chunk in reader)
+    rows += partial not in _BLANK_LINES
+    # La première ligne non vide est l'en-tête
+    return max(rows - 1, 0)
+
+def _read_headers(file, extension: str, preview_rows: int) -> List[Dict]:
+    if extension == "xlsx":
+        return _read_xlsx_sheets(file, preview_rows)
+
+    row_count = None
+    if extension == "csv":
+        _rewind(file)
+        preview = pd.read_csv(file, nrows=preview_rows, **_csv_options(file))
+        row_count = _count_csv_rows(file)
+    else:
+        _require_pyarrow(extension)
+        _rewind(file)
+        if extension == "parquet":
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(file)
+            row_count = parquet_file.metadata.num_rows
+            batch = next(parquet_file.iter_batches(batch_size=preview_rows), None)
+            preview = batch.to_pandas() if batch is not None else parquet_file.schema_arrow.empty_table().to_pandas()
+        else:
+            import pyarrow as pa
+            import pyarrow.ipc as ipc
+            reader = ipc.open_file(pa.memory_map(str(file)) if isinstance(file, (str, Path)) else file)
+            batches = [reader.get_batch(i) for i in range(reader.num_record_batches)]
+            row_count = sum(batch.num_rows for batch in batches)
+            preview = reader.schema.empty_table().to_pandas() if not batches else batches[0].slice(0, preview_rows).to_pandas()
+        preview = preview[[col for col in preview.columns if not str(col).startswith("__index_level_")]]
+    _rewind(file)
+    return [{
+        'sheet': None,
+        'columns': preview.columns.tolist(),
+        'preview': preview.head(preview_rows),
+        'row_count': row_count
+    }]
+
+def read_source_headers(file, filename: Optional[str] = None, preview_rows: int = 5,
+                        cache: Optional[ParseCache] = None) -> Dict[str, Dict]:
+    """
+    First loading phase: read the columns, a few preview rows and the row count
+    of a source file without parsing its data.
+
+    Each sheet of a multi-sheet workbook becomes its own source, named
+    'file/sheet'; other files give a single source named after the file stem.
+    Entries have no 'data' key: they keep the file so that load_mapped_sources
+    only parses the sources (and sheets) a mapping references.
+
+    Args:
+        file: Path or file-like object (e.g. a Streamlit upload)
+        filename: Name used to detect the format when file is not a path
+        preview_rows: Number of rows shown in the interface
+        cache: Parse cache looked up by content hash before reading the file
+
+    Returns:
+        Dict of source name -> entry with 'columns', 'preview', 'row_count' (None
+        when unknown), 'file', 'filename', 'sheet', 'digest' (SHA-256 of the
+        content) and 'cache_key'
+    """
+    filename = filename or str(file)
+    extension = source_format(filename)
+    digest = file_digest(file)
+    sheets = cache.get_header(digest) if cache is not None else None
+    if sheets is not None:
+        logging.info(f"En-tête de {filename} lu depuis le cache")
+    else:
+        sheets = _read_headers(file, extension, preview_rows)
+        if cache is not None:
+            cache.put_header(digest, sheets)
+
+    entries = {}
+    for index, sheet in enumerate(sheets):
+        entries[source_name(filename, sheet['sheet'])] = {
+            **sheet,
+            'file': file,
+            'filename': filename,
+            'digest': digest,
+            'cache_key': digest if sheet['sheet'] is None else f"{digest}-{index}"
+        }
+    return entries
+
+def read_source(file, filename: Optional[str] = None, columns: Optional[List] = None,
+                sheet: Optional[str] = None) -> pd.DataFrame:
+    """
+    Read a source file, dispatching on its format.
+
+    Args:
+        file: Path or file-like object
+        filename: Name used to detect the format when file is not a path
+        columns: Only read these columns (all columns when None)
+        sheet: Sheet of a workbook (first sheet when None)
+    """
+    extension = source_format(filename or str(file))
+    usecols = list(columns) if columns is not None else None
+    _rewind(file)
+    if extension == "xlsx":
+        return pd.read_excel(file, sheet_name=0 if sheet is None else sheet, usecols=usecols)
+    if extension == "csv":
+        return pd.read_csv(file, usecols=usecols, low_memory=False, **_csv_options(file))
+
+    _require_pyarrow(extension)
+    if extension == "parquet":
+        return pd.read_parquet(file, columns=usecols)
+    return pd.read_feather(file, columns=usecols)
+
+def _parse_rows(rows: List[list], columns: List, text_columns: List) -> pd.DataFrame:
+    """Frame of worksheet rows, with the type inference of pd.read_excel"""
+    return TextParser(rows, names=columns, dtype={col: object for col in text_columns}).read()
+
+# Types de lot inférés par pandas qu'une lecture complète rassemble en float64
+_NUMERIC_KINDS = {"integer", "floating", "mixed-integer-float"}
+
+def _settle_dtype(kinds: set, dtypes: set, has_na: bool, empty_batches: bool):
+    """
+    Type a full read gives a column whose batches were inferred separately.
+
+    Returns:
+        None when every batch already has it, str when the column is text
+        (cells are kept as read, without numeric conversion) or the dtype the
+        batches are cast to
+    """
+    if not kinds or (len(dtypes) == 1 and not empty_batches):
+        return None
+    if kinds <= _NUMERIC_KINDS:
+        return np.dtype("int64") if kinds == {"integer"} and not has_na else np.dtype("float64")
+    if kinds == {"boolean"}:
+        return np.dtype(object)
+    if len(dtypes) == 1:
+        return next(iter(dtypes))
+    return str
+
+def source_dtypes(info: Dict, columns: List, batch_size: int) -> Dict:
+    """
+    Settle the type of each column of a source read in batches.
+
+    pandas infers the types of CSV and workbook batches one batch at a time, so
+    a column can be read as numbers in one batch and as text in the next ("001"
+    then "abc"): its keys would then differ from those of a full read. The
+    batches are read once beforehand and each column gets the type pd.read_csv
+    or pd.read_excel would give it on the whole file. Other formats are typed.
+
+    Args:
+        info: Source entry (see iter_source_batches)
+        columns: Columns to read
+        batch_size: Batch size of the later reads (types depend on it)
+
+    Returns:
+        Dict of column to settled type (see _settle_dtype), for the columns
+        whose batches disagree; to pass to iter_source_batches
+    """
+    if 'data' in info or source_format(info['filename']) not in ("csv", "xlsx"):
+        return {}
+    # pd.read_excel convertit en nombres les booléens mêlés à des nombres ou à des cellules vides
+    boolean_kind = "integer" if source_format(info['filename']) == "xlsx" else "boolean"
+    columns = list(dict.fromkeys(columns))
+    kinds = {col: set() for col in columns}
+    dtypes = {col: set() for col in columns}
+    has_na = dict.fromkeys(columns, False)
+    empty_batches = dict.fromkeys(columns, False)
+    for batch in iter_source_batches(info, columns, batch_size, dtypes={}):
+        for col in columns:
+            values = batch[col]
+            na = values.isna()
+            if na.all():
+                empty_batches[col] = True
+            else:
+                kind = pd.api.types.infer_dtype(values, skipna=True)
+                kinds[col].add(boolean_kind if kind == "boolean" else kind)
+                dtypes[col].add(values.dtype)
+            has_na[col] = has_na[col] or bool(na.any())
+    settled = {col: _settle_dtype(kinds[col], dtypes[col], has_na[col], empty_batches[col]) for col in columns}
+    return {col: dtype for col, dtype in settled.items() if dtype is not None}
+
+def iter_source_batches(info: Dict, columns: List, batch_size: int,
+                        dtypes: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read the given columns of a source in batches of at most batch_size rows.
+
+    Only one batch is held at a time: CSV files are read with a chunked parser,
+    Parquet files by row groups, Feather/Arrow files through a memory map and
+    workbooks with openpyxl in read-only mode. Entries that already hold their
+    data are sliced. Every batch has a RangeIndex starting at 0, and every
+    column the same type in all batches (see source_dtypes).
+
+    Args:
+        info: Source entry (from read_source_headers, or holding 'data')
+        columns: Columns to read
+        batch_size: Maximum number of rows per batch
+        dtypes: Types from source_dtypes for the same batch_size (settled
+            here, with one more read of the file, when None)
+    """
+    columns = list(dict.fromkeys(columns))
+    if dtypes is None:
+        dtypes = source_dtypes(info, columns, batch_size)
+    text_columns = [col for col in columns if dtypes.get(col) is str]
+    casts = {col: dtype for col, dtype in dtypes.items() if col in columns and dtype is not str}
+    for batch in _read_batches(info, columns, batch_size, text_columns):
+        yield batch.astype(casts) if casts else batch
+
+def _read_batches(info: Dict, columns: List, batch_size: int, text_columns: List) -> Iterator[pd.DataFrame]:
+    if 'data' in info:
+        df = info['data']
+        for start in range(0, len(df), batch_size):
+            yield df.iloc[start:start + batch_size][columns].reset_index(drop=True)
+        return
+
+    file, filename, sheet = info['file'], info['filename'], info.get('sheet')
+    extension = source_format(filename)
+    _rewind(file)
+    if extension == "csv":
+        with pd.read_csv(file, usecols=columns, chunksize=batch_size, low_memory=False,
+                         dtype={col: str for col in text_columns}, **_csv_options(file)) as reader:
+            for batch in reader:
+                yield batch[columns].reset_index(drop=True)
+        return
+
+    if extension == "xlsx":
+        workbook = load_workbook(io.BytesIO(_read_file_bytes(file)), read_only=True, data_only=True)
+        try:
+            worksheet = workbook.worksheets[0] if sheet is None else workbook[sheet]
+            rows = worksheet.iter_rows(values_only=True)
+            header = _normalize_header(next(rows, ()))
+            positions = [header.index(col) for col in columns]
+            batch = []
+            empty_rows = 0
+            for row in rows:
+                # Comme pd.read_excel: lignes vides gardées, sauf en fin de feuille
+                if all(value is None for value in row):
+                    empty_rows += 1
+                    continue
+                batch.extend([[None] * len(columns)] * empty_rows)
+                empty_rows = 0
+                batch.append([row[i] if i < len(row) else None for i in positions])
+                while len(batch) >= batch_size:
+                    yield _parse_rows(batch[:batch_size], columns, text_columns)
+                    batch = batch[batch_size:]
+            while batch:
+                yield _parse_rows(batch[:batch_size], columns, text_columns)
+                batch = batch[batch_size:]
+        finally:
+            workbook.close()
+        return
+
+    _require_pyarrow(extension)
+    if extension == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(file).iter_batches(batch_size=batch_size, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    # Table projetée sur le fichier mappé en mémoire: seules les tranches converties sont chargées
+    table = ipc.open_file(pa.memory_map(str(file)) if isinstance(file, (str, Path)) else file).read_all()
+    table = table.select(columns)
+    for start in range(0, table.num_rows, batch_size):
+        yield table.slice(start, batch_size).to_pandas()
+
+def load_source_file(file, filename: Optional[str] = None, columns: Optional[List] = None,
+                     sheet: Optional[str] = None) -> Dict:
+    """
+    Load a source file (or one sheet of a workbook) into the source_files entry structure.
+
+    'columns' always lists every column of the file (for the mapping UI), while
+    'data' only holds the requested columns when columns is given.
+    """
+    all_columns = None
+    if columns is not None:
+        all_columns = read_source_columns(file, filename, sheet)
+        # Les colonnes absentes sont signalées par la validation du mapping, pas ici
+        columns = [col for col in columns if col in all_columns]
+    df = read_source(file, filename, columns, sheet)
+    if all_columns is None:
+        all_columns = df.columns.tolist()
+    logging.info(f"Source {source_name(filename or str(file), sheet)}: {len(df):,} lignes, {len(df.columns)}/{len(all_columns)} colonnes chargées")
+    return {
+        'columns': all_columns,
+        'data': df,
+        'row_count': len(df)
+    }
+
+def mapped_columns(mappings: Dict) -> Dict[str, List]:
+    """Columns referenced by the mapping (join keys included), grouped by source file"""
+    needed: Dict[str, List] = {}
+    for model_name, model_mappings in mappings.items():
+        for mapping in model_mappings.values():
+            if isinstance(mapping, dict) and "source_file" in mapping and "source_col" in mapping:
+                cols = needed.setdefault(mapping["source_file"], [])
+                if mapping["source_col"] not in cols:
+                    cols.append(mapping["source_col"])
+        for source, key_columns in source_key_columns(model_mappings, model_name).items():
+            cols = needed.setdefault(source, [])
+            cols.extend(col for col in dict.fromkeys(key_columns) if col not in cols)
+    return needed
+
+def _parse_mapped_source(file, filename: str, columns: List, all_columns: List, sheet: Optional[str] = None,
+                         cache_key: Optional[str] = None, cache: Optional[ParseCache] = None,
+                         arrow_strings: bool = False) -> Dict:
+    """Worker entry point: read and optimize the mapped columns of one source"""
+    cached, missing = (None, columns)
+    if cache is not None and cache_key is not None:
+        cached, missing = cache.get_columns(cache_key, columns)
+    parts = [cached] if cached is not None else []
+    if missing or not parts:
+        parsed = optimize_dataframe(read_source(file, filename, missing, sheet), plan_key=cache_key)
+        if cache is not None and cache_key is not None:
+            cache.put_columns(cache_key, parsed)
+        parts.append(parsed)
+    else:
+        logging.info(f"Source {source_name(filename, sheet)}: {len(columns)} colonnes lues depuis le cache")
+    df = pd.concat(parts, axis=1) if len(parts) > 1 else parts[0]
+    df = df[[col for col in columns if col in df.columns]]
+    if arrow_strings:
+        # Conversion ici: les chaînes Python ne quittent pas ce processus
+        df = optimize_dataframe(df, plan_key=cache_key, arrow_strings=True)
+    return {
+        'columns': all_columns,
+        'data': df,
+        'row_count': len(df)
+    }
+
+def _estimated_memory(info: Dict, columns: List) -> int:
+    """Estimate the memory needed to parse the given columns of a source"""
+    size = _file_size(info['file'])
+    width = len(columns) / max(len(info['columns']), 1)
+    return int(size * _MEMORY_EXPANSION[source_format(info['filename'])] * width)
+
+def _memory_budget(memory_fraction: float) -> Optional[int]:
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return int(psutil.virtual_memory().available * memory_fraction)
+
+def load_mapped_sources(source_files: Dict, mappings: Dict, max_workers: Optional[int] = None,
+                        memory_fraction: float = 0.5, progress_callback=None,
+                        cache: Optional[ParseCache] = None, arrow_strings: bool = False) -> Dict:
+    """
+    Second loading phase: read the columns used by the mapping from sources
+    loaded with read_source_headers.
+
+    Sources are parsed concurrently on a process pool. A file only starts once the
+    estimated memory of the parses in flight fits in memory_fraction of the
+    available memory (psutil), so large workbooks do not all expand at once. A
+    failing file does not stop the others: every error is reported together.
+
+    Entries that already hold their data (demo mode, command line) are returned
+    unchanged, as are sources no model references.
+
+    Args:
+        source_files: Source entries from read_source_headers
+        mappings: Mapping configuration
+        max_workers: Pool size (CPU count by default); 1 parses in this process
+        memory_fraction: Share of the available memory the parses may use
+        progress_callback: Called as progress_callback(name, done, total) after each file
+        cache: Parse cache for the entries that carry a 'cache_key'
+        arrow_strings: Hold text columns as string[pyarrow] (see optimize_dataframe)
+
+    Returns:
+        New source_files dict whose referenced entries have their 'data'
+
+    Raises:
+        ValueError: If one or more sources could not be read
+    """
+    needed = mapped_columns(mappings)
+    loaded = {}
+    pending = []
+    for name, info in source_files.items():
+        if 'data' in info or name not in needed:
+            loaded[name] = info
+        else:
+            pending.append((name, info, [col for col in needed[name] if col in info['columns']]))
+
+    errors = {}
+    total = len(pending)
+    completed = 0
+    max_workers = min(max_workers or os.cpu_count() or 1, max(total, 1))
+
+    def done(name, source=None, error=None):
+        nonlocal completed
+        completed += 1
+        if error is not None:
+            errors[name] = str(error)
+            logging.error(f"Erreur lors du chargement de {name}: {error}")
+        else:
+            loaded[name] = source
+        if progress_callback is not None:
+            progress_callback(name, completed, total)
+
+    if max_workers <= 1:
+        for name, info, columns in pending:
+            try:
+                done(name, _parse_mapped_source(info['file'], info['filename'], columns, info['columns'],
+                                                info.get('sheet'), info.get('cache_key'), cache, arrow_strings))
+            except Exception as e:
+                done(name, error=e)
+    else:
+        budget = _memory_budget(memory_fraction)
+        logging.info(f"Chargement de {total} sources sur {max_workers} processus"
+                     + (f", budget mémoire {budget / 1024 ** 2:,.0f} Mo" if budget is not None else ""))
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            # Plus gros fichiers d'abord: meilleur équilibrage entre processus
+            queue = sorted(((name, info, columns, _estimated_memory(info, columns)) for name, info, columns in pending),
+                           key=lambda task: task[3], reverse=True)
+            running = {}
+            while queue or running:
+                in_flight = sum(estimate for _, estimate in running.values())
+                while queue and len(running) < max_workers:
+                    # Premier fichier qui tient dans le budget; au moins un fichier à la fois
+                    fits = [i for i, task in enumerate(queue)
+                            if not running or budget is None or in_flight + task[3] <= budget]
+                    if not fits:
+                        break
+                    name, info, columns, estimate = queue.pop(fits[0])
+                    file = info['file'] if isinstance(info['file'], (str, Path)) else io.BytesIO(_read_file_bytes(info['file']))
+                    running[pool.submit(_parse_mapped_source, file, info['filename'], columns, info['columns'],
+                                        info.get('sheet'), info.get('cache_key'), cache,
+                                        arrow_strings)] = (name, estimate)
+                    in_flight += estimate
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, _ = running.pop(future)
+                    try:
+                        done(name, future.result())
+                    except Exception as e:
+                        done(name, error=e)
+
+    if errors:
+        details = "; ".join(f"{name}: {error}" for name, error in errors.items())
+        raise ValueError(f"{len(errors)} fichier(s) source illisible(s) - {details}")
+    # Ordre d'origine des sources
+    return {name: loaded[name] for name in source_files if name in loaded}
@@ -0,0 +1,217 @@
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+import uuid
+import logging
+import numpy as np
+import pandas as pd
+from .data_processing import UuidMap, create_uuid_mapping, unique_non_na
+
+class UuidRegistry:
+    """
+    Persistent original value -> UUID registry, stored in SQLite.
+
+    Migrations run in waves (initial load, then delta extracts): the registry keeps
+    every UUID already issued, per model, so a later run reuses them and only
+    creates UUIDs for new keys. It also stores a hash of each generated row, which
+    lets a delta run emit only new or changed rows.
+
+    Keys keep their SQLite type (TEXT, INTEGER, REAL). Dates, timestamps,
+    durations, decimals and booleans are stored as text or integers with a type
+    tag, and rebuilt as the same type on load, so they match the keys of the next
+    run; other Python types are stored as their str(). The object can be sent to
+    worker processes: each process opens its own connection on the same file.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._init_schema()
+
+    def __getstate__(self) -> Dict:
+        return {"path": self.path}
+
+    def __setstate__(self, state: Dict) -> None:
+        self.path = state["path"]
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Une connexion par thread (sqlite3 n'autorise pas le partage par défaut)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=60)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        with self._conn as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS uuid_registry (
+                    model TEXT NOT NULL,
+                    original_value NOT NULL,
+                    uuid TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    value_type TEXT,
+                    PRIMARY KEY (model, original_value)
+                )""")
+            # Registres créés avant l'ajout du type des clés
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(uuid_registry)")]
+            if "value_type" not in columns:
+                conn.execute("ALTER TABLE uuid_registry ADD COLUMN value_type TEXT")
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_uuid_registry_uuid ON uuid_registry (uuid)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS row_hashes (
+                    model TEXT NOT NULL,
+                    uuid TEXT NOT NULL,
+                    row_hash INTEGER NOT NULL,
+                    PRIMARY KEY (model, uuid)
+                )""")
+
+    def load(self, model: str) -> Dict:
+        """Return every original value -> UUID issued so far for a model"""
+        cursor = self._conn.execute(
+            "SELECT original_value, value_type, uuid FROM uuid_registry WHERE model = ?", (model,))
+        return {_python_value(value, value_type): uuid_val for value, value_type, uuid_val in cursor}
+
+    def add(self, model: str, mapping: Dict) -> None:
+        """Record newly issued UUIDs"""
+        created_at = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self._conn as conn:
+            conn.executemany(
+                "INSERT INTO uuid_registry (model, original_value, value_type, uuid, created_at) VALUES (?, ?, ?, ?, ?)",
+                ((model, *_sql_value(value), uuid_val, created_at) for value, uuid_val in mapping.items()))
+
+    def extend(self, model: str, values, namespace: Optional[uuid.UUID] = None) -> tuple[UuidMap, int]:
+        """
+        Load a model's UUIDs and issue new ones for keys never seen before.
+
+        Returns:
+            Tuple of (full UuidMap, previously issued keys included; number of new
+            keys, which are the last ones of the map)
+        """
+        existing = self.load(model)
+        # Comparaison sur la forme stockée: une clé relue a déjà été convertie par _sql_value
+        stored = {_sql_value(value)[0] for value in existing}
+        new_values = [v for v in unique_non_na(values).tolist() if _sql_value(v)[0] not in stored]
+        new_mapping = create_uuid_mapping(new_values, namespace=namespace)
+        if new_mapping:
+            self.add(model, new_mapping)
+        mapping = UuidMap.from_dict(existing).merge(new_mapping)
+        logging.info(f"Registre UUID {model}: {len(existing)} existants, {len(new_mapping)} nouveaux")
+        return mapping, len(new_mapping)
+
+    def changed_rows(self, model: str, final_df: pd.DataFrame, id_col: str = "ID",
+                     formatters: Optional[Dict[str, Callable]] = None) -> tuple[pd.Series, List[tuple]]:
+        """
+        Flag the rows of a generated model that are new or changed since the last run.
+
+        Rows are grouped by ID (several source rows can share a key), so a change in
+        any of them flags the whole group. Columns listed in formatters (UUID codes)
+        are hashed as the text that is written.
+
+        Nothing is written: the new hashes are returned, to be recorded with
+        record_hashes once the generated files are complete. A failed run then
+        leaves the registry as it was, and its retry emits the same rows.
+
+        Returns:
+            Tuple of (mask of the new or changed rows; (model, uuid, row_hash)
+            tuples to pass to record_hashes)
+        """
+        formatters = formatters or {}
+        content = final_df.drop(columns=[id_col])
+        for col in content.columns:
+            if col in formatters:
+                content[col] = formatters[col](content[col].to_numpy())  # Hash du texte écrit, pas des codes
+            elif pd.api.types.is_float_dtype(content[col]):
+                content[col] = content[col].astype("float64")  # Hash indépendant du downcast
+            elif isinstance(content[col].dtype, pd.StringDtype):
+                content[col] = content[col].astype(object)  # Hash indépendant du stockage (Arrow ou objet)
+        row_hashes = pd.util.hash_pandas_object(content, index=False)
+        # Somme modulo 2**64: indépendante de l'ordre des lignes d'un même ID
+        grouped = row_hashes.groupby(final_df[id_col].to_numpy(), sort=False).sum()
+        # SQLite stocke des entiers signés 64 bits
+        key_hashes = grouped.to_numpy().astype(np.uint64).view(np.int64).tolist()
+        ids = grouped.index.to_numpy()
+        uuids = formatters[id_col](ids) if id_col in formatters else ids
+
+        previous = dict(self._conn.execute("SELECT uuid, row_hash FROM row_hashes WHERE model = ?", (model,)))
+        changed = [(uuid_val, row_hash, id_val)
+                   for uuid_val, row_hash, id_val in zip(uuids.tolist(), key_hashes, ids.tolist())
+                   if previous.get(uuid_val) != row_hash]
+
+        pending = [(model, uuid_val, row_hash) for uuid_val, row_hash, _ in changed]
+        return final_df[id_col].isin([id_val for _, _, id_val in changed]), pending
+
+    def record_hashes(self, pending: List[tuple]) -> None:
+        """Record the row hashes returned by changed_rows, in a single transaction"""
+        with self._lock, self._conn as conn:
+            conn.executemany("INSERT OR REPLACE INTO row_hashes (model, uuid, row_hash) VALUES (?, ?, ?)", pending)
+
+    def to_frame(self, models: Optional[List[str]] = None) -> pd.DataFrame:
+        """Registry content in the references_uuid.xlsx layout"""
+        query = ("SELECT original_value AS 'Valeur Originale', uuid AS 'UUID', model AS 'Modèle', "
+                 "value_type FROM uuid_registry")
+        params: tuple = ()
+        if models is not None:
+            query += f" WHERE model IN ({', '.join('?' for _ in models)})"
+            params = tuple(models)
+        df = pd.read_sql_query(query + " ORDER BY rowid", self._conn, params=params)
+        typed = df["value_type"].notna().to_numpy()
+        if typed.any():
+            # Clés écrites avec leur type d'origine (dates...), comme sans registre
+            values = df["Valeur Originale"].astype(object)
+            values[typed] = [_python_value(value, value_type) for value, value_type
+                             in zip(values[typed], df["value_type"][typed])]
+            df["Valeur Originale"] = values
+        return df.drop(columns="value_type")
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+def _sql_value(value) -> tuple:
+    """(value SQLite stores natively, type tag to rebuild it, None for str/int/float) of a key"""
+    if isinstance(value, np.datetime64):
+        value = pd.Timestamp(value)  # .item() donnerait des nanosecondes entières
+    elif isinstance(value, np.timedelta64):
+        value = pd.Timedelta(value)
+    elif isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool):
+        return int(value), "bool"
+    if isinstance(value, (str, int, float)):
+        return value, None
+    if isinstance(value, datetime):
+        return pd.Timestamp(value).isoformat(), "datetime"
+    if isinstance(value, date):
+        return value.isoformat(), "date"
+    if isinstance(value, timedelta):
+        return pd.Timedelta(value).isoformat(), "timedelta"
+    if isinstance(value, Decimal):
+        return str(value), "decimal"
+    return str(value), None
+
+def _python_value(value, value_type: Optional[str]):
+    """Key read from SQLite, rebuilt with the type recorded by _sql_value"""
+    if value_type == "bool":
+        return bool(value)
+    if value_type == "datetime":
+        return pd.Timestamp(value)
+    if value_type == "date":
+        return date.fromisoformat(value)
+    if value_type == "timedelta":
+        return pd.Timedelta(value)
+    if value_type == "decimal":
+        return Decimal(value)
+    return value